@@ -30,6 +30,7 @@ from src.api.payments.models import Payment, CinetPayPayment
 from src.api.system.models import OrganizationCenter
 from src.api.training.models import StudentApplication, Training, TrainingSession, TrainingSessionParticipant ,Specialty
 from src.api.cabinet.models import CabinetApplication, ApplicationFee, CabinetRecruitmentCampaign
+from src.api.notifications.models import Notification
 
 
 target_metadata = SQLModel.metadata
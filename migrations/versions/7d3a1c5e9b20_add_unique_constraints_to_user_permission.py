@@ -0,0 +1,48 @@
+"""Add unique constraints to user_permission
+
+Revision ID: 7d3a1c5e9b20
+Revises: 5b7e2c9a41d3
+Create Date: 2026-10-19 14:02:11.518340
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7d3a1c5e9b20"
+down_revision: Union[str, None] = "5b7e2c9a41d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # duplicates left by the former check-then-insert grants, the oldest row is kept
+    op.execute(
+        """
+        DELETE FROM user_permission a USING user_permission b
+        WHERE a.id > b.id AND a.permission = b.permission
+        AND (a.user_id = b.user_id OR a.role_id = b.role_id)
+    """
+    )
+    op.create_unique_constraint(
+        "uq_user_permission_user_id_permission",
+        "user_permission",
+        ["user_id", "permission"],
+    )
+    op.create_unique_constraint(
+        "uq_user_permission_role_id_permission",
+        "user_permission",
+        ["role_id", "permission"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        "uq_user_permission_role_id_permission", "user_permission", type_="unique"
+    )
+    op.drop_constraint(
+        "uq_user_permission_user_id_permission", "user_permission", type_="unique"
+    )
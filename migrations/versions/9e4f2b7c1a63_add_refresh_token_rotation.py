@@ -0,0 +1,61 @@
+"""Add refresh token rotation
+
+Revision ID: 9e4f2b7c1a63
+Revises: 7d3a1c5e9b20
+Create Date: 2026-10-19 16:41:27.204915
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9e4f2b7c1a63"
+down_revision: Union[str, None] = "7d3a1c5e9b20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # expired tokens are useless, the cleanup task bounds the table from now on
+    op.execute("DELETE FROM refresh_token WHERE expires_at < now()")
+    op.add_column(
+        "refresh_token",
+        sa.Column("family_id", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+    op.add_column(
+        "refresh_token",
+        sa.Column("revoked_at", sa.TIMESTAMP(timezone=True), nullable=True),
+    )
+    op.execute("UPDATE refresh_token SET family_id = id")
+    op.create_index(
+        op.f("ix_refresh_token_token"), "refresh_token", ["token"], unique=False
+    )
+    op.create_index(
+        op.f("ix_refresh_token_expires_at"),
+        "refresh_token",
+        ["expires_at"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_refresh_token_family_id"), "refresh_token", ["family_id"], unique=False
+    )
+    op.create_index(
+        "ix_refresh_token_user_id_expires_at",
+        "refresh_token",
+        ["user_id", "expires_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_refresh_token_user_id_expires_at", table_name="refresh_token")
+    op.drop_index(op.f("ix_refresh_token_family_id"), table_name="refresh_token")
+    op.drop_index(op.f("ix_refresh_token_expires_at"), table_name="refresh_token")
+    op.drop_index(op.f("ix_refresh_token_token"), table_name="refresh_token")
+    op.drop_column("refresh_token", "revoked_at")
+    op.drop_column("refresh_token", "family_id")
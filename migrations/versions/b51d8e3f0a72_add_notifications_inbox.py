@@ -0,0 +1,69 @@
+"""Add notifications inbox
+
+Revision ID: b51d8e3f0a72
+Revises: 9e4f2b7c1a63
+Create Date: 2026-10-19 18:12:40.581337
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b51d8e3f0a72"
+down_revision: Union[str, None] = "9e4f2b7c1a63"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# hash partitions of notifications by user_id
+PARTITIONS = 16
+
+
+def upgrade() -> None:
+    op.create_table(
+        "notifications",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("user_id", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("type", sqlmodel.sql.sqltypes.AutoString(length=50), nullable=False),
+        sa.Column("data", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("read_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("id", "user_id"),
+        postgresql_partition_by="HASH (user_id)",
+    )
+    for remainder in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE notifications_p{remainder} PARTITION OF notifications "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+        )
+    # created on the parent, cascaded to every partition
+    op.create_index(
+        "ix_notifications_user_id_created_at",
+        "notifications",
+        ["user_id", sa.text("created_at DESC"), sa.text("id DESC")],
+        unique=False,
+    )
+    op.create_index(
+        "ix_notifications_user_id_unread",
+        "notifications",
+        ["user_id"],
+        unique=False,
+        postgresql_where=sa.text("read_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_notifications_user_id_unread", table_name="notifications")
+    op.drop_index("ix_notifications_user_id_created_at", table_name="notifications")
+    # the partitions are dropped with their parent
+    op.drop_table("notifications")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Wait of a payment confirmation task behind a burst of bulk tasks, with one
+worker consuming every queue (the former topology) or one worker per queue
+(CELERY_TASK_ROUTES). The tasks are stand-ins sent with the queue and
+priority of the real ones; the workers run in this process.
+
+    python -m scripts.benchmarks.benchmark_celery_routing \\
+        --broker redis://127.0.0.1:6379/15 --bulk 200 --payments 20
+"""
+
+import argparse
+import contextlib
+import time
+
+from celery.contrib.testing.worker import start_worker
+
+from src.config import settings
+
+
+PAYMENT_TASK = "src.api.payments.utils.check_cash_in_status"
+BULK_TASK = "src.helper.utils.send_email_batch"
+ALL_QUEUES = [queue.name for queue in settings.CELERY_TASK_QUEUES]
+
+
+def make_app(broker: str):
+    settings.CELERY_BROKER_URL = broker
+    settings.CELERY_RESULT_BACKEND = broker
+    settings.CELERY_BEAT_SCHEDULE = {}
+    from src.celery_utils import create_celery
+
+    app = create_celery()
+    app.conf.imports = ()
+
+    @app.task(name="bench.payment")
+    def payment(sent_at: float) -> float:
+        return time.time() - sent_at
+
+    @app.task(name="bench.bulk")
+    def bulk(seconds: float):
+        time.sleep(seconds)
+
+    return app, payment, bulk
+
+
+def route_of(app, name: str) -> dict:
+    route = app.amqp.router.route({}, name)
+    return {"queue": route["queue"].name, "priority": route.get("priority")}
+
+
+def run(app, payment, bulk, workers: list[list[str]], args) -> list[float]:
+    app.control.purge()
+    with contextlib.ExitStack() as stack:
+        for queues in workers:
+            stack.enter_context(
+                start_worker(
+                    app,
+                    concurrency=1,
+                    pool="solo",
+                    perform_ping_check=False,
+                    queues=queues,
+                )
+            )
+
+        for _ in range(args.bulk):
+            bulk.apply_async(args=(args.bulk_seconds,), **route_of(app, BULK_TASK))
+        results = []
+        for _ in range(args.payments):
+            results.append(
+                payment.apply_async(args=(time.time(),), **route_of(app, PAYMENT_TASK))
+            )
+            time.sleep(args.bulk_seconds)
+        waits = [
+            result.get(timeout=args.bulk * args.bulk_seconds + 60) for result in results
+        ]
+        app.control.purge()
+    return sorted(waits)
+
+
+def report(name: str, waits: list[float]):
+    median = waits[len(waits) // 2] * 1000
+    worst = waits[-1] * 1000
+    print(f"{name:32} payment wait median {median:8.1f} ms  worst {worst:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--broker",
+        default=settings.CELERY_BROKER_URL,
+        help="Redis url, purged before and after each run",
+    )
+    parser.add_argument("--bulk", type=int, default=200)
+    parser.add_argument("--bulk-seconds", type=float, default=0.05)
+    parser.add_argument("--payments", type=int, default=20)
+    args = parser.parse_args()
+
+    app, payment, bulk = make_app(args.broker)
+    report("one worker, every queue", run(app, payment, bulk, [ALL_QUEUES], args))
+    report(
+        "one worker per queue",
+        run(app, payment, bulk, [[queue] for queue in ALL_QUEUES], args),
+    )
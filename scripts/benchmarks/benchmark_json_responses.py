@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the JSON rendering of the list endpoints, with the stock FastAPI
+serialization and with the fast path (FAST_JSON_RESPONSE).
+
+Only the rendering is measured (no database, no HTTP): the pages are built
+from in-memory User objects and student application rows, then rendered with
+the response model of the real route.
+
+    python -m scripts.benchmarks.benchmark_json_responses \\
+        --page-size 100 --iterations 500
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+
+from src.config import settings
+from src.helper.cache import render_response
+from src.main import app
+from src.api.user.models import User
+
+
+def find_route(path: str) -> APIRoute:
+    return next(
+        r
+        for r in app.routes
+        if isinstance(r, APIRoute) and r.path == path and "GET" in r.methods
+    )
+
+
+def users_page(size: int) -> dict:
+    now = datetime.now(timezone.utc)
+    users = [
+        User(
+            id=f"user-{i}",
+            first_name="Awa",
+            last_name="Ndiaye",
+            birth_date=date(1990, 1, 1),
+            civility="Mme",
+            country_code="SN",
+            mobile_number="770000000",
+            fix_number=None,
+            email=f"user{i}@example.com",
+            password="hashed",
+            picture=None,
+            status="active",
+            lang="fr",
+            web_token=None,
+            last_login=now,
+            user_type="student",
+            two_factor_enabled=False,
+            moodle_user_id=None,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(size)
+    ]
+    return {"data": users, "page": 1, "number": size, "total_number": size * 10}
+
+
+def student_applications_page(size: int) -> dict:
+    now = datetime.now(timezone.utc)
+    rows = [
+        SimpleNamespace(
+            id=i,
+            user_id=f"user-{i}",
+            training_id="training-1",
+            target_session_id="session-1",
+            application_number=f"APP-{i:06d}",
+            status="SUBMITTED",
+            payment_id=None,
+            refusal_reason=None,
+            registration_fee=10000.0,
+            training_fee=250000.0,
+            currency="XAF",
+            training_title="Formation",
+            training_session_start_date=date(2025, 1, 1),
+            training_session_end_date=date(2025, 6, 30),
+            user_email=f"user{i}@example.com",
+            user_first_name="Awa",
+            user_last_name="Ndiaye",
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(size)
+    ]
+    return {"data": rows, "page": 1, "number": size, "total_number": size * 10}
+
+
+async def measure(route: APIRoute, payload: dict, iterations: int) -> list:
+    request = Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": route.path,
+            "headers": [],
+            "route": route,
+        }
+    )
+    for _ in range(min(iterations, 50)):  # warm up (TypeAdapter build, caches)
+        await render_response(request, payload)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await render_response(request, payload)
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)
+
+
+def percentile(timings: list, rank: float) -> float:
+    return timings[min(len(timings) - 1, int(len(timings) * rank))]
+
+
+async def main(page_size: int, iterations: int):
+    cases = [
+        ("/api/v1/users", users_page(page_size)),
+        ("/api/v1/student-applications", student_applications_page(page_size)),
+    ]
+    print(f"page size {page_size}, {iterations} iterations (ms)")
+    print(f"{'endpoint':32} {'mode':8} {'p50':>8} {'p99':>8} {'mean':>8}")
+    for path, payload in cases:
+        route = find_route(path)
+        for mode, fast in (("stock", False), ("fast", True)):
+            settings.FAST_JSON_RESPONSE = fast
+            timings = await measure(route, payload, iterations)
+            p50, p99 = percentile(timings, 0.5), percentile(timings, 0.99)
+            mean = statistics.mean(timings)
+            print(f"{path:32} {mode:8} {p50:8.3f} {p99:8.3f} {mean:8.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.page_size, args.iterations))
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Compare the number of SQL statements (and the time) of the previous loading
+options with the loader profiles, on an in-memory SQLite database.
+
+    python -m scripts.benchmarks.benchmark_loader_profiles --rows 50
+"""
+
+import argparse
+import time
+from datetime import date, datetime, timezone
+
+from sqlalchemy.orm import selectinload
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import src.main  # noqa: F401  (registers every model)
+from src.api.cabinet.models import CabinetApplication
+from src.api.cabinet.schemas import CabinetApplicationOut
+from src.api.cabinet.service import CABINET_APPLICATION_LOADERS
+from src.api.job_offers.models import JobApplication, JobAttachment, JobOffer
+from src.api.job_offers.service import JOB_APPLICATION_LOADERS
+from src.api.training.models import (
+    StudentApplication,
+    StudentAttachment,
+    Training,
+    TrainingSession,
+)
+from src.api.training.services.student_application import STUDENT_APPLICATION_LOADERS
+from src.api.user.models import User
+from src.api.user.service import USER_LOADERS
+from src.helper.query_budget import query_budget
+
+
+def seed(session: Session, rows: int):
+    now = datetime.now(timezone.utc)
+    training = Training(
+        id="training-1",
+        title="Formation",
+        specialty_id=1,
+        created_at=now,
+        updated_at=now,
+    )
+    training_session = TrainingSession(
+        id="session-1",
+        training_id=training.id,
+        registration_deadline=date(2030, 1, 1),
+        created_at=now,
+        updated_at=now,
+    )
+    job_offer = JobOffer(
+        id="offer-1",
+        reference="REF-1",
+        title="Offre",
+        location="Dakar",
+        postal_code="10000",
+        contract_type="CDI",
+        submission_deadline=date(2030, 1, 1),
+        created_at=now,
+        updated_at=now,
+    )
+    session.add_all([training, training_session, job_offer])
+    for i in range(rows):
+        user = User(
+            id=f"user-{i}",
+            first_name="Awa",
+            last_name="Ndiaye",
+            email=f"user{i}@example.com",
+            password="x",
+            created_at=now,
+            updated_at=now,
+        )
+        application = StudentApplication(
+            id=i + 1,
+            user_id=user.id,
+            training_id=training.id,
+            target_session_id=training_session.id,
+            application_number=f"APP-{i}",
+            created_at=now,
+            updated_at=now,
+        )
+        job_application = JobApplication(
+            id=i + 1,
+            job_offer_id=job_offer.id,
+            application_number=f"JOB-{i}",
+            email=user.email,
+            phone_number="770000000",
+            first_name="Awa",
+            last_name="Ndiaye",
+            submission_fee=0,
+            created_at=now,
+            updated_at=now,
+        )
+        cabinet = CabinetApplication(
+            id=f"cabinet-{i}",
+            company_name="Cabinet",
+            contact_email=f"cabinet{i}@example.com",
+            contact_phone="770000000",
+            address="Avenue Cheikh Anta Diop, Dakar",
+            registration_number=f"SN-DKR-{i:04d}",
+            experience_years=5,
+            created_at=now,
+            updated_at=now,
+        )
+        session.add_all([user, application, job_application, cabinet])
+        session.add_all(
+            [
+                StudentAttachment(
+                    id=i * 2 + 1,
+                    application_id=application.id,
+                    document_type="CV",
+                    file_path="uploads/cv.pdf",
+                    created_at=now,
+                    updated_at=now,
+                ),
+                StudentAttachment(
+                    id=i * 2 + 2,
+                    application_id=application.id,
+                    document_type="ID",
+                    file_path="uploads/id.pdf",
+                    created_at=now,
+                    updated_at=now,
+                ),
+                JobAttachment(
+                    id=i + 1,
+                    application_id=job_application.id,
+                    document_type="CV",
+                    file_path="uploads/cv.pdf",
+                    name="cv.pdf",
+                    created_at=now,
+                    updated_at=now,
+                ),
+            ]
+        )
+    session.commit()
+
+
+def previous_queries():
+    return {
+        "student application detail": (
+            select(StudentApplication)
+            .where(StudentApplication.id == 1)
+            .options(selectinload(StudentApplication.training))
+            .options(selectinload(StudentApplication.training_session))
+            .options(selectinload(StudentApplication.attachments))
+        ),
+        "student applications export": (
+            select(StudentApplication)
+            .options(selectinload(StudentApplication.user))
+            .options(selectinload(StudentApplication.training))
+            .options(selectinload(StudentApplication.training_session))
+            .options(selectinload(StudentApplication.attachments))
+        ),
+        "job application detail": (
+            select(JobApplication)
+            .where(JobApplication.id == 1)
+            .options(selectinload(JobApplication.job_offer))
+            .options(selectinload(JobApplication.attachments))
+        ),
+        "job applications page": select(JobApplication),
+        "cabinet applications page": select(CabinetApplication),
+        "session members": select(User),
+    }
+
+
+def profile_queries():
+    return {
+        "student application detail": STUDENT_APPLICATION_LOADERS.apply(
+            select(StudentApplication).where(StudentApplication.id == 1), "detail"
+        ),
+        "student applications export": STUDENT_APPLICATION_LOADERS.apply(
+            select(StudentApplication), "admin"
+        ),
+        "job application detail": JOB_APPLICATION_LOADERS.apply(
+            select(JobApplication).where(JobApplication.id == 1), "detail"
+        ),
+        "job applications page": JOB_APPLICATION_LOADERS.apply(
+            select(JobApplication), "list"
+        ),
+        "cabinet applications page": CABINET_APPLICATION_LOADERS.apply(
+            select(CabinetApplication), "list"
+        ),
+        "session members": USER_LOADERS.apply(select(User), "list"),
+    }
+
+
+def run(engine, statement, iterations: int, convert=None):
+    timings = []
+    for _ in range(iterations):
+        with Session(engine) as session:
+            with query_budget(1000, mode="off") as budget:
+                started = time.perf_counter()
+                rows = session.exec(statement).unique().all()
+                if convert is not None:
+                    [convert(row) for row in rows]
+                timings.append((time.perf_counter() - started) * 1000)
+    return len(budget.statements), sorted(timings)[len(timings) // 2]
+
+
+# CabinetApplicationService list methods, before / after
+CONVERTERS = {
+    "cabinet applications page": (
+        lambda row: CabinetApplicationOut.model_validate(row.model_dump()),
+        lambda row: CabinetApplicationOut.model_validate(row, from_attributes=True),
+    ),
+}
+
+
+def main(rows: int, iterations: int):
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, rows)
+
+    previous, profiles = previous_queries(), profile_queries()
+    print(f"{rows} rows per table, median of {iterations} runs")
+    print(f"{'query':30} {'before':>14} {'profile':>14}")
+    for name in previous:
+        convert_before, convert_after = CONVERTERS.get(name, (None, None))
+        before_count, before_ms = run(
+            engine, previous[name], iterations, convert_before
+        )
+        after_count, after_ms = run(engine, profiles[name], iterations, convert_after)
+        print(
+            f"{name:30} {before_count:3d} q {before_ms:7.2f}ms "
+            f"{after_count:3d} q {after_ms:7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    main(args.rows, args.iterations)
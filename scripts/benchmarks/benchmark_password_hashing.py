@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Login throughput per core and event loop stalls of bcrypt run inline (as
+before) or in the password process pool, and the cost of a refresh token
+check with bcrypt or with the HMAC digest.
+
+    python -m scripts.benchmarks.benchmark_password_hashing --logins 32 --rounds 12
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from src.config import settings
+
+
+async def ticker(stop: asyncio.Event, lags: list):
+    """Measure how late a 10 ms timer fires: the stall seen by the other requests"""
+
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - started - 0.01)
+
+
+async def burst(logins: int, verify) -> tuple[float, float]:
+    stop, lags = asyncio.Event(), []
+    tick = asyncio.create_task(ticker(stop, lags))
+    await asyncio.sleep(0.02)
+    started = time.perf_counter()
+    await asyncio.gather(*(verify() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await tick
+    return elapsed, max(lags)
+
+
+async def main(logins: int):
+    # imported once the cost is set: the context reads it at import time
+    from src.helper.password_helper import PasswordHelper, pwd_context, token_digest
+
+    hashed = pwd_context.hash("correct horse battery staple")
+
+    started = time.perf_counter()
+    for _ in range(4):
+        pwd_context.verify("correct horse battery staple", hashed)
+    per_login = (time.perf_counter() - started) / 4
+    print(
+        f"bcrypt cost {settings.PASSWORD_BCRYPT_ROUNDS}: {per_login * 1000:.0f} ms "
+        f"a login, {1 / per_login:.1f} logins/s per core"
+    )
+
+    async def inline():
+        pwd_context.verify("correct horse battery staple", hashed)
+
+    async def pooled():
+        await PasswordHelper.verify("correct horse battery staple", hashed)
+
+    await asyncio.gather(
+        *(pooled() for _ in range(settings.PASSWORD_HASH_WORKERS))
+    )  # start the workers
+    for name, verify in (
+        ("inline", inline),
+        (f"pool of {settings.PASSWORD_HASH_WORKERS}", pooled),
+    ):
+        elapsed, lag = await burst(logins, verify)
+        print(
+            f"{logins} logins {name:10} {logins / elapsed:6.1f} logins/s, "
+            f"worst event loop stall {lag * 1000:7.1f} ms"
+        )
+
+    token = os.urandom(84).hex()
+    token_hash = pwd_context.hash(token)
+    digest = token_digest(token)
+    started = time.perf_counter()
+    pwd_context.verify(token, token_hash)
+    bcrypt_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    for _ in range(10000):
+        await PasswordHelper.verify_token(token, digest)
+    hmac_ms = (time.perf_counter() - started) * 1000 / 10000
+    print(
+        f"refresh token check: bcrypt {bcrypt_ms:.1f} ms, "
+        f"HMAC-SHA256 {hmac_ms * 1000:.1f} us"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=settings.PASSWORD_BCRYPT_ROUNDS)
+    parser.add_argument("--workers", type=int, default=settings.PASSWORD_HASH_WORKERS)
+    args = parser.parse_args()
+    # the spawned workers read the settings from the environment
+    os.environ["PASSWORD_BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    settings.PASSWORD_BCRYPT_ROUNDS = args.rounds
+    settings.PASSWORD_HASH_WORKERS = args.workers
+    asyncio.run(main(args.logins))
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Memory used by the Redis keys, grouped by namespace: the key with its ids
+replaced by "*", cut after --depth segments, e.g. "lafaom:celery-task-meta-*",
+"lafaom:otp:two_factor", "lafaom:task_status:*". SCAN + MEMORY USAGE
+(pipelined), safe on a live server.
+
+    python -m scripts.benchmarks.redis_memory_report \\
+        --redis redis://127.0.0.1:6379/0 --depth 3 --top 30
+"""
+
+import argparse
+import re
+from collections import defaultdict
+
+import redis
+
+from src.config import settings
+
+
+# uuids, hex digests, numbers and emails inside a key segment
+_ID = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+    r"|[0-9a-f]{16,}|\d+|[^:@\s]+@[^:\s]+",
+    re.I,
+)
+
+
+def namespace(key: str, depth: int) -> str:
+    return ":".join(_ID.sub("*", segment) for segment in key.split(":")[:depth])
+
+
+def report(client: redis.Redis, match: str, depth: int, batch: int) -> dict:
+    groups = defaultdict(lambda: {"keys": 0, "bytes": 0, "no_ttl": 0})
+    cursor = 0
+    while True:
+        cursor, keys = client.scan(cursor, match=match, count=batch)
+        if keys:
+            pipe = client.pipeline(transaction=False)
+            for key in keys:
+                pipe.memory_usage(key, samples=0)
+                pipe.ttl(key)
+            values = pipe.execute()
+            for key, size, ttl in zip(keys, values[::2], values[1::2]):
+                group = groups[namespace(key, depth)]
+                group["keys"] += 1
+                group["bytes"] += size or 0
+                group["no_ttl"] += ttl == -1
+        if cursor == 0:
+            return groups
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--redis",
+        action="append",
+        help="Redis url (repeatable), the cache and the Celery broker / backend "
+        "by default",
+    )
+    parser.add_argument("--match", default=f"{settings.REDIS_NAMESPACE}:*")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--top", type=int, default=30)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    urls = args.redis or list(
+        dict.fromkeys(
+            [
+                settings.REDIS_CACHE_URL,
+                settings.CELERY_BROKER_URL,
+                settings.CELERY_RESULT_BACKEND,
+            ]
+        )
+    )
+    for url in urls:
+        client = redis.Redis.from_url(url, decode_responses=True)
+        groups = report(client, args.match, args.depth, args.batch)
+        used = client.info("memory")["used_memory"]
+        total = sum(group["bytes"] for group in groups.values())
+        keys = sum(group["keys"] for group in groups.values())
+        print(
+            f"\n{url}: used_memory {used / 1048576:.1f} MiB, "
+            f"{total / 1048576:.1f} MiB in {keys} keys matching {args.match}"
+        )
+        print(f"{'namespace':60} {'keys':>9} {'MiB':>9} {'avg B':>8} {'no TTL':>8}")
+        largest = sorted(groups.items(), key=lambda item: -item[1]["bytes"])
+        for name, group in largest[: args.top]:
+            count, size, no_ttl = group["keys"], group["bytes"], group["no_ttl"]
+            mib = size / 1048576
+            print(f"{name:60} {count:9} {mib:9.2f} {size // count:8} {no_ttl:8}")
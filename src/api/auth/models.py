@@ -1,3 +1,4 @@
+from sqlalchemy import Index
 from sqlmodel import   TIMESTAMP, Field,Relationship,SQLModel
 from datetime import datetime
 from src.helper.model import CustomBaseModel,CustomBaseUUIDModel
@@ -8,9 +9,15 @@ from src.api.user.models import User
 
 class RefreshToken(CustomBaseUUIDModel,table=True):
     __tablename__ = "refresh_token"
-    token : str = Field(nullable=False)
+    __table_args__ = (
+        Index("ix_refresh_token_user_id_expires_at", "user_id", "expires_at"),
+    )
+    token : str = Field(nullable=False, index=True)
     user_id : str = Field(nullable=False)
-    expires_at: datetime = Field(sa_type=TIMESTAMP(timezone=True), nullable=False) 
+    expires_at: datetime = Field(sa_type=TIMESTAMP(timezone=True), nullable=False, index=True) 
+    # the tokens rotated from the same login share a family (the id of its first token)
+    family_id : Optional[str] = Field(default=None, index=True)
+    revoked_at : Optional[datetime] = Field(default=None, sa_type=TIMESTAMP(timezone=True), nullable=True)
 
     
     
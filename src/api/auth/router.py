@@ -5,8 +5,12 @@ from src.api.auth.schemas import ( ChangeEmailInput, ClientACcessTokenInput, For
                                 RefreshTokenInput, UpdateUserProfile,UserTokenOut,UpdatePasswordInput,AuthCodeInput, ValidateChangeCodeInput, ValidateForgottenCodeInput)
 
 from src.api.auth.utils import (get_all_keys, get_current_active_user, make_access_token,verify_password,
-                                generate_random_code,create_access_token)
+                                generate_random_code,create_access_token,check_code_status,too_many_code_requests)
 from src.helper.file_helper import FileHelper
+from src.helper.image_helper import ImageHelper
+from src.helper.password_helper import PasswordHelper
+from src.helper.rate_limit import rate_limit
+from src.helper.session_store import SessionStore
 from src.helper.notifications import (ChangeAccountNotification,ForgottenPasswordNotification, LoginAlertNotification, TwoFactorAuthNotification)
 from src.config import settings
 from src.api.user.service import UserService
@@ -14,19 +18,22 @@ from src.api.auth.service import AuthService
 from src.api.user.schemas import  PermissionListOutSuccess, RoleOutSuccess, UserFullOutSuccess, UserOutSuccess
 from src.helper.schemas import ErrorMessage,BaseOutFail,BaseOutSuccess
 from datetime import datetime, timezone
+import logging
 import re
 
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.post("/token", response_model=UserTokenOut | BaseOutSuccess)
+@router.post("/token", response_model=UserTokenOut | BaseOutSuccess, dependencies=[Depends(rate_limit("auth_token"))])
 async def login_for_access_token( request: Request,
     form_data: LoginInput, user_service: UserService = Depends(), token_service: AuthService = Depends()
 ) -> UserTokenOut | BaseOutSuccess:
     user = await user_service.get_full_by_email(form_data.email)
-    if not user or not verify_password(form_data.password, user.password):
+    valid, password_hash = await PasswordHelper.verify_and_update(form_data.password, user.password) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=BaseOutFail(
@@ -38,7 +45,8 @@ async def login_for_access_token( request: Request,
     
     if user.two_factor_enabled:
         code = generate_random_code()
-        token_service.save_two_factor_code(user_id=user.id, email=form_data.email, code=code)
+        if not await token_service.save_two_factor_code(user_id=user.id, email=form_data.email, code=code):
+            raise too_many_code_requests()
         TwoFactorAuthNotification(
             email=user.email,
             code=code,
@@ -53,7 +61,7 @@ async def login_for_access_token( request: Request,
     refresh_token, token = await token_service.generate_refresh_token(user_id=user.id)
     access_token = create_access_token(data={"sub": user.id})
     
-    await user_service.update_last_login(user_id=user.id)
+    await user_service.update_last_login(user_id=user.id, password_hash=password_hash)
     
 
     return {
@@ -65,46 +73,19 @@ async def login_for_access_token( request: Request,
         "user": user
     }
 
-@router.post("/two-factor-token", response_model=UserTokenOut)
+@router.post("/two-factor-token", response_model=UserTokenOut, dependencies=[Depends(rate_limit("auth_code"))])
 async def two_factor_token(response: Response,request: Request,
     form_data: ValidateChangeCodeInput, user_service: UserService = Depends(), token_service: AuthService = Depends()
 ) -> UserTokenOut:
 
-    code = await token_service.get_two_factor_code(email=form_data.email,code=form_data.code)   
-    
-    if  code == None :
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=BaseOutFail(
-                    message=ErrorMessage.EMAIL_NOT_FOUND.description,
-                    error_code= ErrorMessage.EMAIL_NOT_FOUND.value
-                ).model_dump()
-        )
-    if not code.active  : 
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=BaseOutFail(
-                    message=ErrorMessage.CODE_ALREADY_USED.description,
-                    error_code= ErrorMessage.CODE_ALREADY_USED.value
-                ).model_dump()
-        )
-    if code.end_time.tzinfo is None:
-        code.end_time = code.end_time.replace(tzinfo=timezone.utc)           
-    if code.end_time <= datetime.now(timezone.utc)  : 
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=BaseOutFail(
-                    message=ErrorMessage.CODE_HAS_EXPIRED.description,
-                    error_code= ErrorMessage.CODE_HAS_EXPIRED.value
-                ).model_dump()
-        )
-    user = await user_service.get_full_by_id(user_id=code.user_id)
+    code_status, code = await token_service.consume_two_factor_code(email=form_data.email,code=form_data.code)   
+    check_code_status(code_status)
+    user = await user_service.get_full_by_id(user_id=code["user_id"])
     
     
     refresh_token, token = await token_service.generate_refresh_token(user_id=user.id)
     
     access_token = create_access_token(data={"sub": user.id})
-    await token_service.make_two_factor_code_used(id=code.id)
 
     return {
             "access_token" : Token(
@@ -121,7 +102,7 @@ async def get_token_from_refresh_token(request: Request,
     
     token = await token_service.get_by_token(id=form_data.device_id)   
 
-    if token is None or not verify_password(form_data.refresh_token,token.token  ):
+    if token is None or not await PasswordHelper.verify_token(form_data.refresh_token,token.token  ):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=BaseOutFail(
@@ -143,6 +124,27 @@ async def get_token_from_refresh_token(request: Request,
                 ).model_dump()
         )
 
+    reused = token.revoked_at is not None
+    rotated = None
+    if not reused and await SessionStore.is_active(token.user_id, token.family_id) is not False:
+        # rotation: the used token is revoked, the client keeps the new one and its device_id
+        rotated = await token_service.rotate_refresh_token(token)
+        # None: a concurrent refresh claimed the same token first
+        reused = rotated is None
+    if rotated is None:
+        # a token already rotated is used again (stolen copy or replay): the whole session is revoked
+        if reused:
+            logger.warning("Refresh token reuse detected, session revoked", extra={"user_id": token.user_id})
+        await token_service.revoke_refresh_token_family(user_id=token.user_id, family_id=token.family_id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=BaseOutFail(
+                message=ErrorMessage.REFRESH_TOKEN_REVOKED.description,
+                error_code=ErrorMessage.REFRESH_TOKEN_REVOKED.value,
+            ).model_dump(),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    refresh_token, new_token = rotated
 
     user = await user_service.get_full_by_id(user_id=token.user_id )
     
@@ -153,13 +155,37 @@ async def get_token_from_refresh_token(request: Request,
     
     return {
             "access_token" : Token(
-                token=access_token, token_type="bearer", expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,refresh_token= form_data.refresh_token,device_id = form_data.device_id  
+                token=access_token, token_type="bearer", expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,refresh_token= new_token,device_id = refresh_token.id  
             ),
             "user" : user
         }
 
 
-@router.post("/password-forgotten")
+@router.post("/logout")
+async def logout(
+    current_user: Annotated[User, Depends(get_current_active_user)], form_data: RefreshTokenInput, token_service : Annotated[AuthService, Depends()]
+):
+    """Revoke the session (refresh token family) of this device"""
+
+    token = await token_service.get_by_token(id=form_data.device_id)
+    if token is not None and token.user_id == current_user.id and await PasswordHelper.verify_token(form_data.refresh_token, token.token):
+        await token_service.revoke_refresh_token_family(user_id=current_user.id, family_id=token.family_id)
+
+    return {"message": "Logged out successfully", "data": {}, "success": True}
+
+
+@router.post("/logout-all")
+async def logout_all(
+    current_user: Annotated[User, Depends(get_current_active_user)], token_service : Annotated[AuthService, Depends()]
+):
+    """Revoke every session of the user"""
+
+    await token_service.revoke_user_refresh_tokens(user_id=current_user.id)
+
+    return {"message": "Logged out from every device successfully", "data": {}, "success": True}
+
+
+@router.post("/password-forgotten", dependencies=[Depends(rate_limit("password_forgotten"))])
 async def password_forgotten(
     input: ForgottenPasswordInput,  token_service : Annotated[AuthService, Depends()], user_service : Annotated[UserService , Depends()],
 ):
@@ -179,14 +205,14 @@ async def password_forgotten(
     
     code = generate_random_code()  
 
-    save_code  = await token_service.save_forgotten_password_code(user_id=user.id,email=input.email,code=code)
-    
-    ForgottenPasswordNotification(
-            email=user.email,
-            code=code,
-            time = 30,
-            
-        ).send_notification()
+    # rate limited: same answer as an unknown email, without sending a code
+    if await token_service.save_forgotten_password_code(user_id=user.id,email=input.email,code=code):
+        ForgottenPasswordNotification(
+                email=user.email,
+                code=code,
+                time = 30,
+                
+            ).send_notification()
     
     
     
@@ -199,46 +225,15 @@ async def password_forgotten(
         }
 
 
-@router.post("/validate-password-forgotten-code",response_model=UserTokenOut)
+@router.post("/validate-password-forgotten-code",response_model=UserTokenOut, dependencies=[Depends(rate_limit("auth_code"))])
 async def validate_forgotten_password_code(response: Response,
     validate_input: ValidateForgottenCodeInput, user_service : Annotated[UserService , Depends()], token_service : Annotated[AuthService, Depends()]
 ):
 
-    code = await token_service.get_forgotten_password_code(email=validate_input.email,code=validate_input.code)   
+    code_status, code = await token_service.consume_forgotten_password_code(email=validate_input.email,code=validate_input.code)   
+    check_code_status(code_status)
     
-    if  code == None :
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=BaseOutFail(
-                    message=ErrorMessage.EMAIL_NOT_FOUND.description,
-                    error_code= ErrorMessage.EMAIL_NOT_FOUND.value
-                ).model_dump()
-        )
-        
-    if not code.active  : 
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=BaseOutFail(
-                    message=ErrorMessage.CODE_ALREADY_USED.description,
-                    error_code= ErrorMessage.CODE_ALREADY_USED.value
-                ).model_dump()
-        )
-        
-    if code.end_time.tzinfo is None:
-        code.end_time = code.end_time.replace(tzinfo=timezone.utc)           
-    if code.end_time <= datetime.now(timezone.utc)  : 
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=BaseOutFail(
-                    message=ErrorMessage.CODE_HAS_EXPIRED.description,
-                    error_code= ErrorMessage.CODE_HAS_EXPIRED.value
-                ).model_dump()
-        )
-        
-    
-    
-    user = await user_service.update_password( user_id= code.user_id,password= validate_input.password )
-    await token_service.make_forgotten_password_used(id=code.id)
+    user = await user_service.update_password( user_id= code["user_id"],password= validate_input.password )
     
     refresh_token, token = await token_service.generate_refresh_token(user_id=user.id)
     
@@ -260,7 +255,7 @@ async def change_email(
     current_user: Annotated[User, Depends(get_current_active_user)],input: ChangeEmailInput, user_service : Annotated[UserService , Depends()], token_service : Annotated[AuthService, Depends()]
 ):
 
-    if not verify_password(input.password  , current_user.password) :
+    if not await verify_password(input.password  , current_user.password) :
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=BaseOutFail(
@@ -284,7 +279,8 @@ async def change_email(
     
     code = generate_random_code()  
 
-    save_code  = await token_service.save_change_email_code(user_id=current_user.id,email=input.email,code=code)
+    if not await token_service.save_change_email_code(user_id=current_user.id,email=input.email,code=code):
+        raise too_many_code_requests()
     
     
     ChangeAccountNotification(
@@ -311,37 +307,10 @@ async def validate_change_email_code(
     current_user: Annotated[User, Depends(get_current_active_user)],validate_input: ValidateChangeCodeInput, user_service : Annotated[UserService , Depends()], token_service : Annotated[AuthService, Depends()]
 ):
 
-    code = await token_service.get_change_email_code(email=validate_input.email,code=validate_input.code,user_id =current_user.id)   
-    
-    if  code == None :
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=BaseOutFail(
-                    message=ErrorMessage.EMAIL_NOT_FOUND.description,
-                    error_code= ErrorMessage.EMAIL_NOT_FOUND.value
-                ).model_dump()
-        )
-    if not code.active  : 
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=BaseOutFail(
-                    message=ErrorMessage.CODE_ALREADY_USED.description,
-                    error_code= ErrorMessage.CODE_ALREADY_USED.value
-                ).model_dump()
-        )
-    if code.end_time.tzinfo is None:
-        code.end_time = code.end_time.replace(tzinfo=timezone.utc)           
-    if code.end_time <= datetime.now(timezone.utc)  : 
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=BaseOutFail(
-                    message=ErrorMessage.CODE_HAS_EXPIRED.description,
-                    error_code= ErrorMessage.CODE_HAS_EXPIRED.value
-                ).model_dump()
-        )
+    code_status, code = await token_service.consume_change_email_code(email=validate_input.email,code=validate_input.code,user_id =current_user.id)   
+    check_code_status(code_status)
 
-    user = await user_service.update_phone_or_email( user_id= code.user_id,email=code.email  )
-    await token_service.make_change_email_used(id=code.id)
+    user = await user_service.update_phone_or_email( user_id= code["user_id"],email=code["email"]  )
     user = await user_service.get_full_by_id(user_id=current_user.id)
     
     return {
@@ -431,7 +400,7 @@ async def update_profile(
 async def update_password(
     current_user: Annotated[User, Depends(get_current_active_user)],update_input: UpdatePasswordInput, user_service : Annotated[UserService , Depends()]
 ):
-    if not verify_password(update_input.password  , current_user.password) :
+    if not await verify_password(update_input.password  , current_user.password) :
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=BaseOutFail(
@@ -457,9 +426,11 @@ async def update_profile_image(
     try :
         document , _ , _ = await FileHelper.upload_file(file=image,location="/profile", name = name)
         FileHelper.delete_file(current_user.picture)
+        ImageHelper.delete_derivatives(current_user.picture)
+        ImageHelper.schedule_derivatives(document)
     
-    except Exception as e :
-        print("Error when uploading profile image :" ,e)
+    except Exception:
+        logger.exception("Error when uploading profile image")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=BaseOutFail(
@@ -43,7 +43,6 @@ class PhoneUtil():
     def __init__(self,number:str,country:str = None) -> None:
         try :
             self._value = phonenumbers.parse(number,country)
-            print(self._value)
         except :   
             self._value = None 
             
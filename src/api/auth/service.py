@@ -1,38 +1,96 @@
+from typing import Optional
 from fastapi import Depends
 import secrets
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database import get_session_async
-from src.api.auth.models import RefreshToken,ForgottenPAsswordCode,ChangeEmailCode, TwoFactorCode
+from src.api.auth.models import RefreshToken
 
 
+from sqlalchemy import update
 from sqlmodel import select, delete
 from datetime import timedelta,datetime,timezone
-from passlib.context import CryptContext
-from src.api.auth.utils import get_password_hash
 from src.config import settings
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from src.helper.otp_store import OtpPurpose, OtpStatus, OtpStore
+from src.helper.password_helper import token_digest
+from src.helper.session_store import SessionStore
 
 class AuthService:
     def __init__(self, session: AsyncSession = Depends(get_session_async)) -> None:
         self.session = session
 
-    async def generate_refresh_token(self, user_id:str,expires_delta: timedelta | None = None  ):
-        
-        expires_at = datetime.now(timezone.utc) + (expires_delta if expires_delta else timedelta(minutes=3600))
+    async def generate_refresh_token(self, user_id:str,expires_delta: timedelta | None = None, family_id: Optional[str] = None  ):
+        """
+        Store a new refresh token (its HMAC) and return it with its row, the
+        row id being the device_id of the client. Without `family_id` it
+        starts a new session.
+        """
+
+        expires_at = datetime.now(timezone.utc) + (expires_delta if expires_delta else timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES))
         token = secrets.token_urlsafe(112)  # Generate a random token
-            
-        # Check if the token already exists in the database
-        
-        existing_token = await self.get_by_token(token)
-        if existing_token is None:
-            # If not, store it and return
-            new_access_token = RefreshToken(token=  get_password_hash(token) , user_id=user_id,expires_at = expires_at)
-            await self.session.merge(new_access_token)
-            await self.session.commit()
-            return new_access_token ,token
-
-    
+
+        refresh_token = RefreshToken(token=  token_digest(token) , user_id=user_id,expires_at = expires_at)
+        refresh_token.family_id = family_id or refresh_token.id
+        self.session.add(refresh_token)
+        await self.session.commit()
+        if family_id is None:
+            # new session: the set is rebuilt from the table, so the sessions
+            # it missed (older logins, evicted set) stay active
+            await SessionStore.replace(user_id, await self.get_active_families(user_id))
+        else:
+            await SessionStore.touch(user_id)
+        return refresh_token ,token
+
+    async def get_active_families(self, user_id: str) -> list[str]:
+        statement = (
+            select(RefreshToken.family_id)
+            .where(RefreshToken.user_id == user_id, RefreshToken.expires_at >= datetime.now(timezone.utc), RefreshToken.revoked_at.is_(None))
+            .distinct()
+        )
+        result = await self.session.execute(statement)
+        return [family_id for family_id in result.scalars() if family_id]
+
+    async def rotate_refresh_token(self, refresh_token: RefreshToken):
+        """
+        Revoke a used refresh token and issue its successor in the same
+        session. The token is claimed by one conditional UPDATE, so of two
+        concurrent refreshes with the same token only one gets a successor:
+        None for the other (a reuse).
+        """
+
+        claimed = await self.session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == refresh_token.id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+            .returning(RefreshToken.id)
+        )
+        if claimed.scalar_one_or_none() is None:
+            return None
+        return await self.generate_refresh_token(user_id=refresh_token.user_id, family_id=refresh_token.family_id)
+
+    async def revoke_refresh_token_family(self, user_id: str, family_id: str):
+        """Log a session out: every token of the family is revoked"""
+
+        statement = (
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+        )
+        await self.session.execute(statement)
+        await self.session.commit()
+        await SessionStore.remove(user_id, family_id)
+
+    async def revoke_user_refresh_tokens(self, user_id: str):
+        """Log out everywhere"""
+
+        now = datetime.now(timezone.utc)
+        statement = (
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.expires_at >= now, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=now)
+        )
+        await self.session.execute(statement)
+        await self.session.commit()
+        await SessionStore.clear(user_id)
 
     async def get_by_token(self, id: str):
         statement = select(RefreshToken).where(RefreshToken.id == id)
@@ -40,7 +98,7 @@ class AuthService:
         return result.scalar_one_or_none()
 
     async def get_by_token_valid(self, token: str):
-        statement = select(RefreshToken).where(RefreshToken.token == token).where(RefreshToken.expires_at >= datetime.now(timezone.utc))
+        statement = select(RefreshToken).where(RefreshToken.token == token_digest(token)).where(RefreshToken.expires_at >= datetime.now(timezone.utc))
         result = await self.session.execute(statement)
         return result.scalar_one_or_none()
 
@@ -49,86 +107,24 @@ class AuthService:
         await self.session.execute(statement)
         await self.session.commit()
 
-    async def get_forgotten_password_code(self, email:str,code:str  ):
-        
-        statement = select(ForgottenPAsswordCode).where(ForgottenPAsswordCode.email == email).where(ForgottenPAsswordCode.code == code)
-        result = await self.session.execute(statement)
-        return result.scalar_one_or_none()
-    
-    
-    async def get_change_email_code(self, email:str,code:str , user_id : str ) -> ChangeEmailCode  | None:
-        
-        statement = select(ChangeEmailCode).where(ChangeEmailCode.email == email).where(ChangeEmailCode.code == code).where(ChangeEmailCode.user_id == user_id)
-        result = await self.session.execute(statement)
-        return result.scalar_one_or_none()
-    
-    async def save_change_email_code(self,user_id :str ,  email : str, code : str   ):
-        
-        code = ChangeEmailCode(email=email,code=code,user_id=user_id,end_time=datetime.now(timezone.utc) + timedelta(minutes=settings.OTP_CODE_EXPIRE_MINUTES))
-        await self.session.merge(code)
-        await self.session.commit()
-        return code
-    
-    async def save_forgotten_password_code(self,user_id :str , email : str, code : str  ):
-        
-        code = ForgottenPAsswordCode(user_id=user_id,email=email,code=code,end_time=datetime.now(timezone.utc) + timedelta(minutes=settings.OTP_CODE_EXPIRE_MINUTES))
-        await self.session.merge(code)
-        await self.session.commit()
-        return code
-    
-    
-    async def make_forgotten_password_used(self, id : int  ):
-        
-        statement = select(ForgottenPAsswordCode).where(ForgottenPAsswordCode.id == id)
-        result = await self.session.execute(statement)
-        code = result.scalar_one_or_none()
-        code.active = False
-        await self.session.commit()
-        
-        
-        return code
-        
-    async def make_change_email_used(self, id : int  ):
-        
-        statement = select(ChangeEmailCode).where(ChangeEmailCode.id == id)
-        result = await self.session.execute(statement)
-        code = result.scalar_one_or_none()
-        code.active = False
-        await self.session.commit()
-        
-        return code
-    
-    
-
-    async def save_two_factor_code(self, code : str, user_id : str, email : str  ):
-        statement = select(TwoFactorCode).where(TwoFactorCode.user_id == user_id).where(TwoFactorCode.active == True).order_by(TwoFactorCode.id.desc())
-        old_code_result = await self.session.execute(statement)
-        old_code = old_code_result.scalar_one_or_none()
-        if old_code != None :
-            old_code.active = False
-            self.session.add(old_code)
-            self.session.commit()
-
-        code = TwoFactorCode(code=code,user_id=user_id,email=email,end_time=datetime.now(timezone.utc) + timedelta(minutes=30))
-        self.session.add(code)
-        self.session.commit()
-        self.session.refresh(code)
-        return code
-    
-    async def get_two_factor_code(self,  code : str, email : str  ):
-        
-        statement = select(TwoFactorCode).where(TwoFactorCode.email == email).where(TwoFactorCode.code == code).order_by(TwoFactorCode.id.desc())
-        result = await self.session.execute(statement)
-        return result.scalar_one_or_none()
-    
-    async def make_two_factor_code_used(self, id : int  ):
-        
-        statement = select(TwoFactorCode).where(TwoFactorCode.id == id)
-        result = await self.session.execute(statement)
-        code = result.scalar_one_or_none()
-        code.active = False
-        self.session.add(code)
-        self.session.commit()
-        self.session.refresh(code)
-        
-        return code
+    # One-time codes: kept in Redis (see OtpStore), the database is not involved
+
+    async def save_forgotten_password_code(self,user_id :str , email : str, code : str  ) -> bool:
+        return await OtpStore.issue(OtpPurpose.FORGOTTEN_PASSWORD, email, code, {"user_id": user_id, "email": email})
+
+    async def consume_forgotten_password_code(self, email:str,code:str  ) -> tuple[OtpStatus, Optional[dict]]:
+        return await OtpStore.consume(OtpPurpose.FORGOTTEN_PASSWORD, email, code)
+
+    async def save_change_email_code(self,user_id :str ,  email : str, code : str   ) -> bool:
+        # bound to the user: only the account which asked for it can use it
+        return await OtpStore.issue(OtpPurpose.CHANGE_EMAIL, f"{user_id}:{email}", code, {"user_id": user_id, "email": email}, email=email)
+
+    async def consume_change_email_code(self, email:str,code:str , user_id : str ) -> tuple[OtpStatus, Optional[dict]]:
+        return await OtpStore.consume(OtpPurpose.CHANGE_EMAIL, f"{user_id}:{email}", code)
+
+    async def save_two_factor_code(self, code : str, user_id : str, email : str  ) -> bool:
+        # replaces the previous code of the email
+        return await OtpStore.issue(OtpPurpose.TWO_FACTOR, email, code, {"user_id": user_id, "email": email})
+
+    async def consume_two_factor_code(self,  code : str, email : str  ) -> tuple[OtpStatus, Optional[dict]]:
+        return await OtpStore.consume(OtpPurpose.TWO_FACTOR, email, code)
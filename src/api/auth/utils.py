@@ -1,15 +1,17 @@
+import logging
 import os
-import sys
 from typing import Annotated, List, Optional, Set
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials,HTTPBearer
 from jwt.exceptions import InvalidTokenError
-from passlib.context import CryptContext
 from src.api.user.service import UserService
 from src.helper.file_helper import FileHelper
+from src.helper.otp_store import OtpStatus
+from src.helper.password_helper import PasswordHelper
 from src.helper.schemas import BaseOutFail,ErrorMessage
+from src.helper.token_revocation import TokenRevocation
 from src.api.user.models import  User
-import random
+import secrets
 import string
 import jwt
 from datetime import datetime, timedelta, timezone
@@ -21,17 +23,18 @@ from src.config import settings
 from jwcrypto import jwk
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
 
 oauth2_scheme = HTTPBearer()
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await PasswordHelper.verify(plain_password, hashed_password)
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await PasswordHelper.hash(password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
@@ -131,7 +134,32 @@ def check_roles(required_roles: List[str]):
 def generate_random_code(length=5):
     characters = string.ascii_letters + string.digits  # a-z, A-Z, 0-9
 
-    return ''.join(random.choice(characters) for _ in range(length)).upper()
+    return ''.join(secrets.choice(characters) for _ in range(length)).upper()
+
+
+def check_code_status(code_status: OtpStatus):
+    """Raise the error matching a one-time code which was not accepted"""
+
+    error = {
+        OtpStatus.INVALID: ErrorMessage.EMAIL_NOT_FOUND,
+        OtpStatus.EXPIRED: ErrorMessage.CODE_HAS_EXPIRED,
+        OtpStatus.LOCKED: ErrorMessage.TOO_MANY_ATTEMPTS,
+    }.get(code_status)
+    if error is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=BaseOutFail(message=error.description, error_code=error.value).model_dump()
+        )
+
+
+def too_many_code_requests() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=BaseOutFail(
+            message=ErrorMessage.TOO_MANY_CODE_REQUESTS.description,
+            error_code=ErrorMessage.TOO_MANY_CODE_REQUESTS.value
+        ).model_dump()
+    )
 
 
 def list_keys_in_s3():
@@ -198,17 +226,15 @@ async def rotate_key():
     
     await FileHelper.upload_private_byte(key_json, location=f"{settings.ENV}/rsa/", name=kid, content_type="json")
 
-    print(f"✅ New key created: {s3_key} with kid={kid}")
+    logger.info("New signing key created: %s with kid=%s", s3_key, kid)
     
 
 
 
 
-# In prod, use Redis/DB. This is a simple in-memory denylist for demo purposes.
-_REVOKED_JTIS: Set[str] = set()
-
-def revoke_jti(jti: str):
-    _REVOKED_JTIS.add(jti)
+async def revoke_jti(jti: str, expires_at: int):
+    """Revoke a token until its expiration (`exp` claim), in every process"""
+    await TokenRevocation.revoke(jti, expires_at)
 
 def _ensure(required_scopes: Set[str], token_scopes: Set[str]):
     if required_scopes and not required_scopes.issubset(token_scopes):
@@ -248,7 +274,7 @@ def require_oauth_client(required_scopes: Optional[Set[str]] = None, accepted_au
 
             # 4) Revocation / replay defense
             jti = payload.get("jti")
-            if jti and jti in _REVOKED_JTIS:
+            if jti and await TokenRevocation.is_revoked(jti):
                 raise HTTPException(status_code=401, detail="token_revoked")
 
             # 5) Scope
@@ -257,10 +283,10 @@ def require_oauth_client(required_scopes: Optional[Set[str]] = None, accepted_au
 
             return payload  # pass claims to the route
         except HTTPException as e:
-            print(e.with_traceback(sys.exc_info()[2]))
+            logger.info("Token refused: %s", e.detail)
             raise
         except Exception as e:
-            print(e.with_traceback(sys.exc_info()[2]))
+            logger.info("Invalid token: %s", e)
             raise HTTPException(status_code=401, detail="invalid_or_expired_token")
 
     return _dep
\ No newline at end of file
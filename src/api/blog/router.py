@@ -4,6 +4,8 @@ from slugify import slugify
 
 from src.api.auth.utils import check_permissions
 from src.api.user.models import PermissionEnum, User
+from src.helper.cache import cache_response
+from src.helper.etag import PRIVATE, PUBLIC, conditional_response
 from src.helper.schemas import BaseOutFail, ErrorMessage
 
 from src.api.blog.service import BlogService
@@ -30,6 +32,7 @@ router = APIRouter(tags=["Blog"])
 
 # Categories
 @router.get("/blog/categories", response_model=PostCategoryListOutSuccess,tags=["Post Category"])
+@conditional_response(PUBLIC)
 async def list_categories(
     blog_service: BlogService = Depends(),
 ):
@@ -37,6 +40,7 @@ async def list_categories(
     return {"message": "Categories fetched successfully", "data": categories}
 
 @router.get("/blog/categories/{category_id}", response_model=PostCategoryOutSuccess, tags=["Post Category"])
+@conditional_response(PUBLIC)
 async def get_category_route(
     category_id: int,
     blog_service: BlogService = Depends(),
@@ -109,6 +113,7 @@ async def delete_category(
 
 # Posts
 @router.get("/blog/posts", response_model=PostsPageOutSuccess,tags=["Post"])
+@conditional_response(PRIVATE)
 async def list_posts(
     filters: Annotated[PostFilter, Query(...)],
     blog_service: BlogService = Depends(),
@@ -117,6 +122,8 @@ async def list_posts(
     return {"data": posts, "page": filters.page, "number": len(posts), "total_number": total}
 
 @router.get("/blog/get-published-posts", response_model=PostsPageOutSuccess,tags=["Post"])
+@conditional_response(PUBLIC)
+@cache_response("published_posts", tags=["posts"], item_tag="post:{id}")
 async def list_posts(
     filters: Annotated[PostFilter, Query(...)],
     blog_service: BlogService = Depends(),
@@ -145,6 +152,7 @@ async def create_post(
 
 
 @router.get("/blog/posts/{post_id}", response_model=PostOutSuccess,tags=["Post"])
+@conditional_response(PRIVATE)
 async def get_post_route(
     post_id: int,
     blog_service: BlogService = Depends(),
@@ -161,6 +169,8 @@ async def get_post_route(
     return {"message": "Post fetched successfully", "data": post}
 
 @router.get("/blog/posts-by-slug/{post_slug}", response_model=PostOutSuccess,tags=["Post"])
+@conditional_response(PUBLIC)
+@cache_response("post_by_slug", item_tag="post:{id}")
 async def get_post_route(
     post_slug: str,
     blog_service: BlogService = Depends(),
@@ -213,6 +223,7 @@ async def delete_post_route(
 
 # Sections
 @router.get("/blog/posts/{post_id}/sections", response_model=PostSectionListOutSuccess,tags=["Post Section"])
+@conditional_response(PRIVATE)
 async def list_sections(
     post_id: int,
     post=Depends(get_post),
@@ -223,6 +234,7 @@ async def list_sections(
 
 
 @router.get("/blog/posts-by-slug/{post_slug}/sections", response_model=PostSectionListOutSuccess,tags=["Post Section"])
+@conditional_response(PUBLIC)
 async def list_sections(
     post_slug: str,
     post=Depends(get_post_by_slug),
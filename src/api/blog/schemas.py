@@ -1,7 +1,8 @@
 from datetime import datetime
 from typing import List, Optional, Literal
 from fastapi import UploadFile
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
+from src.helper.image_helper import ImageHelper
 from src.helper.schemas import BaseOutPage, BaseOutSuccess
 
 
@@ -58,6 +59,11 @@ class PostOut(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+    @computed_field
+    @property
+    def cover_image_srcset(self) -> Optional[str]:
+        return ImageHelper.srcset(self.cover_image)
+
 
 class PostFilter(BaseModel):
     page: int = Field(1, ge=1)
@@ -96,6 +102,11 @@ class PostSectionOut(BaseModel):
     created_at: datetime
     updated_at: datetime
 
+    @computed_field
+    @property
+    def cover_image_srcset(self) -> Optional[str]:
+        return ImageHelper.srcset(self.cover_image)
+
 
 class PostOutSuccess(BaseOutSuccess):
     data: PostOut
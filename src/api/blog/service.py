@@ -10,7 +10,9 @@ from slugify import slugify
 from src.database import get_session_async
 from src.api.blog.models import Post, PostCategory, PostSection
 from src.api.blog.schemas import PostCategoryCreateInput, PostCategoryUpdateInput, PostCreateInput, PostFilter, PostSectionCreateInput, PostSectionUpdateInput, PostUpdateInput
+from src.helper.cache import ResponseCache
 from src.helper.file_helper import FileHelper
+from src.helper.image_helper import ImageHelper
 
 
 class BlogService:
@@ -38,6 +40,7 @@ class BlogService:
         self.session.add(category)
         await self.session.commit()
         await self.session.refresh(category)
+        await ResponseCache.invalidate("posts")
         return category
 
     async def get_category_by_id(self, category_id: int) -> Optional[PostCategory]:
@@ -65,6 +68,7 @@ class BlogService:
         category.delete_at = datetime.now(timezone.utc)
         self.session.add(category)
         await self.session.commit()
+        await ResponseCache.invalidate("posts")
         return category
 
     # Posts
@@ -74,6 +78,7 @@ class BlogService:
         cover_url, _, _ = await FileHelper.upload_file(
                 data.cover_image, "/posts", slug
             )
+        ImageHelper.schedule_derivatives(cover_url)
         data = data.model_dump()
         data["cover_image"] = cover_url
         
@@ -81,6 +86,7 @@ class BlogService:
         self.session.add(post)
         await self.session.commit()
         await self.session.refresh(post)
+        await ResponseCache.invalidate("posts")
         return post
 
     async def update_post(self, post: Post, data :PostUpdateInput) -> Post:
@@ -92,9 +98,11 @@ class BlogService:
         if data.cover_image is not None:
             
             FileHelper.delete_file(post.cover_image)
+            ImageHelper.delete_derivatives(post.cover_image)
             cover_url, _, _ = await FileHelper.upload_file(
                 data.cover_image, "/posts", slug
             )
+            ImageHelper.schedule_derivatives(cover_url)
         else:
             cover_url = post.cover_image
         
@@ -107,6 +115,7 @@ class BlogService:
         self.session.add(post)
         await self.session.commit()
         await self.session.refresh(post)
+        await ResponseCache.invalidate("posts", f"post:{post.id}")
         return post
     
     async def get_post_by_id(self, post_id: int) -> Optional[Post]:
@@ -187,6 +196,7 @@ class BlogService:
         post.delete_at = datetime.now(timezone.utc)
         self.session.add(post)
         await self.session.commit()
+        await ResponseCache.invalidate("posts", f"post:{post.id}")
         return post
 
     async def publish_post(self, post: Post) -> Post:
@@ -194,6 +204,7 @@ class BlogService:
         self.session.add(post)
         await self.session.commit()
         await self.session.refresh(post)
+        await ResponseCache.invalidate("posts", f"post:{post.id}")
         return post
 
     # Sections
@@ -203,6 +214,7 @@ class BlogService:
             cover_url, _, _ = await FileHelper.upload_file(
                 data.cover_image, "/posts/sections", slugify(data.title)
             )
+            ImageHelper.schedule_derivatives(cover_url)
         else:
             cover_url = None
 
@@ -213,15 +225,18 @@ class BlogService:
         self.session.add(section)
         await self.session.commit()
         await self.session.refresh(section)
+        await ResponseCache.invalidate(f"post:{section.post_id}")
         return section
 
     async def update_section(self, section: PostSection, data : PostSectionUpdateInput) -> PostSection:
         if data.cover_image is not None:
             if section.cover_image != None:
                 FileHelper.delete_file(section.cover_image)
+                ImageHelper.delete_derivatives(section.cover_image)
             cover_url, _, _ = await FileHelper.upload_file(
                 data.cover_image, "/posts/sections", slugify(data.title)
             )
+            ImageHelper.schedule_derivatives(cover_url)
         else:
             cover_url = section.cover_image
             
@@ -233,6 +248,7 @@ class BlogService:
         self.session.add(section)
         await self.session.commit()
         await self.session.refresh(section)
+        await ResponseCache.invalidate(f"post:{section.post_id}")
         return section
 
     async def get_section_by_id(self, section_id: int) -> Optional[PostSection]:
@@ -272,6 +288,7 @@ class BlogService:
         
         self.session.delete(section)
         await self.session.commit()
+        await ResponseCache.invalidate(f"post:{post_id}")
         return section
 
 
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File,
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 import json
+import logging
 
 from src.database import get_session_async
 from src.api.auth.utils import get_current_active_user
@@ -14,6 +15,9 @@ from src.api.cabinet.schemas import (
     CabinetApplicationPaymentResponse, PaymentWebhookData, CabinetApplicationStats
 )
 
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter(tags=["Cabinet Application"])
 
 # Endpoints pour les candidatures de cabinet
@@ -31,7 +35,7 @@ async def create_cabinet_application(
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        print(f"Server error: {str(e)}")
+        logger.exception("Error while creating a cabinet application")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erreur interne: {str(e)}")
 
 @router.get("/{application_id}", response_model=CabinetApplicationOut)
@@ -1,3 +1,4 @@
+import logging
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
 from sqlalchemy.orm import selectinload
@@ -13,6 +14,7 @@ from src.api.user.schemas import CreateUserInput
 from src.api.user.service import UserService
 from src.api.payments.service import PaymentService
 from src.helper.notifications import NotificationService
+from src.helper.loader_profiles import LoaderProfiles, schema_columns
 from fastapi import Request
 from .models import CabinetApplication, ApplicationFee, CabinetApplicationStatus, PaymentStatus
 from .schemas import (
@@ -23,6 +25,14 @@ from .schemas import (
 )
 from src.api.auth.service import AuthService
 
+
+logger = logging.getLogger(__name__)
+
+CABINET_APPLICATION_LOADERS = LoaderProfiles(
+    CabinetApplication,
+    list=lambda: (schema_columns(CabinetApplication, CabinetApplicationOut),),
+)
+
 class CabinetApplicationService:
     def __init__(self, session: AsyncSession = Depends(get_session_async)):
         self.session = session
@@ -32,7 +42,6 @@ class CabinetApplicationService:
 
     async def create_application(self, application_data: CabinetApplicationCreate, request: Request = None) -> CabinetApplicationOut:
         try:
-            print("Checking for existing application...")
             existing_application = await self.session.execute(
                 select(CabinetApplication).where(
                     CabinetApplication.contact_email == application_data.contact_email
@@ -41,7 +50,6 @@ class CabinetApplicationService:
             if existing_application.scalar_one_or_none():
                 raise ValueError("Une candidature existe déjà pour cet email")
 
-            print("Creating new application...")
             application = CabinetApplication(
                 **application_data.dict(),
                 status=CabinetApplicationStatus.PENDING,
@@ -51,21 +59,15 @@ class CabinetApplicationService:
                 campaign_id=None  # Set to a specific campaign_id if required
             )
             
-            print("Adding application to session...")
             self.session.add(application)
-            print("Committing session...")
             await self.session.commit()
-            print("Refreshing application...")
             await self.session.refresh(application)
             
-            print("Initiating payment...")
             payment_result = await self._submit_cabinet_application(application)
-            
-            print("Creating response...")
-            # Debug: log payment result
-            print(f"Payment result: {payment_result}")
-            print(f"Payment link: {payment_result.get('payment_link')}")
-            print(f"Transaction ID: {payment_result.get('transaction_id')}")
+            logger.info(
+                "Cabinet application %s created, payment %s",
+                application.id, payment_result.get("transaction_id"),
+            )
             
             # Créer manuellement l'objet de réponse avec payment_url
             application_out = CabinetApplicationOut(
@@ -97,7 +99,7 @@ class CabinetApplicationService:
             
         except Exception as e:
             await self.session.rollback()
-            print(f"Error in create_application: {str(e)}")
+            logger.exception("Error in create_application")
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erreur interne: {str(e)}")
                 
 
@@ -158,7 +160,7 @@ class CabinetApplicationService:
         for field in forbidden_fields:
             if field in update_dict:
                 del update_dict[field]
-                print(f"Champ '{field}' ignoré - seul le paiement peut le modifier")
+                logger.info("Champ '%s' ignoré - seul le paiement peut le modifier", field)
         
         # Mettre à jour uniquement les champs autorisés
         for field, value in update_dict.items():
@@ -173,7 +175,6 @@ class CabinetApplicationService:
 
     async def _submit_cabinet_application(self, application: CabinetApplication) -> dict:
         try:
-            print("Preparing payment input...")
             from src.api.payments.schemas import PaymentInitInput
             payment_input = PaymentInitInput(
                 payable=application,
@@ -191,14 +192,12 @@ class CabinetApplicationService:
                 customer_state="SN",
                 customer_zip_code="00000"
             )
-            print("Initiating payment with PaymentService...")
             payment_result = await self.payment_service.initiate_payment(payment_input)
             if not payment_result.get("success"):
                 raise ValueError(f"Payment initiation failed: {payment_result.get('message')}")
-            print("Payment initiated successfully:", payment_result)
             return payment_result
         except Exception as e:
-            print(f"Payment error: {str(e)}")
+            logger.error("Payment error for cabinet application %s: %s", application.id, e)
             raise ValueError(f"Erreur lors de l'initiation du paiement: {str(e)}")
                 
     async def initiate_payment(self, application_id: str) -> CabinetApplicationPaymentResponse:
@@ -256,12 +255,12 @@ class CabinetApplicationService:
             application = application.scalar_one_or_none()
             
             if not application:
-                print(f"Candidature non trouvée pour la référence: {webhook_data.payment_reference}")
+                logger.warning("Candidature non trouvée pour la référence: %s", webhook_data.payment_reference)
                 return False
             
             # Vérifier que la candidature est en attente de paiement
             if application.payment_status != PaymentStatus.PENDING:
-                print(f"Candidature {application.id} n'est pas en attente de paiement (statut: {application.payment_status})")
+                logger.warning("Candidature %s n'est pas en attente de paiement (statut: %s)", application.id, application.payment_status)
                 return False
             
             if webhook_data.status == "success":
@@ -274,18 +273,18 @@ class CabinetApplicationService:
                 await self._create_cabinet_user(application, request)
                 
                 await self.session.commit()
-                print(f"Paiement confirmé pour la candidature {application.id}")
+                logger.info("Paiement confirmé pour la candidature %s", application.id)
                 return True
                 
             elif webhook_data.status == "failed":
                 application.payment_status = PaymentStatus.FAILED
                 # Le statut reste PENDING en cas d'échec
                 await self.session.commit()
-                print(f"Paiement échoué pour la candidature {application.id}")
+                logger.info("Paiement échoué pour la candidature %s", application.id)
                 return True
                 
-        except Exception as e:
-            print(f"Erreur lors du traitement du webhook: {e}")
+        except Exception:
+            logger.exception("Erreur lors du traitement du webhook")
             return False
         
         return False
@@ -322,7 +321,7 @@ class CabinetApplicationService:
             await self._send_credentials_email(application, username, temp_password, request)
             
         except Exception as e:
-            print(f"Erreur lors de la création du compte utilisateur: {e}")
+            logger.exception("Erreur lors de la création du compte utilisateur de la candidature %s", application.id)
             raise e
 
     def _generate_temp_password(self, length: int = 12) -> str:
@@ -353,7 +352,7 @@ class CabinetApplicationService:
             application.credentials_sent = True
             
         except Exception as e:
-            print(f"Erreur lors de l'envoi de l'email: {e}")
+            logger.exception("Erreur lors de l'envoi des identifiants de la candidature %s", application.id)
             raise e
 
     async def get_applications_stats(self) -> CabinetApplicationStats:
@@ -418,11 +417,12 @@ class CabinetApplicationService:
             query = query.where(CabinetApplication.status == status)
         
         query = query.offset(skip).limit(limit).order_by(CabinetApplication.created_at.desc())
+        query = CABINET_APPLICATION_LOADERS.apply(query, "list")
         
         result = await self.session.execute(query)
         applications = result.scalars().all()
         
-        return [CabinetApplicationOut.model_validate(app.model_dump()) for app in applications]
+        return [CabinetApplicationOut.model_validate(app, from_attributes=True) for app in applications]
 
     async def get_paid_applications(self, skip: int = 0, limit: int = 100) -> List[CabinetApplicationOut]:
         """Récupérer les candidatures qui ont payé les frais"""
@@ -431,11 +431,12 @@ class CabinetApplicationService:
         )
         
         query = query.offset(skip).limit(limit).order_by(CabinetApplication.payment_date.desc())
+        query = CABINET_APPLICATION_LOADERS.apply(query, "list")
         
         result = await self.session.execute(query)
         applications = result.scalars().all()
         
-        return [CabinetApplicationOut.model_validate(app.model_dump()) for app in applications]
+        return [CabinetApplicationOut.model_validate(app, from_attributes=True) for app in applications]
 
     async def get_my_applications(self, user_email: str, skip: int = 0, limit: int = 100) -> List[CabinetApplicationOut]:
         """Récupérer les candidatures de l'utilisateur connecté"""
@@ -444,11 +445,12 @@ class CabinetApplicationService:
         )
         
         query = query.offset(skip).limit(limit).order_by(CabinetApplication.created_at.desc())
+        query = CABINET_APPLICATION_LOADERS.apply(query, "list")
         
         result = await self.session.execute(query)
         applications = result.scalars().all()
         
-        return [CabinetApplicationOut.model_validate(app.model_dump()) for app in applications]
+        return [CabinetApplicationOut.model_validate(app, from_attributes=True) for app in applications]
 
     async def approve_application(self, application_id: str) -> CabinetApplicationOut:
         """Approuver une candidature de cabinet"""
@@ -492,8 +494,8 @@ class CabinetApplicationService:
             await self._send_credentials_email(application, user.email, password)
             application.credentials_sent = True
             
-        except Exception as e:
-            print(f"Erreur lors de la création du compte utilisateur: {e}")
+        except Exception:
+            logger.exception("Erreur lors de la création du compte utilisateur de la candidature %s", application.id)
             # Continuer même si la création du compte échoue
         
         await self.session.commit()
@@ -5,7 +5,7 @@ from src.helper.model import CustomBaseUUIDModel,CustomBaseModel
 from typing import List, Optional
 from enum import Enum
 from  datetime import datetime
-from sqlalchemy import Column, Numeric, JSON, TIMESTAMP
+from sqlalchemy import Column, Numeric, JSON, TIMESTAMP, Text
 
 
 
@@ -89,6 +89,14 @@ class JobAttachment(CustomBaseModel, table=True):
     file_path: str = Field(max_length=255)
     name: str = Field(max_length=255, description="Nom du fichier")
 
+    # PDF processing (filled by the document worker)
+    processing_status: Optional[str] = Field(default=None, max_length=20)
+    page_count: Optional[int] = Field(default=None)
+    extracted_text: Optional[str] = Field(default=None, sa_column=Column(Text))
+    optimized_file_path: Optional[str] = Field(default=None, max_length=255)
+    file_size: Optional[int] = Field(default=None)
+    optimized_file_size: Optional[int] = Field(default=None)
+
 
 class JobApplicationCode(CustomBaseModel, table=True):
     __tablename__ = "job_application_codes"
@@ -1,14 +1,22 @@
 from datetime import date, datetime, timezone
-import sys
-from typing import Annotated
+import logging
+from typing import Annotated, List, Optional
 from fastapi import APIRouter, Depends, Form, File, HTTPException, Query, status
 from fastapi import UploadFile
+from fastapi.responses import StreamingResponse
 
 from src.api.auth.utils import check_permissions
+from src.config import settings
+from src.database import get_unit_of_work
 from src.api.payments.schemas import PaymentInitInput
 from src.api.payments.service import PaymentService
 from src.api.user.models import PermissionEnum, User
-from src.helper.schemas import BaseOutFail, ErrorMessage
+from src.helper.cache import cache_response
+from src.helper.etag import PRIVATE, PUBLIC, conditional_response
+from src.helper.query_budget import query_budget
+from src.helper.rate_limit import rate_limit
+from src.helper.schemas import BaseOutFail, BulkStatusChangeOutSuccess, ErrorMessage
+from src.helper.zip_stream import ZipStreamHelper
 
 from src.api.job_offers.service import JobOfferService
 from src.api.job_offers.schemas import (
@@ -29,15 +37,21 @@ from src.api.job_offers.schemas import (
     JobAttachmentListOutSuccess,
     PaymentJobApplicationOutSuccess,
     UpdateJobOfferStatusInput,
+    BulkUpdateJobApplicationStatusInput,
 )
 from src.api.job_offers.dependencies import get_job_offer, get_job_application, get_job_attachment
 
 
+logger = logging.getLogger(__name__)
+
+
 router = APIRouter(tags=["Job Offers"])
 
 
 # Job Offers
 @router.get("/job-offers", response_model=JobOffersPageOutSuccess, tags=["Job Offer"])
+@conditional_response(PUBLIC)
+@cache_response("job_offers", tags=["job_offers"], item_tag="job_offer:{id}")
 async def list_job_offers(
     filters: Annotated[JobOfferFilter, Query(...)],
     job_offer_service: JobOfferService = Depends(),
@@ -66,6 +80,7 @@ async def create_job_offer(
 
 
 @router.get("/job-offers/{job_offer_id}", response_model=JobOfferOutSuccess, tags=["Job Offer"])
+@conditional_response(PUBLIC)
 async def get_job_offer_route(
     job_offer_id: str,
     job_offer=Depends(get_job_offer),
@@ -108,6 +123,8 @@ async def delete_job_offer_route(
 
 # Job Applications
 @router.get("/job-applications", response_model=JobApplicationsPageOutSuccess, tags=["Job Application"])
+@conditional_response(PRIVATE)
+@query_budget(2)
 async def list_job_applications(
     current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_JOB_APPLICATION]))],
     filters: Annotated[JobApplicationFilter, Query(...)],
@@ -144,7 +161,17 @@ async def change_job_application_status(
     application = await job_offer_service.change_job_application_status(application=application, input=input)
     return {"message": "Job application fetched successfully", "data": application}
 
-@router.post("/job-applications", response_model=PaymentJobApplicationOutSuccess, tags=["Job Application"])
+@router.post("/job-applications/bulk-change-status", response_model=BulkStatusChangeOutSuccess, tags=["Job Application"], dependencies=[Depends(get_unit_of_work)])
+async def change_job_applications_status(
+    input: BulkUpdateJobApplicationStatusInput,
+    current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_CHANGE_JOB_APPLICATION_STATUS]))],
+    job_offer_service: JobOfferService = Depends(),
+):
+    """Change the status of several applications, the unknown and unpaid ones are skipped"""
+    updated, skipped = await job_offer_service.change_job_applications_status(input)
+    return {"message": "Job applications status changed successfully", "data": {"updated": updated, "skipped": skipped}}
+
+@router.post("/job-applications", response_model=PaymentJobApplicationOutSuccess, tags=["Job Application"], dependencies=[Depends(rate_limit("payment_initiation"))])
 async def create_job_application(
     input: JobApplicationCreateInput,
     job_offer_service: JobOfferService = Depends(),
@@ -178,12 +205,9 @@ async def create_job_application(
             submitted_attachment_types = [val.type for val in input.attachments]
         
         required_attachments = job_offer.attachment
-        print(f"DEBUG: Required attachments: {required_attachments}")
-        print(f"DEBUG: Submitted attachments: {submitted_attachment_types}")
         
         for required_attachment in required_attachments:
             if required_attachment not in submitted_attachment_types:
-                print(f"DEBUG: Missing required attachment: {required_attachment}")
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=BaseOutFail(
@@ -214,8 +238,8 @@ async def create_job_application(
     
     try :
         payment = await payment_service.initiate_payment(payment_input)
-    except Exception as e:
-        print(e.with_traceback(sys.exc_info()[2]))
+    except Exception:
+        logger.exception("Payment initiation failed for job application %s", application.id)
         await job_offer_service.delete_job_application(application)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -242,7 +266,65 @@ async def create_job_application(
         "payment": payment
     }}
 
+@router.get("/job-applications/export/zip", tags=["Job Application"])
+async def export_job_applications_zip(
+    current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_JOB_APPLICATION]))],
+    application_ids: Annotated[Optional[List[int]], Query()] = None,
+    job_offer_id: Optional[str] = None,
+    job_offer_service: JobOfferService = Depends(),
+):
+    """Stream the dossiers (summary + attachments) of the selected applications as a ZIP archive"""
+    if not application_ids and job_offer_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=BaseOutFail(
+                message=ErrorMessage.EXPORT_FILTER_REQUIRED.description,
+                error_code=ErrorMessage.EXPORT_FILTER_REQUIRED.value,
+            ).model_dump(),
+        )
+
+    applications = await job_offer_service.get_job_applications_for_export(application_ids, job_offer_id)
+    if len(applications) > settings.EXPORT_ZIP_MAX_APPLICATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=BaseOutFail(
+                message=ErrorMessage.EXPORT_TOO_LARGE.description,
+                error_code=ErrorMessage.EXPORT_TOO_LARGE.value,
+            ).model_dump(),
+        )
+    if not applications:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=BaseOutFail(
+                message=ErrorMessage.JOB_APPLICATION_NOT_FOUND.description,
+                error_code=ErrorMessage.JOB_APPLICATION_NOT_FOUND.value,
+            ).model_dump(),
+        )
+
+    # the entries are built before returning: the session is closed while streaming
+    entries = job_offer_service.build_dossier_entries(applications)
+    filename = f"{applications[0].application_number}.zip" if len(applications) == 1 else "job-applications.zip"
+    return StreamingResponse(
+        ZipStreamHelper.stream(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/job-applications/{application_id}/export/zip", tags=["Job Application"])
+async def export_job_application_zip(
+    application_id: int,
+    current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_JOB_APPLICATION]))],
+    job_offer_service: JobOfferService = Depends(),
+):
+    return await export_job_applications_zip(
+        current_user=current_user,
+        application_ids=[application_id],
+        job_offer_id=None,
+        job_offer_service=job_offer_service,
+    )
+
 @router.get("/job-applications/{application_id}", response_model=JobApplicationOutSuccess, tags=["Job Application"])
+@conditional_response(PRIVATE)
 async def get_job_application_route(
     application_id: int,
     current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_JOB_APPLICATION]))],
@@ -272,6 +354,7 @@ async def create_attachment(
 
 # Job Attachments
 @router.get("/job-applications/{application_id}/attachments", response_model=JobAttachmentListOutSuccess, tags=["Job Attachment"])
+@conditional_response(PRIVATE)
 async def list_attachments(
     application_id: int,
     current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_JOB_APPLICATION]))],
@@ -295,7 +378,7 @@ async def delete_attachment(
 
 
 # OTP Endpoints for Job Applications
-@router.post("/job-applications/request-otp", tags=["Job Application OTP"])
+@router.post("/job-applications/request-otp", tags=["Job Application OTP"], dependencies=[Depends(rate_limit("job_application_otp"))])
 async def request_application_otp(
     input: JobApplicationOTPRequestInput,
     job_offer_service: JobOfferService = Depends(),
@@ -151,6 +151,9 @@ class JobAttachmentOut(BaseModel):
     document_type: str
     file_path: str
     name: str  # Nom du fichier
+    processing_status: Optional[str] = None
+    page_count: Optional[int] = None
+    optimized_file_path: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     
@@ -228,4 +231,10 @@ class JobAttachmentListOutSuccess(BaseOutSuccess):
 class UpdateJobOfferStatusInput(BaseModel):
     application_id: int
     status: ApplicationStatusEnum
-    reason : Optional[str] = None
\ No newline at end of file
+    reason : Optional[str] = None
+
+
+class BulkUpdateJobApplicationStatusInput(BaseModel):
+    application_ids: List[int] = Field(min_length=1, max_length=500)
+    status: ApplicationStatusEnum
+    reason : Optional[str] = None
@@ -1,22 +1,42 @@
 from typing import List, Optional, Tuple
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from fastapi import Depends, HTTPException,status
 from sqlalchemy import func, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 from sqlmodel import select, or_
 from slugify import slugify
 from src.api.payments.models import Payment, PaymentStatusEnum
 from src.database import get_session_async
-from src.api.job_offers.models import JobOffer, JobApplication, JobAttachment, JobApplicationCode, ApplicationStatusEnum
-from src.api.job_offers.schemas import JobApplicationCreateInput, JobApplicationUpdateByCandidateInput, JobAttachmentInput, JobOfferFilter, JobApplicationFilter, UpdateJobOfferStatusInput
-from src.api.auth.utils import generate_random_code
+from src.api.job_offers.models import JobOffer, JobApplication, JobAttachment, ApplicationStatusEnum
+from src.api.job_offers.schemas import JobApplicationCreateInput, JobApplicationOut, JobApplicationUpdateByCandidateInput, JobAttachmentInput, JobOfferFilter, JobApplicationFilter, UpdateJobOfferStatusInput, BulkUpdateJobApplicationStatusInput
+from src.api.auth.utils import generate_random_code, too_many_code_requests
 from src.config import settings
+from src.helper.cache import ResponseCache
 from src.helper.file_helper import FileHelper
-from src.helper.notifications import JobApplicationConfirmationNotification, JobApplicationOTPNotification
+from src.helper.loader_profiles import LoaderProfiles, schema_columns
+from src.helper.otp_store import OtpPurpose, OtpStatus, OtpStore
+from src.helper.unit_of_work import UnitOfWork
+from src.helper.zip_stream import ZipStreamHelper
+from src.helper.pdf_helper import DocumentProcessingStatusEnum, PdfHelper, process_attachment_pdf_task
+from src.helper.notifications import ApplicationStatusNotification, JobApplicationConfirmationNotification, JobApplicationOTPNotification, NotificationBase
 from src.helper.schemas import BaseOutFail, ErrorMessage
 
 
+JOB_APPLICATION_LOADERS = LoaderProfiles(
+    JobApplication,
+    list=lambda: (schema_columns(JobApplication, JobApplicationOut),),
+    detail=lambda: (
+        joinedload(JobApplication.job_offer),
+        selectinload(JobApplication.attachments),
+    ),
+    admin=lambda: (
+        joinedload(JobApplication.job_offer),
+        selectinload(JobApplication.attachments),
+    ),
+)
+
+
 class JobOfferService:
     def __init__(self, session: AsyncSession = Depends(get_session_async)) -> None:
         self.session = session
@@ -27,6 +47,7 @@ class JobOfferService:
         self.session.add(job_offer)
         await self.session.commit()
         await self.session.refresh(job_offer)
+        await ResponseCache.invalidate("job_offers")
         return job_offer
 
     async def update_job_offer(self, job_offer: JobOffer, data) -> JobOffer:
@@ -35,6 +56,7 @@ class JobOfferService:
         self.session.add(job_offer)
         await self.session.commit()
         await self.session.refresh(job_offer)
+        await ResponseCache.invalidate("job_offers", f"job_offer:{job_offer.id}")
         return job_offer
 
     async def get_job_offer_by_id(self, job_offer_id: str) -> Optional[JobOffer]:
@@ -96,6 +118,7 @@ class JobOfferService:
         job_offer.delete_at = datetime.now(timezone.utc)
         self.session.add(job_offer)
         await self.session.commit()
+        await ResponseCache.invalidate("job_offers", f"job_offer:{job_offer.id}")
         return job_offer
 
     # Job Applications
@@ -116,7 +139,8 @@ class JobOfferService:
             doc = JobAttachment(
                 file_path=attachment.url,
                 document_type=attachment.type,
-                name=attachment.name
+                name=attachment.name,
+                processing_status=DocumentProcessingStatusEnum.PENDING if PdfHelper.is_pdf(attachment.url) else None
             )
             self.session.add(doc)
             await self.session.commit()
@@ -137,6 +161,8 @@ class JobOfferService:
         for attachment in data_attachment:
             
             await self.associate_job_attachment( attachment=attachment,application_id=job_application.id)
+            if PdfHelper.is_pdf(attachment.file_path):
+                process_attachment_pdf_task.delay("job", attachment.id)
         
         
         return job_application
@@ -159,13 +185,64 @@ class JobOfferService:
         result = await self.session.execute(statement)
         return result.scalars().first()
 
+    async def get_job_applications_for_export(self, application_ids: Optional[List[int]] = None, job_offer_id: Optional[str] = None) -> List[JobApplication]:
+        statement = (
+            select(JobApplication)
+            .where(JobApplication.delete_at.is_(None))
+            .order_by(JobApplication.id)
+            # one more row than the cap, so the router can refuse instead of truncating
+            .limit(settings.EXPORT_ZIP_MAX_APPLICATIONS + 1)
+        )
+        statement = JOB_APPLICATION_LOADERS.apply(statement, "admin")
+        if application_ids:
+            statement = statement.where(JobApplication.id.in_(application_ids))
+        if job_offer_id is not None:
+            statement = statement.where(JobApplication.job_offer_id == job_offer_id)
+
+        result = await self.session.execute(statement)
+        return result.scalars().all()
+
+    @staticmethod
+    def build_dossier_entries(applications: List[JobApplication]) -> List[tuple]:
+        """Build the (arcname, source) entries of the dossier ZIP of job applications"""
+        dossiers = []
+        for application in applications:
+            job_offer = application.job_offer
+            dossiers.append({
+                "folder": application.application_number or str(application.id),
+                "summary": [
+                    f"Application number : {application.application_number}",
+                    f"Status : {application.status.value}",
+                    f"Refusal reason : {application.refusal_reason or ''}",
+                    f"Candidate : {application.civility or ''} {application.first_name} {application.last_name}",
+                    f"Email : {application.email}",
+                    f"Phone : {application.phone_number}",
+                    f"Date of birth : {application.date_of_birth or ''}",
+                    f"Address : {application.address or ''} {application.city or ''} {application.country_code or ''}",
+                    f"Job offer : {job_offer.reference + ' - ' + job_offer.title if job_offer else ''}",
+                    f"Submission fee : {application.submission_fee or ''} {application.currency or ''}",
+                    f"Paid : {'yes' if application.payment_id else 'no'}",
+                    f"Submitted at : {application.created_at}",
+                ],
+                "attachments": [
+                    (a.name or a.document_type, a.document_type, a.page_count, a.file_path)
+                    for a in application.attachments if a.delete_at is None
+                ],
+                "index": (
+                    application.application_number, application.status.value, application.last_name, application.first_name,
+                    application.email, application.phone_number, job_offer.reference if job_offer else "",
+                ),
+            })
+        return ZipStreamHelper.build_dossier_entries(
+            dossiers, "application_number;status;last_name;first_name;email;phone_number;job_offer;attachments"
+        )
+
     async def get_full_job_application_by_id(self, application_id: int) -> Optional[JobApplication]:
         statement = (
             select(JobApplication)
             .where(JobApplication.id == application_id, JobApplication.delete_at.is_(None))
-            .options(selectinload(JobApplication.job_offer))
-            .options(selectinload(JobApplication.attachments))
         )
+        statement = JOB_APPLICATION_LOADERS.apply(statement, "detail")
         result = await self.session.execute(statement)
         return result.scalars().first()
 
@@ -211,6 +288,7 @@ class JobOfferService:
         total_count = (await self.session.execute(count_query)).scalar_one()
 
         statement = statement.offset((filters.page - 1) * filters.page_size).limit(filters.page_size)
+        statement = JOB_APPLICATION_LOADERS.apply(statement, "list")
         result = await self.session.execute(statement)
         return result.scalars().all(), total_count
 
@@ -297,19 +375,14 @@ class JobOfferService:
         if application is None:
             return None
             
-        # Generate OTP code
+        # Generate OTP code, kept in Redis (see OtpStore)
         code = generate_random_code()
-        
-        # Save OTP code
-        otp_code = JobApplicationCode(
-            application_id=application.id,
-            email=email,
-            code=code,
-            end_time=datetime.now(timezone.utc) + timedelta(minutes=settings.OTP_CODE_EXPIRE_MINUTES)
+        stored = await OtpStore.issue(
+            OtpPurpose.JOB_APPLICATION, f"{application_number}:{email}", code,
+            {"application_id": application.id, "email": email}, email=email,
         )
-        
-        self.session.add(otp_code)
-        await self.session.commit()
+        if not stored:
+            raise too_many_code_requests()
         
         # Send OTP email
         await self._send_application_otp_email(application, code)
@@ -317,38 +390,18 @@ class JobOfferService:
         return code
 
     async def verify_application_otp(self, application_number: str, email: str, code: str) -> Optional[JobApplication]:
+        # Verify and consume the OTP code
+        code_status, data = await OtpStore.consume(OtpPurpose.JOB_APPLICATION, f"{application_number}:{email}", code)
+        if code_status != OtpStatus.VALID:
+            return None
+
         # Find application
         statement = select(JobApplication).where(
-            JobApplication.application_number == application_number,
-            JobApplication.email == email,
+            JobApplication.id == data["application_id"],
             JobApplication.delete_at.is_(None)
         )
         result = await self.session.execute(statement)
-        application = result.scalars().first()
-        
-        if application is None:
-            return None
-            
-        # Verify OTP code
-        otp_statement = select(JobApplicationCode).where(
-            JobApplicationCode.application_id == application.id,
-            JobApplicationCode.email == email,
-            JobApplicationCode.code == code,
-            JobApplicationCode.active == True,
-            JobApplicationCode.end_time > datetime.now(timezone.utc)
-        )
-        otp_result = await self.session.execute(otp_statement)
-        otp_code = otp_result.scalars().first()
-        
-        if otp_code is None:
-            return None
-            
-        # Deactivate the OTP code after use
-        otp_code.active = False
-        self.session.add(otp_code)
-        await self.session.commit()
-        
-        return application
+        return result.scalars().first()
 
     async def update_application_by_candidate(self, application: JobApplication, data :JobApplicationUpdateByCandidateInput) -> JobApplication:
         # Update only allowed fields for candidates
@@ -392,13 +445,59 @@ class JobOfferService:
         await self.session.refresh(application)
         
         return application
+
+    async def change_job_applications_status(self, input: BulkUpdateJobApplicationStatusInput) -> Tuple[List[int], List[int]]:
+        """
+        Change the status of several applications with one UPDATE, the unknown
+        and the unpaid applications are skipped. The candidates are notified
+        by one email task once committed.
+
+        Returns the updated ids and the skipped ids.
+        """
+
+        statement = (
+            select(JobApplication)
+            .where(JobApplication.id.in_(input.application_ids), JobApplication.delete_at.is_(None))
+            .options(joinedload(JobApplication.job_offer))
+        )
+        applications = (await self.session.execute(statement)).scalars().all()
+        applications = [application for application in applications if application.payment_id is not None]
+        updated = sorted(application.id for application in applications)
+        skipped = sorted(set(input.application_ids) - set(updated))
+        if not applications:
+            return updated, skipped
+
+        await self.session.execute(
+            update(JobApplication)
+            .where(JobApplication.id.in_(updated))
+            .values(status=input.status, refusal_reason=input.reason)
+        )
+        await UnitOfWork.save(self.session)
+
+        notifications = [
+            ApplicationStatusNotification(
+                email=application.email,
+                application_number=application.application_number,
+                candidate_name=f"{application.first_name} {application.last_name}",
+                title=application.job_offer.title if application.job_offer else "",
+                status=input.status.value,
+                reason=input.reason or "",
+            )
+            for application in applications
+        ]
+
+        async def committed():
+            NotificationBase.send_notifications(notifications)
+
+        await UnitOfWork.after_commit(self.session, committed)
+        return updated, skipped
     
     async def update_job_application_payment(self,application_id: int,payment_id:str) :
     
         application = await self.get_job_application_by_id(application_id)
         application.payment_id = payment_id
         self.session.add(application)
-        await self.session.commit()
+        await UnitOfWork.save(self.session)
         
         return application
     
@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import JSON, BigInteger, Column, Identity, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import TIMESTAMP, Field, SQLModel
+
+
+class Notification(SQLModel, table=True):
+    """
+    In-app notification of a user. The title / message / actions are rendered
+    from the NotificationType and `data` in the language of the reader.
+
+    Hash partitioned by user_id (see the migration): an inbox read only
+    touches the partition of its user.
+    """
+
+    __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_id_created_at", "user_id", text("created_at DESC"), text("id DESC")),
+        Index("ix_notifications_user_id_unread", "user_id", postgresql_where=text("read_at IS NULL")),
+        {"postgresql_partition_by": "HASH (user_id)"},
+    )
+
+    id: Optional[int] = Field(default=None, sa_column=Column(BigInteger, Identity(), primary_key=True))
+    user_id: str = Field(primary_key=True, foreign_key="users.id")
+    type: str = Field(max_length=50)
+    data: dict = Field(default_factory=dict, sa_column=Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False))
+    read_at: Optional[datetime] = Field(default=None, nullable=True, sa_type=TIMESTAMP(timezone=True))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=TIMESTAMP(timezone=True))
@@ -0,0 +1,81 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from src.api.auth.utils import check_permissions, get_current_active_user
+from src.api.training.dependencies import get_training_session
+from src.api.training.models import TrainingSession
+from src.api.user.models import PermissionEnum, User
+from src.database import get_unit_of_work
+from src.helper.in_app_notif import NotificationType
+from src.helper.schemas import BaseOutFail, BulkWriteOutSuccess, ErrorMessage
+
+from src.api.notifications.service import NotificationInboxService
+from src.api.notifications.schemas import (
+    MarkNotificationsReadInput,
+    NotificationFilter,
+    NotificationsPageOutSuccess,
+    SendNotificationInput,
+    UnreadCountOutSuccess,
+)
+
+
+router = APIRouter(tags=["Notifications"])
+
+
+@router.get("/notifications", response_model=NotificationsPageOutSuccess)
+async def list_notifications(
+    filters: Annotated[NotificationFilter, Query(...)],
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    inbox_service: NotificationInboxService = Depends(),
+):
+    try:
+        notifications, next_cursor = await inbox_service.list_notifications(current_user, filters.limit, filters.cursor, filters.unread)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=BaseOutFail(
+                message=ErrorMessage.INVALID_CURSOR.description,
+                error_code=ErrorMessage.INVALID_CURSOR.value,
+            ).model_dump(),
+        )
+    return {"message": "Notifications fetched successfully", "data": {"items": notifications, "next_cursor": next_cursor}}
+
+
+@router.get("/notifications/unread-count", response_model=UnreadCountOutSuccess)
+async def get_unread_count(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    inbox_service: NotificationInboxService = Depends(),
+):
+    count = await inbox_service.unread_count(current_user.id)
+    return {"message": "Unread count fetched successfully", "data": {"unread": count}}
+
+
+@router.post("/notifications/mark-as-read", response_model=BulkWriteOutSuccess, dependencies=[Depends(get_unit_of_work)])
+async def mark_notifications_as_read(
+    input: MarkNotificationsReadInput,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    inbox_service: NotificationInboxService = Depends(),
+):
+    count = await inbox_service.mark_as_read(current_user.id, input.ids)
+    return {"message": "Notifications marked as read successfully", "data": {"count": count}}
+
+
+@router.post("/notifications/training-sessions/{session_id}", response_model=BulkWriteOutSuccess, dependencies=[Depends(get_unit_of_work)])
+async def notify_training_session(
+    input: SendNotificationInput,
+    current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_UPDATE_TRAINING_SESSION]))],
+    training_session: Annotated[TrainingSession, Depends(get_training_session)],
+    inbox_service: NotificationInboxService = Depends(),
+):
+    notification_type = NotificationType.from_value(input.type)
+    if notification_type is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=BaseOutFail(
+                message=ErrorMessage.NOTIFICATION_TYPE_NOT_FOUND.description,
+                error_code=ErrorMessage.NOTIFICATION_TYPE_NOT_FOUND.value,
+            ).model_dump(),
+        )
+
+    count = await inbox_service.notify_training_session(training_session.id, notification_type, input.data, input.push)
+    return {"message": "Notification sent successfully", "data": {"count": count}}
@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from src.helper.schemas import BaseOutSuccess
+
+
+class NotificationFilter(BaseModel):
+    limit: int = Field(20, ge=1, le=100)
+    cursor: Optional[str] = None  # next_cursor of the previous page
+    unread: bool = False
+
+
+class MarkNotificationsReadInput(BaseModel):
+    ids: Optional[List[int]] = Field(None, min_length=1)  # every unread notification when absent
+
+
+class SendNotificationInput(BaseModel):
+    type: str
+    data: dict = {}
+    push: bool = False
+
+
+class NotificationAction(BaseModel):
+    name: str
+    url: str
+
+
+class NotificationOut(BaseModel):
+    id: int
+    type: str
+    title: str
+    message: str
+    actions: List[NotificationAction]
+    data: dict
+    read_at: Optional[datetime]
+    created_at: datetime
+
+
+class NotificationsPage(BaseModel):
+    items: List[NotificationOut]
+    next_cursor: Optional[str]
+
+
+class UnreadCount(BaseModel):
+    unread: int
+
+
+class NotificationsPageOutSuccess(BaseOutSuccess):
+    data: NotificationsPage
+
+
+class UnreadCountOutSuccess(BaseOutSuccess):
+    data: UnreadCount
@@ -0,0 +1,176 @@
+import base64
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import Depends
+from sqlalchemy import func, insert, literal, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.notifications.models import Notification
+from src.api.training.models import TrainingSessionParticipant
+from src.api.user.models import User
+from src.config import settings
+from src.database import get_session_async
+from src.helper.in_app_notif import NotificationType
+from src.helper.unit_of_work import UnitOfWork
+from src.helper.unread_counter import UnreadCounter
+
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(notification: Notification) -> str:
+    value = f"{notification.created_at.isoformat()}|{notification.id}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    created_at, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(created_at), int(id)
+
+
+def render_notification(notification: Notification, lang: str) -> dict:
+    """Title, message and actions of the notification in the language of the reader"""
+
+    kind = NotificationType.from_value(notification.type)
+    title, message, actions = notification.type, "", []
+    if kind is not None:
+        lang = lang if lang in kind.title else "en"
+        title = kind.title[lang]
+        try:
+            message = kind.template[lang].format(**notification.data)
+            actions = kind.action(lang, notification.data)
+        except KeyError:
+            message = kind.template[lang]
+    return {
+        "id": notification.id,
+        "type": notification.type,
+        "title": title,
+        "message": message,
+        "actions": actions,
+        "data": notification.data,
+        "read_at": notification.read_at,
+        "created_at": notification.created_at,
+    }
+
+
+class NotificationInboxService:
+    def __init__(self, session: AsyncSession = Depends(get_session_async)) -> None:
+        self.session = session
+
+    async def notify_users(self, notification_type: NotificationType, recipients: List[tuple[str, dict]]) -> int:
+        """
+        Store one notification per (user_id, data) recipient: executemany
+        INSERT, COPY from NOTIFICATION_COPY_THRESHOLD recipients. The unknown
+        users are skipped.
+        """
+
+        user_ids = {user_id for user_id, _ in recipients}
+        result = await self.session.execute(select(User.id).where(User.id.in_(user_ids)))
+        known = set(result.scalars())
+        recipients = [(user_id, data) for user_id, data in recipients if user_id in known]
+        if not recipients:
+            return 0
+
+        now = datetime.now(timezone.utc)
+        if len(recipients) >= settings.NOTIFICATION_COPY_THRESHOLD:
+            # the session connection, so the COPY belongs to the transaction
+            connection = await (await self.session.connection()).get_raw_connection()
+            await connection.driver_connection.copy_records_to_table(
+                Notification.__tablename__,
+                records=[(user_id, notification_type.value, json.dumps(data), now) for user_id, data in recipients],
+                columns=["user_id", "type", "data", "created_at"],
+            )
+        else:
+            await self.session.execute(
+                insert(Notification),
+                [{"user_id": user_id, "type": notification_type.value, "data": data, "created_at": now} for user_id, data in recipients],
+            )
+        await UnitOfWork.save(self.session)
+
+        await self._after_notify(Counter(user_id for user_id, _ in recipients), notification_type, {}, push=False)
+        return len(recipients)
+
+    async def notify_training_session(self, training_session_id: str, notification_type: NotificationType, data: dict, push: bool = False) -> int:
+        """Announcement to every participant of a session: one INSERT ... SELECT, whatever the number of participants"""
+
+        participants = select(
+            TrainingSessionParticipant.user_id,
+            literal(notification_type.value),
+            literal(data, Notification.__table__.c.data.type),
+            func.now(),
+        ).where(TrainingSessionParticipant.session_id == training_session_id).distinct()
+        result = await self.session.execute(
+            insert(Notification)
+            .from_select(["user_id", "type", "data", "created_at"], participants)
+            .returning(Notification.user_id)
+        )
+        recipients = list(result.scalars())
+        await UnitOfWork.save(self.session)
+
+        await self._after_notify(Counter(recipients), notification_type, data, push, training_session_id=training_session_id)
+        return len(recipients)
+
+    async def _after_notify(self, deltas: Counter, notification_type: NotificationType, data: dict, push: bool, **recipients):
+        async def update_counters():
+            await UnreadCounter.adjust(dict(deltas))
+            if push:
+                from src.helper.utils import NotificationHelper
+
+                NotificationHelper.send_push_notifications.delay(notification_type.value, data, **recipients)
+
+        await UnitOfWork.after_commit(self.session, update_counters)
+
+    async def list_notifications(self, user: User, limit: int, cursor: Optional[str] = None, unread: bool = False):
+        """Newest first, keyset paginated on (created_at, id): every page is an index range scan"""
+
+        statement = (
+            select(Notification)
+            .where(Notification.user_id == user.id)
+            .order_by(Notification.created_at.desc(), Notification.id.desc())
+            .limit(limit + 1)
+        )
+        if unread:
+            statement = statement.where(Notification.read_at.is_(None))
+        if cursor:
+            statement = statement.where(tuple_(Notification.created_at, Notification.id) < decode_cursor(cursor))
+
+        result = await self.session.execute(statement)
+        notifications = list(result.scalars())
+        next_cursor = encode_cursor(notifications[limit - 1]) if len(notifications) > limit else None
+        return [render_notification(notification, user.lang) for notification in notifications[:limit]], next_cursor
+
+    async def unread_count(self, user_id: str) -> int:
+        count, generation = await UnreadCounter.get(user_id)
+        if count is None:
+            result = await self.session.execute(
+                select(func.count()).select_from(Notification).where(Notification.user_id == user_id, Notification.read_at.is_(None))
+            )
+            count = result.scalar_one()
+            await UnreadCounter.store(user_id, count, generation)
+        return count
+
+    async def mark_as_read(self, user_id: str, ids: Optional[List[int]] = None) -> int:
+        """Mark the given notifications (all the unread ones when ids is None) as read, in one UPDATE"""
+
+        statement = (
+            update(Notification)
+            .where(Notification.user_id == user_id, Notification.read_at.is_(None))
+            .values(read_at=datetime.now(timezone.utc))
+        )
+        if ids is not None:
+            statement = statement.where(Notification.id.in_(ids))
+        result = await self.session.execute(statement)
+        await UnitOfWork.save(self.session)
+
+        count = result.rowcount
+        if ids is not None:
+            if count:
+                await UnitOfWork.after_commit(self.session, lambda: UnreadCounter.adjust({user_id: -count}))
+        else:
+            # recounted at the next read: a SET 0 would hide the notifications created meanwhile
+            await UnitOfWork.after_commit(self.session, lambda: UnreadCounter.reset(user_id))
+        return count
@@ -1,3 +1,4 @@
+import logging
 import hashlib
 import hmac
 from typing import Annotated, Optional
@@ -11,6 +12,11 @@ from src.api.auth.models import User
 from src.api.payments.utils import check_cash_in_status
 from src.api.user.models import PermissionEnum
 from src.config import settings
+from src.database import get_unit_of_work
+from src.helper.etag import PRIVATE, conditional_response
+
+
+logger = logging.getLogger(__name__)
 # This is a placeholder for your actual dependency to get the current user
 # You should replace it with your actual implementation.
 async def get_current_active_user() -> User:
@@ -24,6 +30,7 @@ router = APIRouter()
 
 
 @router.get("/payments",response_model=PaymentPageOutSuccess)
+@conditional_response(PRIVATE)
 async def get_payment_status(
     filters: Annotated[PaymentFilter, Query(...)],
     current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_PAYMENT]))],
@@ -34,6 +41,7 @@ async def get_payment_status(
     return {"data": payments, "page": filters.page, "number": len(payments), "total_number": total}
 
 @router.get("/payments/{payment_id}",response_model=PaymentOutSuccess)
+@conditional_response(PRIVATE)
 async def get_payment_status(
     payment_id : str,
     current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_PAYMENT]))],
@@ -47,6 +55,7 @@ async def get_payment_status(
     }
 
 @router.get("/payments-by-transaction/{transaction_id}",response_model=PaymentOutSuccess)
+@conditional_response(PRIVATE)
 async def get_payment_status(
     transaction_id : str,
     current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_PAYMENT]))],
@@ -122,12 +131,12 @@ async def cinetpay_webhook_handler(
         countdown=0
     )
     
-    print("Transaction ID",cpm_trans_id)
+    logger.info("CinetPay notification for transaction %s", cpm_trans_id)
 
     # 5️⃣ Répondre avec succès (200 OK attendu par CinetPay)
     return {"ok": True}
 
-@router.get("/check-status/{transaction_id}",response_model=PaymentOutSuccess)
+@router.get("/check-status/{transaction_id}",response_model=PaymentOutSuccess,dependencies=[Depends(get_unit_of_work)])
 async def get_payment_status(
     transaction_id: str,
     payment : Annotated[User, Depends(get_payment_by_transaction)],
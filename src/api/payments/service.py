@@ -1,3 +1,4 @@
+import logging
 
 import asyncio
 import json
@@ -6,7 +7,7 @@ from celery import shared_task
 from fastapi import Depends
 import httpx
 from sqlalchemy import func, or_
-from sqlmodel import select ,Session
+from sqlmodel import select
 from src.api.job_offers.models import JobApplication
 from src.api.job_offers.service import JobOfferService
 from src.api.training.models import StudentApplication, TrainingFeeInstallmentPayment
@@ -15,7 +16,7 @@ from src.api.payments.models import CinetPayPayment, Payment, PaymentStatusEnum
 from src.api.payments.schemas import CinetPayInit, PaymentFilter, PaymentInitInput
 import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.database import get_session, get_session_async
+from src.database import get_session_async
 from src.api.user.models import User, UserStatusEnum, UserTypeEnum
 from src.api.user.schemas import CreateUserInput
 from src.api.user.service import UserService
@@ -23,6 +24,13 @@ from src.helper.notifications import NotificationService
 import secrets
 import string
 from src.redis_client import get_from_redis, set_to_redis
+from src.helper.async_task import get_http_client
+from src.helper.metrics import InstrumentedAsyncTransport
+from src.helper.password_helper import PasswordHelper
+from src.helper.unit_of_work import UnitOfWork
+
+
+logger = logging.getLogger(__name__)
 
 
 class PaymentService:
@@ -41,8 +49,6 @@ class PaymentService:
             .where(Payment.delete_at.is_(None))
         )
         count_query = select(func.count(Payment.id)).where(Payment.delete_at.is_(None))
-        
-        print(filters)
 
         if filters.search is not None:
             like_clause = or_(
@@ -119,11 +125,11 @@ class PaymentService:
             if cached:
                 return json.loads(cached)
         except Exception as e:
-            print(f"Redis cache error: {e}")
+            logger.warning("Currency rates cache unavailable: %s", e)
 
         # Si pas d'API key configurée, utiliser des taux par défaut
         if not settings.CURRENCY_API_KEY or settings.CURRENCY_API_KEY == "your_currency_api_key_here":
-            print("No currency API key configured, using default rates")
+            logger.warning("No currency API key configured, using default rates")
             default_rates = {
                 "USDXAF": 600.0,
                 "EURXAF": 675.0,
@@ -134,7 +140,7 @@ class PaymentService:
             return {rate_key: default_rates.get(rate_key, 1.0)}
         
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
+            async with httpx.AsyncClient(timeout=10.0, transport=InstrumentedAsyncTransport()) as client:
                 headers = {
                     "apikey": settings.CURRENCY_API_KEY
                 }
@@ -143,20 +149,19 @@ class PaymentService:
                 if symbols:
                     params["currencies"] = symbols
                 
-                print(f"Currency API Request - URL: {settings.CURRENCY_API_URL}")
-                print(f"Currency API Request - Params: {params}")
+                logger.debug("Currency API request", extra={"params": params})
                 
                 response = await client.get(f"{settings.CURRENCY_API_URL}", headers=headers, params=params)
                 
                 if response.status_code != 200:
-                    print(f"Currency API Error: {response.status_code} - {response.text}")
+                    logger.error("Currency API error %s: %s", response.status_code, response.text[:500])
                     raise Exception(f"Currency API returned {response.status_code}")
                 
                 data = response.json()
-                print(f"Currency API Response: {data}")
+                logger.debug("Currency API response", extra={"response": data})
                 
                 if 'quotes' not in data:
-                    print(f"Currency API Error: No 'quotes' in response: {data}")
+                    logger.error("Currency API response without quotes", extra={"response": data})
                     raise Exception("Invalid currency API response format")
                 
                 rates = data['quotes']
@@ -165,12 +170,12 @@ class PaymentService:
                 try:
                     await set_to_redis(cache_key, json.dumps(rates), ex=14400)
                 except Exception as e:
-                    print(f"Redis cache set error: {e}")
+                    logger.warning("Currency rates cache unavailable: %s", e)
                 
                 return rates
                 
         except Exception as e:
-            print(f"Currency API Error: {e}")
+            logger.warning("Currency API unavailable, using default rates: %s", e)
             # Fallback to default rates
             default_rates = {
                 "USDXAF": 600.0,
@@ -192,7 +197,7 @@ class PaymentService:
             quota = await self.get_currency_rates(payment_data.product_currency, [payment_currency])
             product_currency_to_payment_currency_rate = quota[f"{payment_data.product_currency}{payment_currency}"]
         except Exception as e:
-            print(f"Currency conversion error: {e}")
+            logger.warning("Currency conversion error: %s", e)
             # Utiliser un taux par défaut si la conversion échoue
             if payment_currency == "XAF" and payment_data.product_currency == "EUR":
                 product_currency_to_payment_currency_rate = 650.0  # 1 EUR = 650 XAF
@@ -201,16 +206,17 @@ class PaymentService:
             else:
                 product_currency_to_payment_currency_rate = 1.0  # Pas de conversion
         
-        print(f"Currency Conversion - Original Amount: {payment_data.amount} {payment_data.product_currency}")
-        print(f"Currency Conversion - Rate: {product_currency_to_payment_currency_rate}")
-        print(f"Currency Conversion - Converted Amount: {payment_data.amount * product_currency_to_payment_currency_rate} {payment_currency}")
+        logger.debug(
+            "Currency conversion %s %s -> %s at %s",
+            payment_data.amount, payment_data.product_currency, payment_currency, product_currency_to_payment_currency_rate,
+        )
         
         try:
             quota = await self.get_currency_rates("USD", [payment_currency, payment_data.product_currency])
             usd_to_payment_currency_rate = quota[f"USD{payment_currency}"]
             usd_to_product_currency_rate = quota[f"USD{payment_data.product_currency}"]
         except Exception as e:
-            print(f"USD currency conversion error: {e}")
+            logger.warning("USD currency conversion error: %s", e)
             # Utiliser des taux par défaut
             usd_to_payment_currency_rate = 600.0 if payment_currency == "XAF" else 1.0
             usd_to_product_currency_rate = 1.0 if payment_data.product_currency == "USD" else 0.0017
@@ -230,7 +236,7 @@ class PaymentService:
         )
         
         final_amount = PaymentService.round_up_to_nearest_5(payment_data.amount * product_currency_to_payment_currency_rate)
-        print(f"CinetPay Amount - Final Amount: {final_amount} {payment_currency}")
+        logger.debug("CinetPay amount %s %s", final_amount, payment_currency)
         
         cinetpay_data = CinetPayInit(
             transaction_id=payment.transaction_id,
@@ -258,7 +264,7 @@ class PaymentService:
                 result = await cinetpay_client.initiate_cinetpay_swallow_payment(cinetpay_data)
             else :
                 result = await cinetpay_client.initiate_cinetpay_payment( cinetpay_data)
-        except Exception as e:
+        except Exception:
             return {
                 "success": False,
                 "message":"unable to initiate payment",
@@ -286,8 +292,7 @@ class PaymentService:
         payment.payment_type = cinetpay_payment.__class__.__name__
         
         self.session.add(payment)
-        await self.session.commit()
-        await self.session.refresh(payment)
+        await UnitOfWork.save(self.session)
         
         return {
             "success": True,
@@ -315,98 +320,86 @@ class PaymentService:
             cinetpay_payment = await cinetpay_client.get_cinetpay_payment(payment.transaction_id)
             
             if cinetpay_payment is None:
+                logger.warning("CinetPay payment %s not found", payment.transaction_id)
                 
                 payment.status = PaymentStatusEnum.ERROR
-                await self.session.commit()
-                await self.session.refresh(payment)
+                await UnitOfWork.save(self.session)
             else :
                 result = await  CinetPayService.check_cinetpay_payment_status(payment.transaction_id)
+                logger.debug("CinetPay payment status", extra={"transaction_id": payment.transaction_id, "response": result})
                 
-                if result["data"]["status"] : #== "ACCEPTED":
+                if result["data"]["status"] == "ACCEPTED":
+                    logger.info("CinetPay payment %s accepted", payment.transaction_id)
                     payment.status = PaymentStatusEnum.ACCEPTED.value
                     cinetpay_payment.status = PaymentStatusEnum.ACCEPTED.value
                     cinetpay_payment.amount_received = result["data"]["amount"]
                     
                     if payment.payable_type == "JobApplication":
                         job_application_service = JobOfferService(session=self.session)
-                        job_offer = await job_application_service.update_job_application_payment(payment_id=int(payment.id),application_id=payment.payable_id)
-                    
-                    elif payment.payable_type == "StudentApplication":
-                        statement = select(StudentApplication).where(StudentApplication.id == payment.payable_id)
-                        result = await self.session.execute(statement)
-                        student_application = result.scalars().one()
-                        student_application.payment_id = payment.id
-                        await self.session.commit()
-                        await self.session.refresh(student_application)
-                    
-                elif result["data"]["status"] == "REFUSED":
-                    payment.status = PaymentStatusEnum.REFUSED.value
-                    cinetpay_payment.status = PaymentStatusEnum.REFUSED.value
-                
-                await self.session.commit()
-                await self.session.refresh(payment)
-                await self.session.refresh(cinetpay_payment)
-
-        return payment
-    
-    @staticmethod
-    def check_payment_status_sync(session : Session, payment : Payment):
-        if payment.payment_type == "CinetPayPayment":
-            print("CinetPayPayment",payment.transaction_id)
-        
-            cinetpay_statement = (
-                select(CinetPayPayment).where(CinetPayPayment.transaction_id == payment.transaction_id)
-                )
-            cinetpay_payment = session.exec(cinetpay_statement).first()
-            
-            if cinetpay_payment is None:
-                print("CinetPayPayment not found")
-                
-                payment.status = PaymentStatusEnum.ERROR
-                session.commit()
-            else :
-                result =   CinetPayService.check_cinetpay_payment_status_sync(payment.transaction_id)
-                print("result",result)
-                
-                if True : #result["data"]["status"]  == "ACCEPTED":
-                    print("ACCEPTED")
-                    payment.status = PaymentStatusEnum.ACCEPTED.value
-                    cinetpay_payment.status = PaymentStatusEnum.ACCEPTED.value
-                    cinetpay_payment.amount_received = result["data"]["amount"]
-                    
-                    if payment.payable_type == "JobApplication":
-                        
-                        job_application_statement = (
-                            select(JobApplication).where(JobApplication.id == int(payment.payable_id))
-                            )
-                        job_application = session.exec(job_application_statement).first()
-                        job_application.payment_id = payment.id
-                        session.commit()
-                        session.refresh(job_application)
+                        job_application = await job_application_service.update_job_application_payment(payment_id=payment.id,application_id=int(payment.payable_id))
                         # Créer automatiquement un compte utilisateur pour le candidat
-                        PaymentService._create_job_application_user_sync_static(job_application, session)
+                        await self._create_job_application_user(job_application)
                     
                     elif payment.payable_type == "StudentApplication":
                         statement = select(StudentApplication).where(StudentApplication.id == int(payment.payable_id))
-                        student_application = session.exec(statement).first()
+                        result = await self.session.execute(statement)
+                        student_application = result.scalars().one()
                         student_application.payment_id = payment.id
-                        session.commit()
                         
                     elif payment.payable_type == "TrainingFeeInstallmentPayment" :
-                        training_fee_installment_payment_statement = (
-                            select(TrainingFeeInstallmentPayment).where(TrainingFeeInstallmentPayment.id == int(payment.payable_id))
-                            )
-                        training_fee_installment_payment = session.exec(training_fee_installment_payment_statement).first()
+                        statement = select(TrainingFeeInstallmentPayment).where(TrainingFeeInstallmentPayment.id == int(payment.payable_id))
+                        result = await self.session.execute(statement)
+                        training_fee_installment_payment = result.scalars().one()
                         training_fee_installment_payment.payment_id = payment.id
-                        session.commit()
                     
                 elif result["data"]["status"] == "REFUSED":
                     payment.status = PaymentStatusEnum.REFUSED.value
                     cinetpay_payment.status = PaymentStatusEnum.REFUSED.value
                 
-                session.commit()
+                await UnitOfWork.save(self.session)
 
         return payment
+
+    async def _create_job_application_user(self, job_application: JobApplication) -> None:
+        """Créer un compte utilisateur pour le candidat d'emploi après paiement confirmé"""
+
+        user_service = UserService(self.session)
+        if await user_service.get_by_email(job_application.email) is not None:
+            return
+
+        username = f"candidate_{job_application.first_name.lower()}_{job_application.last_name.lower()}_{job_application.id}"
+        temp_password = self._generate_temp_password_static()
+
+        user = User(
+            first_name=job_application.first_name,
+            last_name=job_application.last_name,
+            email=job_application.email,
+            mobile_number=job_application.phone_number,
+            password=await PasswordHelper.hash(temp_password),
+            status=UserStatusEnum.ACTIVE,
+            user_type=UserTypeEnum.STUDENT,
+            two_factor_enabled=False,
+        )
+        self.session.add(user)
+        await UnitOfWork.save(self.session)
+
+        async def send_credentials():
+            await NotificationService().send_job_application_credentials_email({
+                "email": job_application.email,
+                "username": username,
+                "temporary_password": temp_password,
+                "login_url": f"{settings.BASE_URL}/auth/login",
+                "candidate_name": f"{job_application.first_name} {job_application.last_name}",
+            })
+            logger.info("User account created for job application %s", job_application.id)
+
+        await UnitOfWork.after_commit(self.session, send_credentials)
+
+    @staticmethod
+    def _generate_temp_password_static(length: int = 12) -> str:
+        """Générer un mot de passe temporaire"""
+        characters = string.ascii_letters + string.digits + "!@#$%^&*"
+        return ''.join(secrets.choice(characters) for _ in range(length))
     
 
 class CinetPayService:
@@ -417,19 +410,15 @@ class CinetPayService:
     async def initiate_cinetpay_payment(self, payment_data: CinetPayInit):
         
         # Validation des paramètres CinetPay
-        print(f"=== CINETPAY CONFIGURATION CHECK ===")
-        print(f"API Key: {settings.CINETPAY_API_KEY}")
-        print(f"Site ID: {settings.CINETPAY_SITE_ID}")
-        print(f"Notify URL: {settings.CINETPAY_NOTIFY_URL}")
-        print(f"Return URL: {settings.CINETPAY_RETURN_URL}")
-        print(f"Payment Amount: {payment_data.amount}")
-        print(f"Payment Currency: {payment_data.currency}")
-        print(f"Transaction ID: {payment_data.transaction_id}")
+        logger.info(
+            "Initiating CinetPay payment %s: %s %s",
+            payment_data.transaction_id, payment_data.amount, payment_data.currency,
+        )
         
         # Vérification des paramètres requis
         if not settings.CINETPAY_API_KEY or settings.CINETPAY_API_KEY == "your_cinetpay_api_key_here":
             error_msg = "CinetPay API Key is not configured or is invalid"
-            print(f"ERROR: {error_msg}")
+            logger.error(error_msg)
             return {
                 "status": "error",
                 "code": "INVALID_API_KEY",
@@ -438,7 +427,7 @@ class CinetPayService:
         
         if not settings.CINETPAY_SITE_ID or settings.CINETPAY_SITE_ID == "your_cinetpay_site_id_here":
             error_msg = "CinetPay Site ID is not configured or is invalid"
-            print(f"ERROR: {error_msg}")
+            logger.error(error_msg)
             return {
                 "status": "error",
                 "code": "INVALID_SITE_ID",
@@ -447,7 +436,7 @@ class CinetPayService:
         
         if payment_data.amount <= 0:
             error_msg = "Payment amount must be greater than 0"
-            print(f"ERROR: {error_msg}")
+            logger.error(error_msg)
             return {
                 "status": "error",
                 "code": "INVALID_AMOUNT",
@@ -460,8 +449,6 @@ class CinetPayService:
         # Utiliser les canaux de paiement configurés pour inclure les cartes bancaires
         channels_param = settings.CINETPAY_CHANNELS
         
-        print(f"CinetPay Channels: {channels_param}")
-        
         payload = {
             "amount": payment_data.amount,
             "currency": payment_data.currency,
@@ -497,45 +484,36 @@ class CinetPayService:
             
         payload["customer_zip_code"] = "065100"
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            print(f"=== CINETPAY API REQUEST ===")
-            print(f"URL: https://api-checkout.cinetpay.com/v2/payment")
-            print(f"Payload: {json.dumps(payload, indent=2)}")
-            
+        async with httpx.AsyncClient(timeout=30.0, transport=InstrumentedAsyncTransport()) as client:
             try:
                 response = await client.post("https://api-checkout.cinetpay.com/v2/payment", json=payload)
             except httpx.TimeoutException as timeout_error:
-                print(f"CinetPay API Timeout: {timeout_error}")
+                logger.error("CinetPay API timeout: %s", timeout_error)
                 return {
                     "status": "error",
                     "code": "TIMEOUT",
                     "message": f"CinetPay API timeout: {str(timeout_error)}"
                 }
             except httpx.ConnectError as connect_error:
-                print(f"CinetPay API Connection Error: {connect_error}")
+                logger.error("CinetPay API connection error: %s", connect_error)
                 return {
                     "status": "error",
                     "code": "CONNECTION_ERROR",
                     "message": f"CinetPay API connection failed: {str(connect_error)}"
                 }
             except Exception as http_error:
-                print(f"CinetPay API HTTP Error: {http_error}")
+                logger.error("CinetPay API HTTP error: %s", http_error)
                 return {
                     "status": "error",
                     "code": "HTTP_ERROR",
                     "message": f"CinetPay API error: {str(http_error)}"
                 }
             
-            print(f"=== CINETPAY API RESPONSE ===")
-            print(f"Status Code: {response.status_code}")
-            print(f"Headers: {dict(response.headers)}")
-            
             try:
                 response_data = response.json()
-                print(f"Response Body: {json.dumps(response_data, indent=2)}")
-            except Exception as json_error:
-                print(f"Failed to parse JSON response: {json_error}")
-                print(f"Raw response text: {response.text}")
+                logger.debug("CinetPay API response %s", response.status_code, extra={"response": response_data})
+            except Exception:
+                logger.error("Invalid CinetPay API response %s: %s", response.status_code, response.text[:500])
                 return {
                     "status": "error",
                     "code": "INVALID_JSON_RESPONSE",
@@ -544,7 +522,7 @@ class CinetPayService:
             
             if response.status_code == 400:
                 error_message = f"CinetPay Error: {response_data.get('message', 'Unknown error')} - {response_data.get('description', 'No description')}"
-                print(f"CinetPay Error Details: {error_message}")
+                logger.error(error_message)
                 return {
                     "status": "error",
                     "code": response_data.get("code", "UNKNOWN_ERROR"),
@@ -553,7 +531,7 @@ class CinetPayService:
             
             if response.status_code != 200:
                 error_message = f"HTTP Error {response.status_code}: {response_data.get('message', 'Unknown error')}"
-                print(f"HTTP Error: {error_message}")
+                logger.error(error_message)
                 return {
                     "status": "error",
                     "code": f"HTTP_{response.status_code}",
@@ -577,14 +555,13 @@ class CinetPayService:
 
 
                 self.session.add(db_payment)
-                await self.session.commit()
-                await self.session.refresh(db_payment)
+                await UnitOfWork.save(self.session)
                 return {
                     "status": "success",
                     "data": db_payment
                 }
             else:
-                print(response_data["message"])
+                logger.error("CinetPay payment not created: %s", response_data["message"])
                 raise Exception(response_data["message"])
 
     async def initiate_cinetpay_swallow_payment(self, payment_data: CinetPayInit):
@@ -597,8 +574,7 @@ class CinetPayService:
             )
 
         self.session.add(db_payment)
-        await self.session.commit()
-        await self.session.refresh(db_payment)
+        await UnitOfWork.save(self.session)
         return db_payment
 
     @staticmethod
@@ -608,111 +584,13 @@ class CinetPayService:
             "site_id": settings.CINETPAY_SITE_ID,
             "transaction_id": transaction_id
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post("https://api-checkout.cinetpay.com/v2/payment/check", json=payload)
-            response.raise_for_status()
-            return response.json()
+        response = await get_http_client().post("https://api-checkout.cinetpay.com/v2/payment/check", json=payload, timeout=30)
+        response.raise_for_status()
+        return response.json()
         
     
-    @staticmethod
-    def check_cinetpay_payment_status_sync(transaction_id: str):
-        payload = {
-            "apikey": settings.CINETPAY_API_KEY,
-            "site_id": settings.CINETPAY_SITE_ID,
-            "transaction_id": transaction_id
-        }
-        # Using synchronous HTTP client
-        with httpx.Client() as client:
-            response = client.post(
-                "https://api-checkout.cinetpay.com/v2/payment/check",
-                json=payload,
-                timeout=30  # optional, set a timeout
-            )
-            response.raise_for_status()
-            return response.json()
-
     async def get_cinetpay_payment(self, transaction_id: str):
         statement = select(CinetPayPayment).where(CinetPayPayment.transaction_id == transaction_id)
         cinetpay_payment = await self.session.execute(statement)
         
         return cinetpay_payment.scalars().first()
-    
-    @staticmethod
-    def _create_job_application_user_sync_static(job_application: JobApplication, session: Session) -> None:
-        """Créer un compte utilisateur pour le candidat d'emploi après paiement confirmé (version synchrone)"""
-        try:
-            # Générer un nom d'utilisateur unique
-            username = f"candidate_{job_application.first_name.lower()}_{job_application.last_name.lower()}_{job_application.id}"
-            
-            # Générer un mot de passe temporaire
-            temp_password = PaymentService._generate_temp_password_static()
-            
-            # Créer l'utilisateur directement
-            from src.api.user.models import User
-            from datetime import datetime
-            
-            user = User(
-                first_name=job_application.first_name,
-                last_name=job_application.last_name,
-                email=job_application.email,
-                mobile_number=job_application.phone_number,
-                status=UserStatusEnum.ACTIVE,
-                user_type=UserTypeEnum.STUDENT,
-                two_factor_enabled=False,
-                web_token=None,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            
-            # Hasher le mot de passe
-            from passlib.context import CryptContext
-            pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-            user.password_hash = pwd_context.hash(temp_password)
-            
-            session.add(user)
-            session.commit()
-            session.refresh(user)
-            
-            # Mettre à jour la candidature avec l'ID utilisateur
-            job_application.user_id = user.id
-            session.commit()
-            
-            # Envoyer les identifiants par email (version synchrone)
-            PaymentService._send_job_application_credentials_email_sync_static(job_application, username, temp_password)
-            
-            print(f"Compte utilisateur créé pour le candidat {job_application.first_name} {job_application.last_name}")
-            
-        except Exception as e:
-            print(f"Erreur lors de la création du compte utilisateur pour la candidature d'emploi: {e}")
-            raise e
-
-    @staticmethod
-    def _generate_temp_password_static(length: int = 12) -> str:
-        """Générer un mot de passe temporaire"""
-        characters = string.ascii_letters + string.digits + "!@#$%^&*"
-        return ''.join(secrets.choice(characters) for _ in range(length))
-
-    @staticmethod
-    def _send_job_application_credentials_email_sync_static(job_application: JobApplication, username: str, password: str) -> None:
-        """Envoyer les identifiants par email pour les candidatures d'emploi (version synchrone)"""
-        try:
-            from src.helper.notifications import JobApplicationCredentialsNotification
-            
-            # Créer la notification directement
-            notification = JobApplicationCredentialsNotification(
-                email=job_application.email,
-                username=username,
-                temporary_password=password,
-                candidate_name=f"{job_application.first_name} {job_application.last_name}",
-                login_url=f"{settings.BASE_URL}/auth/login"
-            )
-            
-            # Envoyer l'email avec les identifiants
-            notification.send_notification()
-            
-            print(f"Identifiants envoyés par email à {job_application.email}")
-            
-        except Exception as e:
-            print(f"Erreur lors de l'envoi de l'email: {e}")
-            raise e
-
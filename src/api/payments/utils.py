@@ -1,30 +1,33 @@
+import logging
 from celery import shared_task
 from sqlalchemy import select
 
 from src.api.payments.models import Payment, PaymentStatusEnum
 from src.api.payments.service import PaymentService
-from src.database import get_session
+from src.database import async_session
+from src.helper.async_task import AsyncTask
 
 
-@shared_task
-def check_cash_in_status(transaction_id: str) -> dict:
+logger = logging.getLogger(__name__)
+
+
+@shared_task(base=AsyncTask)
+async def check_cash_in_status(transaction_id: str) -> dict:
     """
-    Celery task to check cash-in status for a payment.
+    Celery task to check cash-in status for a payment, with the async
+    payment service (run on the worker event loop).
     """
 
-    with get_session() as session:
+    async with async_session() as session:
             payment_statement = select(Payment).where(Payment.transaction_id == transaction_id)
-            payment = session.scalars(payment_statement).first()
-            print(payment.model_dump())
-            
+            payment = (await session.scalars(payment_statement)).first()
             if not payment:
-                print("Payment not found")
+                logger.warning("Payment %s not found", transaction_id)
                 return {"message": "failed", "data": None}
 
             if payment.status == PaymentStatusEnum.PENDING.value:
-                print("Payment is pending")
-                payment = PaymentService.check_payment_status_sync(session, payment)
-
-            return {"message": "success", "data": payment.model_dump()}
-    # ✅ Correctly wrap the async function
+                logger.info("Payment %s is pending, checking its status", transaction_id)
+                payment = await PaymentService(session).check_payment_status(payment)
 
+            # the result is not stored (ignore_result): only what the task log needs
+            return {"message": "success", "data": {"id": payment.id, "status": payment.status}}
@@ -1,3 +1,4 @@
+import logging
 from fastapi import APIRouter, Depends
 from sqlmodel import select, func, and_, or_
 from datetime import datetime, timedelta
@@ -5,6 +6,9 @@ from typing import Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database import get_session_async
 
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.get("/health")
@@ -378,9 +382,7 @@ async def get_comprehensive_statistics(
         
     except Exception as e:
         # Log l'erreur pour le debugging
-        print(f"Erreur dans get_comprehensive_statistics: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Erreur dans get_comprehensive_statistics")
         
         # Retourner des données par défaut en cas d'erreur
         return {
@@ -633,9 +635,7 @@ async def get_payment_statistics(
         
     except Exception as e:
         # Log l'erreur pour le debugging
-        print(f"Erreur dans get_payment_statistics: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Erreur dans get_payment_statistics")
         
         # Retourner des données par défaut en cas d'erreur
         return {
@@ -0,0 +1,122 @@
+from typing import Annotated, Literal
+from celery.utils import uuid
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, RedirectResponse
+
+from src.api.auth.utils import check_permissions, get_current_active_user
+from src.api.job_offers.schemas import JobApplicationFilter
+from src.api.payments.schemas import PaymentFilter
+from src.api.training.schemas import StudentApplicationFilter
+from src.api.user.models import PermissionEnum, User
+from src.api.user.schemas import UserFilter
+from src.celery_utils import get_task_info
+from src.helper.export_helper import EXPORT_CONTENT_TYPES, ExportHelper, export_dataset_task
+from src.helper.schemas import BaseOutFail, ErrorMessage
+from src.helper.task_status import TaskStatus
+
+router = APIRouter()
+
+ExportFormat = Annotated[Literal["csv", "xlsx"], Query()]
+
+
+def start_export(request: Request, dataset: str, fmt: str, filters, user: User) -> dict:
+    # the owner is recorded before the task is queued, so a PENDING export is already readable by them only
+    task_id = uuid()
+    TaskStatus.set(task_id, "PENDING", user_id=str(user.id))
+    export_dataset_task.apply_async(args=(dataset, fmt, filters.model_dump(mode="json"), str(user.id)), task_id=task_id)
+    return {"message": "Export started", "data": {
+        "task_id": task_id,
+        "status_url": str(request.url_for("get_export_status", task_id=task_id)),
+    }}
+
+
+def get_owned_export(task_id: str, user: User) -> dict:
+    """Status record of an export of `user`: 404 for any other task (other owner, no owner, unknown or expired)"""
+
+    info = get_task_info(task_id)
+    if info.pop("user_id", None) != str(user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=BaseOutFail(
+                message=ErrorMessage.EXPORT_NOT_FOUND.description,
+                error_code=ErrorMessage.EXPORT_NOT_FOUND.value
+            ).model_dump()
+        )
+    return info
+
+
+@router.post("/exports/users", status_code=status.HTTP_202_ACCEPTED, tags=["Exports"])
+async def export_users(
+    request: Request,
+    current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_USER]))],
+    filters: UserFilter,
+    format: ExportFormat = "csv",
+):
+    return start_export(request, "users", format, filters, current_user)
+
+
+@router.post("/exports/student-applications", status_code=status.HTTP_202_ACCEPTED, tags=["Exports"])
+async def export_student_applications(
+    request: Request,
+    current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_STUDENT_APPLICATION]))],
+    filters: StudentApplicationFilter,
+    format: ExportFormat = "csv",
+):
+    return start_export(request, "student_applications", format, filters, current_user)
+
+
+@router.post("/exports/job-applications", status_code=status.HTTP_202_ACCEPTED, tags=["Exports"])
+async def export_job_applications(
+    request: Request,
+    current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_JOB_APPLICATION]))],
+    filters: JobApplicationFilter,
+    format: ExportFormat = "csv",
+):
+    return start_export(request, "job_applications", format, filters, current_user)
+
+
+@router.post("/exports/payments", status_code=status.HTTP_202_ACCEPTED, tags=["Exports"])
+async def export_payments(
+    request: Request,
+    current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_PAYMENT]))],
+    filters: PaymentFilter,
+    format: ExportFormat = "csv",
+):
+    return start_export(request, "payments", format, filters, current_user)
+
+
+@router.get("/exports/{task_id}", tags=["Exports"])
+async def get_export_status(
+    request: Request,
+    task_id: str,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+):
+    """Progress of an export (rows written / total), with the download link once done"""
+
+    info = get_owned_export(task_id, current_user)
+    if info["state"] == "SUCCESS":
+        info["download_url"] = str(request.url_for("download_export", task_id=task_id))
+    return {"message": "Export status fetched successfully", "data": info}
+
+
+@router.get("/exports/{task_id}/download", tags=["Exports"])
+async def download_export(
+    task_id: str,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+):
+    info = get_owned_export(task_id, current_user)
+    if info["state"] != "SUCCESS":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=BaseOutFail(
+                message=ErrorMessage.EXPORT_NOT_READY.description,
+                error_code=ErrorMessage.EXPORT_NOT_READY.value
+            ).model_dump()
+        )
+
+    export = info["result"]
+    location = ExportHelper.download_location(export["file_path"])
+    if export["file_path"].startswith("uploads/"):
+        return FileResponse(location, media_type=EXPORT_CONTENT_TYPES[export["format"]], filename=export["file_name"])
+
+    return RedirectResponse(location, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
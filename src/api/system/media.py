@@ -0,0 +1,62 @@
+from typing import Annotated, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse, RedirectResponse
+
+from src.helper.image_helper import IMAGE_CONTENT_TYPES, ImageHelper
+from src.helper.schemas import BaseOutFail, ErrorMessage
+
+router = APIRouter()
+
+
+@router.get("/images", tags=["Media"])
+async def get_image_derivative(
+    request: Request,
+    src: Annotated[str, Query(description="Stored path or public url of the original image")],
+    w: Annotated[Optional[int], Query(gt=0, le=4096)] = None,
+    fmt: Annotated[Optional[Literal["webp", "jpeg"]], Query()] = None,
+):
+    """
+    Serve a resized derivative of a public image (post cover, section cover,
+    profile picture, default cover). The derivative is generated on first
+    request and cached under a deterministic key, so the response is immutable.
+    """
+
+    if not ImageHelper.is_supported_source(src):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=BaseOutFail(
+                message=ErrorMessage.INVALID_IMAGE_SOURCE.description,
+                error_code=ErrorMessage.INVALID_IMAGE_SOURCE.value
+            ).model_dump()
+        )
+
+    formats = ImageHelper.supported_formats()
+    headers = {"Cache-Control": ImageHelper.cache_control()}
+    if fmt is None:
+        # negotiate the format from the Accept header
+        fmt = "webp" if "webp" in formats and "image/webp" in request.headers.get("accept", "") else "jpeg"
+        headers["Vary"] = "Accept"
+
+    if fmt not in formats:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=BaseOutFail(
+                message=ErrorMessage.IMAGE_FORMAT_NOT_SUPPORTED.description,
+                error_code=ErrorMessage.IMAGE_FORMAT_NOT_SUPPORTED.value
+            ).model_dump()
+        )
+
+    location = await ImageHelper.get_or_create_derivative(src, w, fmt)
+    if location is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=BaseOutFail(
+                message=ErrorMessage.IMAGE_NOT_FOUND.description,
+                error_code=ErrorMessage.IMAGE_NOT_FOUND.value
+            ).model_dump()
+        )
+
+    if location.startswith("static/"):
+        return FileResponse(f"src/{location}", media_type=IMAGE_CONTENT_TYPES[fmt], headers=headers)
+
+    return RedirectResponse(location, status_code=status.HTTP_301_MOVED_PERMANENTLY, headers=headers)
@@ -4,6 +4,8 @@ from typing import Annotated
 from src.api.auth.utils import check_permissions, get_current_active_user
 from src.api.system.dependencies import get_organization_center
 from src.api.user.models import PermissionEnum, User
+from src.helper.cache import cache_response
+from src.helper.etag import PRIVATE, PUBLIC, conditional_response
 from src.helper.schemas import BaseOutFail, ErrorMessage
 from src.api.system.service import OrganizationCenterService
 from src.api.system.schemas import (
@@ -21,6 +23,7 @@ from src.api.system.models import OrganizationCenter
 router = APIRouter()
 
 @router.get("/organization-centers", response_model=OrganizationCentersPageOutSuccess, tags=["Organization Centers"])
+@conditional_response(PRIVATE)
 async def read_organization_centers_list(
     current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_ORGANIZATION_CENTER]))],
     filter_query: Annotated[OrganizationCenterFilter, Query(...)],
@@ -73,6 +76,7 @@ async def create_organization_center(
     return {"data": organization, "message": "Organization Center created successfully"}
 
 @router.get("/organization-centers/{organization_id}", response_model=OrganizationCenterOutSuccess, tags=["Organization Centers"])
+@conditional_response(PRIVATE)
 async def read_organization_center_by_id(
     current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_ORGANIZATION_CENTER]))],
     organization: Annotated[OrganizationCenter, Depends(get_organization_center)]
@@ -157,6 +161,7 @@ async def read_organization_centers_internal(
 
 
 @router.get("/organization-centers/location/{country_code}", response_model=OrganizationCenterListOutSuccess, tags=["Organization Centers"])
+@conditional_response(PUBLIC)
 async def read_organization_centers_by_location(
     country_code: str,
     city: str = Query(None),
@@ -168,6 +173,8 @@ async def read_organization_centers_by_location(
     return {"data": organizations, "message": "Organization Centers fetched successfully"}
 
 @router.get("/organization-centers/{organization_id}/public", response_model=OrganizationCenterOutSuccess, tags=["Organization Centers"])
+@conditional_response(PUBLIC)
+@cache_response("public_organization_center", tags=["organization_center:{organization_id}"])
 async def read_organization_center_public(
     organization_id: int,
     org_service: OrganizationCenterService = Depends()
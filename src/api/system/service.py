@@ -5,6 +5,7 @@ from sqlalchemy import func
 from sqlalchemy.orm import selectinload
 from src.api.system.schemas import OrganizationCenterFilter
 from src.database import get_session_async
+from src.helper.cache import ResponseCache
 from src.api.system.models import OrganizationCenter, OrganizationStatusEnum, OrganizationTypeEnum
 from sqlmodel import select, or_
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -146,6 +147,7 @@ class OrganizationCenterService:
         self.session.add(organization)
         await self.session.commit()
         await self.session.refresh(organization)
+        await ResponseCache.invalidate(f"organization_center:{org_id}")
         return organization
 
     async def update_status(self, org_id: int, status: OrganizationStatusEnum):
@@ -157,6 +159,7 @@ class OrganizationCenterService:
         self.session.add(organization)
         await self.session.commit()
         await self.session.refresh(organization)
+        await ResponseCache.invalidate(f"organization_center:{org_id}")
         return organization
 
     async def delete(self, org_id: int):
@@ -169,6 +172,7 @@ class OrganizationCenterService:
         self.session.add(organization)
         await self.session.commit()
         await self.session.refresh(organization)
+        await ResponseCache.invalidate(f"organization_center:{org_id}")
         return organization
 
     async def get_all_active(self):
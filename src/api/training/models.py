@@ -5,7 +5,7 @@ from src.helper.model import CustomBaseUUIDModel, CustomBaseModel
 from typing import Dict, List, Optional
 from enum import Enum
 from datetime import datetime
-from sqlalchemy import TIMESTAMP, Column, JSON, Numeric
+from sqlalchemy import TIMESTAMP, Column, JSON, Numeric, Text
 
 class TrainingTypeEnum(str, Enum):
     ON_SITE = "On-Site"
@@ -125,6 +125,14 @@ class StudentAttachment(CustomBaseModel, table=True):
     file_path: str = Field(max_length=255)
     upload_date: Optional[datetime] = Field(default=None)
 
+    # PDF processing (filled by the document worker)
+    processing_status: Optional[str] = Field(default=None, max_length=20)
+    page_count: Optional[int] = Field(default=None)
+    extracted_text: Optional[str] = Field(default=None, sa_column=Column(Text))
+    optimized_file_path: Optional[str] = Field(default=None, max_length=255)
+    file_size: Optional[int] = Field(default=None)
+    optimized_file_size: Optional[int] = Field(default=None)
+
 
 class TrainingFeeInstallmentPayment(CustomBaseModel, table=True):
     __tablename__ = "training_fee_installment_payments"
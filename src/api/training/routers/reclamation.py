@@ -19,6 +19,8 @@ from src.api.training.dependencies import (
     get_reclamation,
     get_user_reclamation,
 )
+from src.helper.cache import cache_response
+from src.helper.etag import PRIVATE, PUBLIC, conditional_response
 from src.helper.schemas import BaseOutFail, ErrorMessage
 
 router = APIRouter()
@@ -48,6 +50,7 @@ async def create_my_reclamation(
 
 
 @router.get("/my-reclamations", response_model=ReclamationsPageOutSuccess, tags=["My Reclamations"])
+@conditional_response(PRIVATE)
 async def list_my_reclamations(
     filters: Annotated[ReclamationFilter, Query(...)],
     current_user: Annotated[User, Depends(get_current_active_user)],
@@ -65,6 +68,7 @@ async def list_my_reclamations(
 
 
 @router.get("/my-reclamations/{reclamation_id}", response_model=ReclamationOutSuccess, tags=["My Reclamations"])
+@conditional_response(PRIVATE)
 async def get_my_reclamation(
     reclamation_id: int,
     current_user: Annotated[User, Depends(get_current_active_user)],
@@ -144,6 +148,7 @@ async def delete_my_reclamation(
 
 # Admin Reclamation Endpoints
 @router.get("/reclamations", response_model=ReclamationsPageOutSuccess, tags=["Admin Reclamations"])
+@conditional_response(PRIVATE)
 async def list_all_reclamations_admin(
     filters: Annotated[ReclamationFilter, Query(...)],
     current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_RECLAMATION]))],
@@ -161,6 +166,7 @@ async def list_all_reclamations_admin(
 
 
 @router.get("/reclamations/{reclamation_id}", response_model=ReclamationOutSuccess, tags=["Admin Reclamations"])
+@conditional_response(PRIVATE)
 async def get_reclamation_admin(
     reclamation_id: int,
     current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_RECLAMATION]))],
@@ -187,6 +193,8 @@ async def update_reclamation_status(
 
 # Reclamation Types Endpoints
 @router.get("/reclamation-types/active/all", response_model=ReclamationTypeListOutSuccess, tags=["Reclamation Types"])
+@conditional_response(PUBLIC)
+@cache_response("active_reclamation_types", tags=["reclamation_types"])
 async def get_active_reclamation_types(
     reclamation_service: ReclamationService = Depends(),
 ):
@@ -206,6 +214,7 @@ async def create_reclamation_type(
     return {"message": "Reclamation type created successfully", "data": reclamation_type}
 
 @router.get("/reclamation-types/{type_id}", response_model=ReclamationTypeOutSuccess, tags=["Reclamation Types"])
+@conditional_response(PUBLIC)
 async def get_reclamation_type(
     type_id: int,
     reclamation_service: ReclamationService = Depends(),
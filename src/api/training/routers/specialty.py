@@ -2,6 +2,8 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from src.api.auth.utils import check_permissions
 from src.api.user.models import PermissionEnum, User
+from src.helper.cache import cache_response
+from src.helper.etag import PUBLIC, conditional_response
 from src.helper.schemas import BaseOutFail
 from src.api.training.services import SpecialtyService
 from src.api.training.schemas import (
@@ -18,6 +20,7 @@ router = APIRouter()
 
 # Specialty CRUD Endpoints
 @router.get("/specialties", response_model=SpecialtiesPageOutSuccess, tags=["Specialty"])
+@conditional_response(PUBLIC)
 async def list_specialties(
     filters: Annotated[SpecialtyFilter, Query(...)],
     specialty_service: SpecialtyService = Depends(),
@@ -56,6 +59,7 @@ async def create_specialty(
 
 
 @router.get("/specialties/{specialty_id}", response_model=SpecialtyOutSuccess, tags=["Specialty"])
+@conditional_response(PUBLIC)
 async def get_specialty_route(
     specialty_id: int,
     specialty=Depends(get_specialty),
@@ -101,6 +105,8 @@ async def delete_specialty_route(
 
 
 @router.get("/specialties/active/all", response_model=SpecialtyListOutSuccess, tags=["Specialty"])
+@conditional_response(PUBLIC)
+@cache_response("active_specialties", tags=["specialties"])
 async def get_active_specialties(
     specialty_service: SpecialtyService = Depends(),
 ):
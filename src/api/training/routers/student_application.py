@@ -1,12 +1,20 @@
-from typing import Annotated
+from typing import Annotated, List, Optional
 from fastapi import APIRouter, Depends, Form, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from src.config import settings
+from src.database import get_unit_of_work
 from src.api.auth.utils import check_permissions, get_current_active_user
 from src.api.job_offers.models import ApplicationStatusEnum
 from src.api.payments.schemas import InitPaymentOutSuccess
 from src.api.user.models import PermissionEnum, User
-from src.helper.schemas import BaseOutFail, ErrorMessage
+from src.helper.etag import PRIVATE, conditional_response
+from src.helper.query_budget import query_budget
+from src.helper.rate_limit import rate_limit
+from src.helper.schemas import BaseOutFail, BulkStatusChangeOutSuccess, ErrorMessage
+from src.helper.zip_stream import ZipStreamHelper
 from src.api.training.services import StudentApplicationService
 from src.api.training.schemas import (
+    BulkChangeStudentApplicationStatusInput,
     ChangeStudentApplicationStatusInput,
     PayTrainingFeeInstallmentInput,
     StudentApplicationFilter,
@@ -21,6 +29,8 @@ from src.api.training.schemas import (
 router = APIRouter()
 
 @router.get("/student-applications", response_model=StudentApplicationsPageOutSuccess, tags=["Student Application"])
+@conditional_response(PRIVATE)
+@query_budget(2)
 async def list_student_applications_admin(
     input: Annotated[StudentApplicationFilter, Query(...)],
     current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_STUDENT_APPLICATION]))],
@@ -31,7 +41,67 @@ async def list_student_applications_admin(
     return {"data": applications, "page": input.page, "number": len(applications), "total_number": total}
 
 
+@router.get("/student-applications/export/zip", tags=["Student Application"])
+async def export_student_applications_zip(
+    current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_STUDENT_APPLICATION]))],
+    application_ids: Annotated[Optional[List[int]], Query()] = None,
+    training_session_id: Optional[str] = None,
+    student_app_service: StudentApplicationService = Depends(),
+):
+    """Stream the dossiers (summary + attachments) of the selected applications as a ZIP archive"""
+    if not application_ids and training_session_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=BaseOutFail(
+                message=ErrorMessage.EXPORT_FILTER_REQUIRED.description,
+                error_code=ErrorMessage.EXPORT_FILTER_REQUIRED.value,
+            ).model_dump(),
+        )
+
+    applications = await student_app_service.get_student_applications_for_export(application_ids, training_session_id)
+    if len(applications) > settings.EXPORT_ZIP_MAX_APPLICATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=BaseOutFail(
+                message=ErrorMessage.EXPORT_TOO_LARGE.description,
+                error_code=ErrorMessage.EXPORT_TOO_LARGE.value,
+            ).model_dump(),
+        )
+    if not applications:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=BaseOutFail(
+                message=ErrorMessage.STUDENT_APPLICATION_NOT_FOUND.description,
+                error_code=ErrorMessage.STUDENT_APPLICATION_NOT_FOUND.value,
+            ).model_dump(),
+        )
+
+    # the entries are built before returning: the session is closed while streaming
+    entries = student_app_service.build_dossier_entries(applications)
+    filename = f"{applications[0].application_number}.zip" if len(applications) == 1 else "student-applications.zip"
+    return StreamingResponse(
+        ZipStreamHelper.stream(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/student-applications/{application_id}/export/zip", tags=["Student Application"])
+async def export_student_application_zip(
+    application_id: int,
+    current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_STUDENT_APPLICATION]))],
+    student_app_service: StudentApplicationService = Depends(),
+):
+    return await export_student_applications_zip(
+        current_user=current_user,
+        application_ids=[application_id],
+        training_session_id=None,
+        student_app_service=student_app_service,
+    )
+
+
 @router.get("/student-applications/{application_id}", response_model=StudentApplicationOutSuccess, tags=["Student Application"])
+@conditional_response(PRIVATE)
 async def get_student_application_admin(
     application_id: int,
     current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_STUDENT_APPLICATION]))],
@@ -48,7 +118,7 @@ async def get_student_application_admin(
         )
     return {"message": "Student application fetched successfully", "data": full_application}
 
-@router.post("/student-applications/{application_id}/status", response_model=StudentApplicationOutSuccess, tags=["Student Application"])
+@router.post("/student-applications/{application_id}/status", response_model=StudentApplicationOutSuccess, tags=["Student Application"], dependencies=[Depends(get_unit_of_work)])
 async def change_student_application_status_admin(
     application_id: int,
     input : ChangeStudentApplicationStatusInput,
@@ -79,7 +149,19 @@ async def change_student_application_status_admin(
     
     return {"message": "Student application fetched successfully", "data": full_application}
 
+@router.post("/student-applications/bulk-status", response_model=BulkStatusChangeOutSuccess, tags=["Student Application"], dependencies=[Depends(get_unit_of_work)])
+async def change_student_applications_status_admin(
+    input : BulkChangeStudentApplicationStatusInput,
+    current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_CHANGE_STUDENT_APPLICATION_STATUS]))],
+    student_app_service: StudentApplicationService = Depends(),
+):
+    """Change the status of several applications, the unknown and unpaid ones are skipped"""
+    updated, skipped = await student_app_service.change_student_applications_status(input.application_ids, input)
+    
+    return {"message": "Student applications status changed successfully", "data": {"updated": updated, "skipped": skipped}}
+
 @router.get("/student-applications/{application_id}/attachments", response_model=StudentAttachmentListOutSuccess, tags=["Student Application"])
+@conditional_response(PRIVATE)
 async def list_student_attachments(
     application_id: int,
     current_user: Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_STUDENT_APPLICATION]))],
@@ -106,6 +188,8 @@ async def create_student_application(
     return {"message": "Student application created successfully", "data": application}
 
 @router.get("/my-student-applications", response_model=StudentApplicationsPageOutSuccess, tags=["My Student Application"])
+@conditional_response(PRIVATE)
+@query_budget(2)
 async def list_my_student_applications(
     input:   Annotated[StudentApplicationFilter, Query(...)],
     current_user: Annotated[User, Depends(get_current_active_user)],
@@ -118,6 +202,7 @@ async def list_my_student_applications(
     return {"data": applications, "page": input.page, "number": len(applications), "total_number": total}
 
 @router.get("/my-student-applications/{application_id}", response_model=StudentApplicationOutSuccess, tags=["My Student Application"])
+@conditional_response(PRIVATE)
 async def get_my_student_application(
     application_id: int,
     current_user: Annotated[User, Depends(get_current_active_user)],
@@ -179,6 +264,7 @@ async def delete_my_student_application(
     return {"message": "Student application fetched successfully", "data": full_application}
 
 @router.get("/my-student-applications/{application_id}/attachments", response_model=StudentAttachmentListOutSuccess, tags=["My Student Application"])
+@conditional_response(PRIVATE)
 async def list_student_attachments(
     application_id: int,
     student_app_service: StudentApplicationService = Depends(),
@@ -224,7 +310,7 @@ async def delete_student_attachment(
     return {"message": "Attachment deleted successfully", "data": attachment}
 
 
-@router.post("/my-student-applications/{application_id}/submit", response_model=InitPaymentOutSuccess, tags=["My Student Application"])
+@router.post("/my-student-applications/{application_id}/submit", response_model=InitPaymentOutSuccess, tags=["My Student Application"], dependencies=[Depends(rate_limit("payment_initiation"))])
 async def submit_student_application(
     application_id: int,
     # current_user: Annotated[User, Depends(get_current_active_user)],
@@ -253,7 +339,7 @@ async def submit_student_application(
     return {"message": "Application submitted successfully", "data": payment}
 
 
-@router.post("/my-student-applications/pay-training-fee", response_model=InitPaymentOutSuccess, tags=["My Student Application"])
+@router.post("/my-student-applications/pay-training-fee", response_model=InitPaymentOutSuccess, tags=["My Student Application"], dependencies=[Depends(rate_limit("payment_initiation")), Depends(get_unit_of_work)])
 async def pay_training_fee(
     input: PayTrainingFeeInstallmentInput,
     current_user: Annotated[User, Depends(get_current_active_user)],
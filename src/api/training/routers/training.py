@@ -22,6 +22,8 @@ from src.api.training.dependencies import (
     get_training_session,
 )
 from src.api.user.schemas import UserListOutSuccess
+from src.helper.cache import cache_response
+from src.helper.etag import PRIVATE, PUBLIC, conditional_response
 from src.helper.schemas import BaseOutFail, ErrorMessage
 
 router = APIRouter()
@@ -29,6 +31,8 @@ router = APIRouter()
 
 # Trainings
 @router.get("/trainings", response_model=TrainingsPageOutSuccess, tags=["Training"])
+@conditional_response(PUBLIC)
+@cache_response("trainings", tags=["trainings"], item_tag="training:{id}")
 async def list_trainings(
     filters: Annotated[TrainingFilter, Query(...)],
     training_service: TrainingService = Depends(),
@@ -57,6 +61,7 @@ async def create_training(
 
 
 @router.get("/trainings/{training_id}", response_model=TrainingOutSuccess, tags=["Training"])
+@conditional_response(PUBLIC)
 async def get_training_route(
     training_id: str,
     training=Depends(get_training),
@@ -100,6 +105,8 @@ async def delete_training_route(
 
 # Training Sessions
 @router.get("/training-sessions", response_model=TrainingSessionsPageOutSuccess, tags=["Training Session"])
+@conditional_response(PUBLIC)
+@cache_response("training_sessions", tags=["training_sessions"], item_tag="training_session:{id}")
 async def list_training_sessions(
     filters: Annotated[TrainingSessionFilter, Query(...)],
     training_service: TrainingService = Depends(),
@@ -109,6 +116,7 @@ async def list_training_sessions(
 
 
 @router.get("/trainings/{training_id}/sessions", response_model=TrainingSessionsPageOutSuccess, tags=["Training Session"])
+@conditional_response(PUBLIC)
 async def get_training_sessions_by_training_id(
     training_id: str,
     filters: Annotated[TrainingSessionFilter, Query(...)],
@@ -164,6 +172,7 @@ async def create_training_session(
 
 
 @router.get("/training-sessions/{session_id}/members", response_model=UserListOutSuccess, tags=["Training Session"])
+@conditional_response(PRIVATE)
 async def get_training_session_members(
     session_id: str,
     training_session=Depends(get_training_session),
@@ -174,6 +183,7 @@ async def get_training_session_members(
     return {"message": "Training session members fetched successfully", "data": members}
 
 @router.get("/training-sessions/{session_id}", response_model=TrainingSessionOutSuccess, tags=["Training Session"])
+@conditional_response(PUBLIC)
 async def get_training_session_route(
     session_id: str,
     training_session=Depends(get_training_session),
@@ -19,6 +19,9 @@ class ChangeStudentApplicationStatusInput(BaseModel):
     status : str
     reason : str
 
+class BulkChangeStudentApplicationStatusInput(ChangeStudentApplicationStatusInput):
+    application_ids : List[int] = Field(min_length=1, max_length=500)
+
 
 # Training Schemas
 class TrainingCreateInput(BaseModel):
@@ -208,6 +211,9 @@ class StudentAttachmentOut(BaseModel):
     application_id: int
     document_type: str
     file_path: str
+    processing_status: Optional[str] = None
+    page_count: Optional[int] = None
+    optimized_file_path: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select, or_
 
 from src.database import get_session_async
+from src.helper.cache import ResponseCache
 from src.api.training.models import (
     Reclamation,
     ReclamationType,
@@ -230,6 +231,7 @@ class ReclamationService:
         self.session.add(reclamation_type)
         await self.session.commit()
         await self.session.refresh(reclamation_type)
+        await ResponseCache.invalidate("reclamation_types")
         return reclamation_type
     
     async def update_reclamation_type(self, reclamation_type: ReclamationType, data: ReclamationTypeUpdateInput) -> ReclamationType:
@@ -239,6 +241,7 @@ class ReclamationService:
         self.session.add(reclamation_type)
         await self.session.commit()
         await self.session.refresh(reclamation_type)
+        await ResponseCache.invalidate("reclamation_types")
         return reclamation_type
 
     async def get_reclamation_type_by_id(self, type_id: int) -> Optional[ReclamationType]:
@@ -260,6 +263,7 @@ class ReclamationService:
         self.session.add(reclamation_type)
         await self.session.commit()
         await self.session.refresh(reclamation_type)
+        await ResponseCache.invalidate("reclamation_types")
         return reclamation_type
 
     async def get_all_reclamation_types(self) -> List[ReclamationType]:
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select, or_
 
 from src.database import get_session_async
+from src.helper.cache import ResponseCache
 from src.api.training.models import Specialty
 from src.api.training.schemas import (
     SpecialtyCreateInput,
@@ -23,6 +24,7 @@ class SpecialtyService:
         self.session.add(specialty)
         await self.session.commit()
         await self.session.refresh(specialty)
+        await ResponseCache.invalidate("specialties")
         return specialty
 
     async def get_specialty_by_id(self, specialty_id: int) -> Optional[Specialty]:
@@ -82,6 +84,7 @@ class SpecialtyService:
         self.session.add(specialty)
         await self.session.commit()
         await self.session.refresh(specialty)
+        await ResponseCache.invalidate("specialties")
         return specialty
 
     async def delete_specialty(self, specialty: Specialty) -> Specialty:
@@ -89,6 +92,7 @@ class SpecialtyService:
         specialty.delete_at = datetime.now(timezone.utc)
         self.session.add(specialty)
         await self.session.commit()
+        await ResponseCache.invalidate("specialties")
         return specialty
 
     async def get_all_active_specialties(self) -> List[Specialty]:
@@ -1,14 +1,17 @@
-import sys
+import logging
+from collections import Counter, defaultdict
 from typing import List, Optional, Tuple
 from datetime import date, datetime, timezone
 from fastapi import Depends, HTTPException ,status
 from sqlalchemy import func, update 
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 from sqlmodel import select, or_
 
 from src.api.job_offers.models import ApplicationStatusEnum
 from src.database import get_session_async
+from src.api.notifications.service import NotificationInboxService
 from src.api.training.models import (
     TrainingFeeInstallmentPayment,
     TrainingSession,
@@ -30,9 +33,15 @@ from src.api.payments.schemas import PaymentInitInput
 # Importation différée pour éviter l'importation circulaire
 # from src.api.payments.service import PaymentService
 from src.config import settings
+from src.helper.cache import ResponseCache
 from src.helper.file_helper import FileHelper
+from src.helper.loader_profiles import LoaderProfiles
+from src.helper.unit_of_work import UnitOfWork
+from src.helper.zip_stream import ZipStreamHelper
+from src.helper.pdf_helper import DocumentProcessingStatusEnum, PdfHelper, process_attachment_pdf_task
+from src.helper.in_app_notif import NotificationType
 from src.helper.moodle import MoodleService
-from src.helper.notifications import SendPasswordNotification
+from src.helper.notifications import ApplicationStatusNotification, NotificationBase, SendPasswordNotification
 from src.helper.schemas import BaseOutFail, ErrorMessage
 
 try:
@@ -40,20 +49,43 @@ try:
         moodle_create_course_task,
         moodle_ensure_user_task,
         moodle_enrol_user_task,
+        moodle_enrol_participants_task,
     )
 except Exception:
     moodle_create_course_task = None
     moodle_ensure_user_task = None
     moodle_enrol_user_task = None
+    moodle_enrol_participants_task = None
 
 import secrets
 import string
 
+
+logger = logging.getLogger(__name__)
+
+
 def generate_password(length: int = 12) -> str:
     alphabet = string.ascii_letters + string.digits + string.punctuation
     password = ''.join(secrets.choice(alphabet) for _ in range(length))
     return password
 
+
+# the list pages select a joined projection (StudentApplicationOut), no profile needed
+STUDENT_APPLICATION_LOADERS = LoaderProfiles(
+    StudentApplication,
+    detail=lambda: (
+        joinedload(StudentApplication.training),
+        joinedload(StudentApplication.training_session),
+        selectinload(StudentApplication.attachments),
+    ),
+    admin=lambda: (
+        joinedload(StudentApplication.user),
+        joinedload(StudentApplication.training),
+        joinedload(StudentApplication.training_session),
+        selectinload(StudentApplication.attachments),
+    ),
+)
+
 class StudentApplicationService:
     def __init__(self, session: AsyncSession = Depends(get_session_async)) -> None:
         self.session = session
@@ -212,8 +244,8 @@ class StudentApplicationService:
         )
         try :
             payment = await payment_service.initiate_payment(payment_input)
-        except Exception as e:
-            print(e.with_traceback(sys.exc_info()[2]))
+        except Exception:
+            logger.exception("Payment initiation failed for student application %s", application.id)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=BaseOutFail(
@@ -254,10 +286,8 @@ class StudentApplicationService:
         statement = (
             select(StudentApplication)
             .where(StudentApplication.id == application_id, StudentApplication.delete_at.is_(None))
-            .options(selectinload(StudentApplication.training))
-            .options(selectinload(StudentApplication.training_session))
-            .options(selectinload(StudentApplication.attachments))
         )
+        statement = STUDENT_APPLICATION_LOADERS.apply(statement, "detail")
         
         if user_id is not None:
             statement = statement.where(StudentApplication.user_id == user_id)
@@ -265,6 +295,62 @@ class StudentApplicationService:
         result = await self.session.execute(statement)
         return result.scalars().first()
     
+    async def get_student_applications_for_export(self, application_ids: Optional[List[int]] = None, training_session_id: Optional[str] = None) -> List[StudentApplication]:
+        """Get student applications with everything needed to build their dossier"""
+        statement = (
+            select(StudentApplication)
+            .where(StudentApplication.delete_at.is_(None))
+            .order_by(StudentApplication.id)
+            # one more row than the cap, so the router can refuse instead of truncating
+            .limit(settings.EXPORT_ZIP_MAX_APPLICATIONS + 1)
+        )
+        statement = STUDENT_APPLICATION_LOADERS.apply(statement, "admin")
+        if application_ids:
+            statement = statement.where(StudentApplication.id.in_(application_ids))
+        if training_session_id is not None:
+            statement = statement.where(StudentApplication.target_session_id == training_session_id)
+
+        result = await self.session.execute(statement)
+        return result.scalars().all()
+
+    @staticmethod
+    def build_dossier_entries(applications: List[StudentApplication]) -> List[tuple]:
+        """Build the (arcname, source) entries of the dossier ZIP of student applications"""
+        dossiers = []
+        for application in applications:
+            user = application.user
+            session = application.training_session
+            dossiers.append({
+                "folder": application.application_number or str(application.id),
+                "summary": [
+                    f"Application number : {application.application_number}",
+                    f"Status : {application.status}",
+                    f"Refusal reason : {application.refusal_reason or ''}",
+                    f"Candidate : {user.full_name() if user else ''}",
+                    f"Email : {user.email if user else ''}",
+                    f"Phone : {user.mobile_number if user else ''}",
+                    f"Training : {application.training.title if application.training else ''}",
+                    f"Session : {session.start_date if session else ''} - {session.end_date if session else ''}",
+                    f"Registration fee : {application.registration_fee or ''} {application.currency}",
+                    f"Training fee : {application.training_fee or ''} {application.currency}",
+                    f"Paid : {'yes' if application.payment_id else 'no'}",
+                    f"Submitted at : {application.created_at}",
+                ],
+                "attachments": [
+                    (a.document_type, a.document_type, a.page_count, a.file_path)
+                    for a in application.attachments if a.delete_at is None
+                ],
+                "index": (
+                    application.application_number, application.status,
+                    user.last_name if user else "", user.first_name if user else "", user.email if user else "",
+                    application.training.title if application.training else "",
+                    session.start_date if session else "",
+                ),
+            })
+        return ZipStreamHelper.build_dossier_entries(
+            dossiers, "application_number;status;last_name;first_name;email;training;session_start;attachments"
+        )
+
     async def get_student_application(self, filters: StudentApplicationFilter, user_id: Optional[str] = None) -> Tuple[List[Training], int]:
         """Get student applications with filtering"""
         statement = (
@@ -357,6 +443,7 @@ class StudentApplicationService:
         self.session.add(participant)
         
         # decrement available slots if applicable
+        sess = None
         if application.target_session_id is not None:
             stmt = select(TrainingSession).where(TrainingSession.id == application.target_session_id)
             res = await self.session.execute(stmt)
@@ -365,55 +452,29 @@ class StudentApplicationService:
                 sess.available_slots -= 1
                 self.session.add(sess)
         
-        await self.session.commit()
-        await self.session.refresh(participant)
+        await UnitOfWork.save(self.session)
+        await UnitOfWork.after_commit(
+            self.session, lambda: ResponseCache.invalidate(f"training_session:{application.target_session_id}")
+        )
 
-        # Enrol on Moodle (best-effort)
-        
+        # Enrol on Moodle (best-effort, in a task)
         if sess and sess.moodle_course_id:
-                user_service = UserService(self.session)
-                user = await user_service.get_by_id(application.user_id)
-                if user and user.email:
-                    """
-                    if moodle_ensure_user_task and moodle_enrol_user_task:
-                        moodle_ensure_user_task.apply_async(kwargs={
-                            "email": user.email,
-                            "firstname": user.first_name,
-                            "lastname": user.last_name,
-                        })
-                    else:
-                    
-                        moodle = MoodleService()
-                        moodle_user_id = user.moodle_user_id
-                        if not moodle_user_id:
-                            moodle_user_id = await moodle.ensure_user(
-                                email=user.email,
-                                firstname=user.first_name,
-                                lastname=user.last_name,
-                            )
-                            user.moodle_user_id = moodle_user_id
-                            self.session.add(user)
-                            await self.session.commit()
-                            await self.session.refresh(user)
-                        await moodle.enrol_user_manual(user_id=moodle_user_id, course_id=sess.moodle_course_id)
-                    """
-                    moodle = MoodleService()
-                    moodle_user_id = user.moodle_user_id
-                    if not moodle_user_id:
-                        moodle_user_id = await moodle.ensure_user(
-                            email=user.email,
-                            firstname=user.first_name,
-                            lastname=user.last_name
-                        )
-                        user.moodle_user_id = moodle_user_id
-                        self.session.add(user)
-                        await self.session.commit()
-                        await self.session.refresh(user)
-                    await moodle.enrol_user_manual(user_id=moodle_user_id, course_id=sess.moodle_course_id)
-                    
+            await self._enrol_on_moodle({sess.moodle_course_id: [application.user_id]})
 
         return participant
 
+    async def _enrol_on_moodle(self, enrolments: dict[int, List[str]]):
+        """Queue the Moodle enrolment of the users ({course_id: [user_id]}) once committed"""
+
+        if not enrolments or moodle_enrol_participants_task is None or not MoodleService.is_configured():
+            return
+
+        async def queue():
+            for course_id, user_ids in enrolments.items():
+                moodle_enrol_participants_task.delay(course_id, user_ids)
+
+        await UnitOfWork.after_commit(self.session, queue)
+
     # Attachments
     async def create_student_attachment(self, user_id: str, application_id: int, input: StudentAttachmentInput) -> StudentAttachment:
         """Create student attachment"""
@@ -432,9 +493,13 @@ class StudentApplicationService:
 
         url, _, _ = await FileHelper.upload_file(input.file, f"/student-applications/{application_id}", input.name)
         attachment = StudentAttachment(application_id=application_id, file_path=url, document_type=input.name)
+        if PdfHelper.is_pdf(url):
+            attachment.processing_status = DocumentProcessingStatusEnum.PENDING
         self.session.add(attachment)
         await self.session.commit()
         await self.session.refresh(attachment)
+        if PdfHelper.is_pdf(url):
+            process_attachment_pdf_task.delay("student", attachment.id)
         return attachment
 
     async def dissociate_student_attachment(self, application_id: int) -> None:
@@ -480,13 +545,117 @@ class StudentApplicationService:
         student_application.refusal_reason = input.reason
         student_application.status = input.status
         
-        await self.session.commit()
-        await self.session.refresh(student_application)
+        await UnitOfWork.save(self.session)
         
         if input.status == ApplicationStatusEnum.APPROVED.value:
             await self.enroll_student_to_session(student_application)
+
+        training = await self.session.get(Training, student_application.training_id)
+        await self._notify_status_change([student_application], input.status, training.title if training else "")
         
         return student_application
+
+    async def _notify_status_change(self, applications: List[StudentApplication], new_status: str, training_title: Optional[str] = None):
+        """Inbox notification of the candidates (one executemany INSERT / COPY for the whole batch)"""
+
+        await NotificationInboxService(self.session).notify_users(
+            NotificationType.APPLICATION_STATUS_CHANGED,
+            [
+                (application.user_id, {
+                    "application_id": application.id,
+                    "application_number": application.application_number,
+                    "training_title": training_title if training_title is not None else (application.training.title if application.training else ""),
+                    "status": new_status,
+                })
+                for application in applications
+            ],
+        )
+
+    async def change_student_applications_status(self, application_ids: List[int], input: ChangeStudentApplicationStatusInput) -> Tuple[List[int], List[int]]:
+        """
+        Change the status of several applications with one UPDATE. The unknown
+        and the unpaid applications are skipped. The approved ones are enrolled
+        with one multi-row INSERT (the existing participants are kept) and one
+        UPDATE of the slots per session; the candidates are notified by one
+        email task once committed.
+
+        Returns the updated ids and the skipped ids.
+        """
+
+        statement = (
+            select(StudentApplication)
+            .where(StudentApplication.id.in_(application_ids), StudentApplication.delete_at.is_(None))
+            .options(joinedload(StudentApplication.user), joinedload(StudentApplication.training))
+        )
+        applications = (await self.session.execute(statement)).scalars().all()
+        applications = [application for application in applications if application.payment_id is not None]
+        updated = sorted(application.id for application in applications)
+        skipped = sorted(set(application_ids) - set(updated))
+        if not applications:
+            return updated, skipped
+
+        await self.session.execute(
+            update(StudentApplication)
+            .where(StudentApplication.id.in_(updated))
+            .values(status=input.status, refusal_reason=input.reason)
+        )
+
+        session_ids = set()
+        if input.status == ApplicationStatusEnum.APPROVED.value:
+            result = await self.session.execute(
+                pg_insert(TrainingSessionParticipant)
+                .values([
+                    {"session_id": application.target_session_id, "user_id": application.user_id, "application_id": application.id}
+                    for application in applications
+                ])
+                .on_conflict_do_nothing(index_elements=["application_id"])
+                .returning(TrainingSessionParticipant.session_id, TrainingSessionParticipant.user_id)
+            )
+            enrolled = result.all()
+            slots = Counter(session_id for session_id, _ in enrolled)
+            for session_id, count in slots.items():
+                await self.session.execute(
+                    update(TrainingSession)
+                    .where(TrainingSession.id == session_id, TrainingSession.available_slots.is_not(None))
+                    .values(available_slots=func.greatest(TrainingSession.available_slots - count, 0))
+                )
+            session_ids = set(slots)
+
+        await UnitOfWork.save(self.session)
+        await self._notify_status_change(applications, input.status)
+
+        notifications = [
+            ApplicationStatusNotification(
+                email=application.user.email,
+                application_number=application.application_number,
+                candidate_name=f"{application.user.first_name} {application.user.last_name}",
+                title=application.training.title if application.training else "",
+                status=input.status,
+                reason=input.reason or "",
+            )
+            for application in applications
+            if application.user and application.user.email
+        ]
+
+        async def committed():
+            NotificationBase.send_notifications(notifications)
+            await ResponseCache.invalidate(*(f"training_session:{session_id}" for session_id in session_ids))
+
+        await UnitOfWork.after_commit(self.session, committed)
+
+        # Enrol on Moodle (best-effort, in a task)
+        if session_ids:
+            courses = dict((await self.session.execute(
+                select(TrainingSession.id, TrainingSession.moodle_course_id)
+                .where(TrainingSession.id.in_(session_ids), TrainingSession.moodle_course_id.is_not(None))
+            )).all())
+            enrolments = defaultdict(list)
+            for session_id, user_id in enrolled:
+                if session_id in courses:
+                    enrolments[courses[session_id]].append(user_id)
+            await self._enrol_on_moodle(dict(enrolments))
+
+        return updated, skipped
         
     async def update_student_application_payment(self,application_id: int,payment_id:str):
     
@@ -593,8 +762,8 @@ class StudentApplicationService:
             currency=training_session.currency
         )
         self.session.add(new_payment)
-        await self.session.commit()
-        await self.session.refresh(new_payment)
+        # flushed for its id (payable of the payment), committed with the payment
+        await UnitOfWork.save(self.session)
         
         tr_stmt = select(Training).where(Training.id == training_session.training_id)
         tr_res = await self.session.execute(tr_stmt)
@@ -618,8 +787,8 @@ class StudentApplicationService:
         try :
             payment = await payment_service.initiate_payment(payment_input)
             
-        except Exception as e:
-            print(e.with_traceback(sys.exc_info()[2]))
+        except Exception:
+            logger.exception("Payment initiation failed for the training fee of session %s", training_session.id)
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=BaseOutFail(
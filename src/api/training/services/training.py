@@ -6,7 +6,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select, or_
 
 from src.api.user.models import User
+from src.api.user.service import USER_LOADERS
 from src.database import get_session_async
+from src.helper.cache import ResponseCache
 from src.api.training.models import (
     Training,
     TrainingSession,
@@ -38,6 +40,7 @@ class TrainingService:
         self.session.add(training)
         await self.session.commit()
         await self.session.refresh(training)
+        await ResponseCache.invalidate("trainings")
         return training
 
     async def update_training(self, training: Training, data: TrainingUpdateInput) -> Training:
@@ -47,6 +50,7 @@ class TrainingService:
         self.session.add(training)
         await self.session.commit()
         await self.session.refresh(training)
+        await ResponseCache.invalidate("trainings", f"training:{training.id}")
         return training
 
     async def get_training_by_id(self, training_id: str) -> Optional[Training]:
@@ -97,6 +101,7 @@ class TrainingService:
         training.delete_at = datetime.now(timezone.utc)
         self.session.add(training)
         await self.session.commit()
+        await ResponseCache.invalidate("trainings", f"training:{training.id}")
         return training
 
     # Training Session CRUD Operations
@@ -133,6 +138,7 @@ class TrainingService:
         except Exception:
             pass
             
+        await ResponseCache.invalidate("training_sessions")
         return session
 
     async def update_training_session(self, training_session: TrainingSession, data: TrainingSessionUpdateInput) -> TrainingSession:
@@ -142,6 +148,7 @@ class TrainingService:
         self.session.add(training_session)
         await self.session.commit()
         await self.session.refresh(training_session)
+        await ResponseCache.invalidate("training_sessions", f"training_session:{training_session.id}")
         return training_session
 
     async def get_training_session_by_id(self, session_id: str) -> Optional[TrainingSession]:
@@ -187,10 +194,12 @@ class TrainingService:
         training_session.delete_at = datetime.now(timezone.utc)
         self.session.add(training_session)
         await self.session.commit()
+        await ResponseCache.invalidate("training_sessions", f"training_session:{training_session.id}")
         return training_session
     
     
     async def get_training_session_members(self, session_id: str) -> List[User]:
         statement = select(User).join(TrainingSessionParticipant, User.id == TrainingSessionParticipant.user_id).where(TrainingSessionParticipant.session_id == session_id)
+        statement = USER_LOADERS.apply(statement, "list")
         result = await self.session.execute(statement)
         return result.scalars().all()
\ No newline at end of file
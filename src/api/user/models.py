@@ -3,7 +3,7 @@ from datetime import date, datetime, timezone
 from src.helper.model import CustomBaseUUIDModel, CustomBaseModel
 from typing import List, Optional, TYPE_CHECKING
 from enum import Enum
-from sqlalchemy import TIMESTAMP, event
+from sqlalchemy import TIMESTAMP, UniqueConstraint, event
 
 if TYPE_CHECKING:
     from src.api.cabinet.models import CabinetApplication
@@ -125,6 +125,11 @@ class UserRole(SQLModel, table=True):
 
 class UserPermission(CustomBaseModel, table=True):
     __tablename__ = "user_permission"
+    # targets of the INSERT ... ON CONFLICT DO NOTHING of the bulk grants
+    __table_args__ = (
+        UniqueConstraint("user_id", "permission", name="uq_user_permission_user_id_permission"),
+        UniqueConstraint("role_id", "permission", name="uq_user_permission_role_id_permission"),
+    )
     
     user_id: str | None = Field(default=None, foreign_key="users.id")
     role_id: int | None = Field(default=None, nullable=True, foreign_key="role.id")
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Query,status
+from src.database import get_unit_of_work
 from typing import Annotated
 
 from src.helper.utils import NotificationHelper
@@ -7,21 +8,48 @@ from src.redis_client import get_from_redis, set_to_redis
 from src.api.auth.utils import  check_permissions, get_current_active_user, require_oauth_client
 from src.api.user.dependencies import get_user
 from src.api.user.models import PermissionEnum, RoleEnum, User
-from src.helper.schemas import BaseOutFail, ErrorMessage
+from src.helper.etag import PRIVATE, conditional_response
+from src.helper.query_budget import query_budget
+from src.helper.schemas import BaseOutFail, BulkWriteOutSuccess, ErrorMessage
 from src.api.user.service import UserService
-from src.api.user.schemas import ( AssignPermissionsInput, AssignRoleInput, CreateUserInput, PermissionListOutSuccess, PermissionSmallListOutSuccess, RoleListOutSuccess, RoleOutSuccess, UpdateStatusInput, UpdateUserInput, UserFilter, UserListInput, UserListOutSuccess, UserOutSuccess, UsersPageOutSuccess)
+from src.api.user.schemas import ( AssignPermissionsInput, AssignRoleInput, BulkAssignRoleInput, BulkPermissionsInput, CreateUserInput, PermissionListOutSuccess, PermissionSmallListOutSuccess, RoleListOutSuccess, RoleOutSuccess, UpdateStatusInput, UpdateUserInput, UserFilter, UserListInput, UserListOutSuccess, UserOutSuccess, UsersPageOutSuccess)
 
 router = APIRouter()
 
 
-@router.post('/users/assign-permissions',response_model=PermissionListOutSuccess,tags=["Role And Permission"])
+def user_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=BaseOutFail(
+            message=ErrorMessage.USER_NOT_FOUND.description,
+            error_code=ErrorMessage.USER_NOT_FOUND.value
+        ).model_dump()
+    )
+
+
+async def get_role_or_404(role_id: int, user_service: UserService):
+    role = await user_service.get_role_by_id(role_id)
+    if role is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=BaseOutFail(
+                message=ErrorMessage.ROLE_NOT_FOUND.description,
+                error_code=ErrorMessage.ROLE_NOT_FOUND.value
+            ).model_dump()
+        )
+    return role
+
+
+@router.post('/users/assign-permissions',response_model=PermissionListOutSuccess,tags=["Role And Permission"],dependencies=[Depends(get_unit_of_work)])
 async def assign_permissions(
     input : AssignPermissionsInput,
     current_user : Annotated[User, Depends(check_permissions([PermissionEnum.CAN_GIVE_PERMISSION]))],
     user_service: UserService = Depends()
 ):
     
-    await user_service.assign_permissions(user_id=input.user_id, permissions=input.permissions)
+    result = await user_service.assign_permissions(user_id=input.user_id, permissions=input.permissions)
+    if not result["assigned"]:
+        raise user_not_found()
     
     user_permissions = await user_service.get_all_user_permissions(user_id=input.user_id)
     
@@ -48,7 +76,10 @@ async def assign_roles(
     user_service: UserService = Depends()
 ):
     
-    await user_service.assign_role(user_id=input.user_id, role_id=input.role_id)
+    await get_role_or_404(input.role_id, user_service)
+    result = await user_service.assign_role(user_id=input.user_id, role_id=input.role_id)
+    if not result["assigned"]:
+        raise user_not_found()
     
     user_permissions = await user_service.get_all_user_permissions(user_id=input.user_id)
     
@@ -67,7 +98,42 @@ async def revoke_roles(
     
     return  { "message" : "Roles revoked successfully", "data" : user_permissions }
 
+@router.post('/users/bulk-assign-permissions',response_model=BulkWriteOutSuccess,tags=["Role And Permission"],dependencies=[Depends(get_unit_of_work)])
+async def bulk_assign_permissions(
+    input : BulkPermissionsInput,
+    current_user : Annotated[User, Depends(check_permissions([PermissionEnum.CAN_GIVE_PERMISSION]))],
+    user_service: UserService = Depends()
+):
+    
+    count, skipped = await user_service.bulk_assign_permissions(user_ids=input.user_ids, permissions=input.permissions)
+    
+    return  { "message" : "Permissions assigned successfully", "data" : {"count": count, "skipped": skipped} }
+
+@router.post('/users/bulk-revoke-permissions',response_model=BulkWriteOutSuccess,tags=["Role And Permission"],dependencies=[Depends(get_unit_of_work)])
+async def bulk_revoke_permissions(
+    input : BulkPermissionsInput,
+    current_user : Annotated[User, Depends(check_permissions([PermissionEnum.CAN_GIVE_PERMISSION]))],
+    user_service: UserService = Depends()
+):
+    
+    count, skipped = await user_service.bulk_revoke_permissions(user_ids=input.user_ids, permissions=input.permissions)
+    
+    return  { "message" : "Permissions revoked successfully", "data" : {"count": count, "skipped": skipped} }
+
+@router.post('/users/bulk-assign-role',response_model=BulkWriteOutSuccess,tags=["Role And Permission"],dependencies=[Depends(get_unit_of_work)])
+async def bulk_assign_role(
+    input : BulkAssignRoleInput,
+    current_user : Annotated[User, Depends(check_permissions([PermissionEnum.CAN_GIVE_PERMISSION]))],
+    user_service: UserService = Depends()
+):
+    
+    await get_role_or_404(input.role_id, user_service)
+    count, skipped = await user_service.bulk_assign_role(user_ids=input.user_ids, role_id=input.role_id)
+    
+    return  { "message" : "Roles assigned successfully", "data" : {"count": count, "skipped": skipped} }
+
 @router.get('/users/permissions/{user_id}',response_model=PermissionListOutSuccess,tags=["Role And Permission"])
+@conditional_response(PRIVATE)
 async def get_user_permissions(
     user_id : str,
     current_user : Annotated[User, Depends(check_permissions([PermissionEnum.CAN_GIVE_PERMISSION]))],
@@ -100,6 +166,8 @@ async def get_user_role(
     return  { "message" : "User Permissions", "data" : user_role[0] }
 
 @router.get("/users", response_model=UsersPageOutSuccess,tags=["Users"])
+@conditional_response(PRIVATE)
+@query_budget(2)
 async def read_user_list( 
         current_user : Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_USER]))],
         filter_query: Annotated[UserFilter, Query(...)],
@@ -143,6 +211,7 @@ async def read_user_list( input: UserListInput , user_service: UserService = Dep
 
 
 @router.get("/users/{user_id}", response_model=UserOutSuccess,tags=["Users"])
+@conditional_response(PRIVATE)
 async def read_user_by_id(current_user : Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_USER]))],user : Annotated[User, Depends(get_user)]):
     
     return  {"data" : user, "message":"Users fetch successfully" }
@@ -208,6 +277,7 @@ async def delete_user(
 
 
 @router.get('/roles',response_model=RoleListOutSuccess,tags=["Role And Permission"])
+@conditional_response(PRIVATE)
 async def get_roles(
     current_user : Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_ROLE]))],
     user_service: UserService = Depends()):
@@ -215,6 +285,7 @@ async def get_roles(
     return  {"data" : roles, "message":"Roles fetch successfully" }
 
 @router.get('/permissions',response_model=PermissionSmallListOutSuccess ,tags=["Role And Permission"])
+@conditional_response(PRIVATE)
 async def get_permissions(
     current_user : Annotated[User, Depends(check_permissions([PermissionEnum.CAN_VIEW_ROLE]))],
     user_service: UserService = Depends()):
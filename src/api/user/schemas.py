@@ -1,7 +1,8 @@
-from pydantic import BaseModel,Field
+from pydantic import BaseModel,Field,computed_field
 from typing import List,Optional,Literal
 from datetime import date, datetime
-from src.api.user.models import CivilityEnum, UserStatusEnum, UserTypeEnum
+from src.api.user.models import CivilityEnum, PermissionEnum, UserStatusEnum, UserTypeEnum
+from src.helper.image_helper import ImageHelper
 from src.helper.schemas import BaseOutPage, BaseOutSuccess
 
 
@@ -67,6 +68,11 @@ class UserOut(BaseModel):
     created_at : datetime
     updated_at : datetime
     prefer_notification : str 
+
+    @computed_field
+    @property
+    def picture_srcset(self) -> Optional[str]:
+        return ImageHelper.srcset(self.picture)
     
 
 class UserListInput(BaseModel):
@@ -109,6 +115,11 @@ class UserSimpleOut(BaseModel):
     user_type : str 
     two_factor_enabled : bool 
     created_at : datetime
+
+    @computed_field
+    @property
+    def picture_srcset(self) -> Optional[str]:
+        return ImageHelper.srcset(self.picture)
     
 class SchoolCurriculumOut(BaseModel):
     id : int
@@ -152,11 +163,19 @@ class UserFilter(BaseModel):
     
 class AssignPermissionsInput(BaseModel):
     user_id : str
-    permissions : List[str]
+    permissions : List[PermissionEnum]
     
 class AssignRoleInput(BaseModel):
     user_id : str
     role_id : int
+
+class BulkPermissionsInput(BaseModel):
+    user_ids : List[str] = Field(min_length=1, max_length=500)
+    permissions : List[PermissionEnum] = Field(min_length=1)
+
+class BulkAssignRoleInput(BaseModel):
+    user_ids : List[str] = Field(min_length=1, max_length=500)
+    role_id : int
     
 class RoleOut(BaseModel):
     id : int
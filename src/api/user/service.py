@@ -1,21 +1,28 @@
 from datetime import date, datetime, timezone
-from typing import List
+from typing import List, Optional
 from fastapi import Depends
-from sqlalchemy import func
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload , aliased, with_expression
-from src.api.user.schemas import UpdateUserInput, UserFilter
+from src.api.user.schemas import UpdateUserInput, UserFilter, UserSimpleOut
 from src.database import get_session_async
 from src.api.user.models import (Address, AddressTypeEnum, CivilityEnum, PermissionEnum, ProfessionStatus, SchoolCurriculum, User, UserPermission, UserRole, Role, RoleEnum, UserStatusEnum, UserTypeEnum)
 from src.api.auth.schemas import UpdateAddressInput, UpdateCurriculumInput, UpdateDeviceInput, UpdateProfessionStatusInput,  UpdateUserProfile
 from sqlmodel import select, or_
 from sqlalchemy.ext.asyncio import AsyncSession
-from passlib.context import CryptContext
 import re
 
 from src.helper.notifications import SendPasswordNotification
 from src.helper.moodle import MoodleService
+from src.helper.loader_profiles import LoaderProfiles, schema_columns
+from src.helper.password_helper import PasswordHelper
+from src.helper.unit_of_work import UnitOfWork
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+USER_LOADERS = LoaderProfiles(
+    User,
+    list=lambda: (schema_columns(User, UserSimpleOut),),
+)
 
 
 class UserService:
@@ -93,16 +100,20 @@ class UserService:
         statement = statement.offset((user_filter.page - 1) * user_filter.page_size).limit(
             user_filter.page_size
         )
+        statement = USER_LOADERS.apply(statement, "list")
         result = await self.session.execute(statement)
         users = result.scalars().all()
 
         return users, total_count
 
-    async def update_last_login(self, user_id: str):
+    async def update_last_login(self, user_id: str, password_hash: Optional[str] = None):
         statement = select(User).where(User.id == user_id)
         result = await self.session.execute(statement)
         user = result.scalars().one()
         user.last_login = datetime.now(timezone.utc)
+        # the password hash was made with a lower cost than the current one
+        if password_hash:
+            user.password = password_hash
         self.session.add(user)
         await self.session.commit()
         await self.session.refresh(user)
@@ -125,14 +136,14 @@ class UserService:
             # Save the plain password before hashing for email notification
             plain_password = user_data["password"]
             if not password_hash:
-                user_data["password"] = pwd_context.hash(user_data["password"])
+                user_data["password"] = await PasswordHelper.hash(user_data["password"])
         else:
             # Pydantic model
             user_data = user_create_input.model_dump()
             # Save the plain password before hashing for email notification
             plain_password = user_data["password"]
             if not password_hash:
-                user_data["password"] = pwd_context.hash(user_data["password"])
+                user_data["password"] = await PasswordHelper.hash(user_data["password"])
         
         user = User(**user_data)
         self.session.add(user)
@@ -201,7 +212,7 @@ class UserService:
         for key, value in update_data.items():
             if key == "password" and value is not None and value != "":
                 # Hasher le mot de passe seulement s'il a été fourni
-                setattr(user, key, pwd_context.hash(value))
+                setattr(user, key, await PasswordHelper.hash(value))
             elif key != "password":
                 # Pour tous les autres champs, les assigner directement
                 setattr(user, key, value)
@@ -215,7 +226,7 @@ class UserService:
         statement = select(User).where(User.id == user_id)
         result = await self.session.execute(statement)
         user = result.scalars().one()
-        user.password = pwd_context.hash(password)
+        user.password = await PasswordHelper.hash(password)
         self.session.add(user)
         await self.session.commit()
         await self.session.refresh(user)
@@ -390,26 +401,43 @@ class UserService:
 
 
     async def assign_role(self, user_id: str, role_id: str):
-        
-        statement = select(UserRole).where(UserRole.user_id == user_id)
-        result = await self.session.execute(statement)
-        user_roles = result.scalars().all()
-        for user_role in user_roles:
-            self.session.delete(user_role)
-            
-        await self.session.commit()
-        
-        statement = select(UserRole).where(UserRole.user_id == user_id).where(UserRole.role_id == role_id )
-        result = await self.session.execute(statement)
-        user_role = result.scalars().one_or_none()
-        if user_role is not None:    
-            return user_role
+        count, _ = await self.bulk_assign_role([user_id], role_id)
+        return {"user_id": user_id, "role_id": role_id, "assigned": count > 0}
+
+    async def get_role_by_id(self, role_id: int) -> Optional[Role]:
+        result = await self.session.execute(select(Role).where(Role.id == role_id))
+        return result.scalars().first()
+
+    async def split_existing_user_ids(self, user_ids: list[str]) -> tuple[list[str], list[str]]:
+        """Split the ids into (existing users, unknown or deleted ones), with one SELECT"""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return [], []
+        result = await self.session.execute(select(User.id).where(User.id.in_(user_ids), User.delete_at.is_(None)))
+        existing = set(result.scalars())
+        return [id for id in user_ids if id in existing], [id for id in user_ids if id not in existing]
+
+    async def bulk_assign_role(self, user_ids: list[str], role_id: int) -> tuple[int, list[str]]:
+        """
+        Replace the roles of every user by `role_id`: one set-based DELETE
+        and one multi-row INSERT, whatever the number of users. The role must
+        exist (checked by the router); the unknown users are skipped.
 
-        user_role = UserRole(user_id=user_id, role_id=role_id)
-        self.session.add(user_role)
-        await self.session.commit()
-        await self.session.refresh(user_role)
-        return {"user_id": user_id, "role_id": role_id}
+        Returns:
+            tuple: The number of users updated and the skipped user ids.
+        """
+        user_ids, skipped = await self.split_existing_user_ids(user_ids)
+        if not user_ids:
+            return 0, skipped
+
+        await self.session.execute(delete(UserRole).where(UserRole.user_id.in_(user_ids)))
+        await self.session.execute(
+            pg_insert(UserRole)
+            .values([{"user_id": user_id, "role_id": role_id} for user_id in user_ids])
+            .on_conflict_do_nothing()
+        )
+        await UnitOfWork.save(self.session)
+        return len(user_ids), skipped
     
     async def revoke_role(self, user_id: str, role_id: int) -> dict:
         """
@@ -436,31 +464,55 @@ class UserService:
         return {"user_id": user_id, "role_id": role_id, "revoked": True}
     
     async def assign_permissions(self, user_id: str, permissions: list[str]):
-        for permission in permissions:
-            statement = select(UserPermission).where(UserPermission.user_id == user_id).where(UserPermission.permission == permission )
-            result = await self.session.execute(statement)
-            user_permission = result.scalars().one_or_none()
-            if user_permission is not None:    
-                continue
-
-            user_permission = UserPermission(user_id=user_id, permission=permission)
-            self.session.add(user_permission)
-            await self.session.commit()
-            await self.session.refresh(user_permission)
-            
-        return {"user_id": user_id, "permission_ids": permissions}
+        _, skipped = await self.bulk_assign_permissions([user_id], permissions)
+        return {"user_id": user_id, "permission_ids": permissions, "assigned": not skipped}
 
     async def revoke_permissions(self, user_id: str, permissions: list[str]):
-        for permission in permissions:
-            statement = select(UserPermission).where(UserPermission.user_id == user_id).where(UserPermission.permission == permission )
-            result = await self.session.execute(statement)
-            user_permission = result.scalars().one_or_none()
-            if user_permission is None:    
-                continue
-
-            self.session.delete(user_permission)
-            await self.session.commit()
+        await self.bulk_revoke_permissions([user_id], permissions)
         return {"user_id": user_id, "permission_ids": permissions}
+
+    async def bulk_assign_permissions(self, user_ids: list[str], permissions: list[str]) -> tuple[int, list[str]]:
+        """
+        Grant every permission (PermissionEnum values) to every user in a
+        single INSERT ... ON CONFLICT DO NOTHING: the grants which already
+        exist are skipped by the (user_id, permission) unique constraint
+        instead of a SELECT each. The unknown users are skipped.
+
+        Returns:
+            tuple: The number of grants created and the skipped user ids.
+        """
+        user_ids, skipped = await self.split_existing_user_ids(user_ids)
+        rows = [
+            {"user_id": user_id, "permission": PermissionEnum(permission).value}
+            for user_id in user_ids
+            for permission in dict.fromkeys(permissions)
+        ]
+        if not rows:
+            return 0, skipped
+
+        result = await self.session.execute(pg_insert(UserPermission).values(rows).on_conflict_do_nothing())
+        await UnitOfWork.save(self.session)
+        return result.rowcount, skipped
+
+    async def bulk_revoke_permissions(self, user_ids: list[str], permissions: list[str]) -> tuple[int, list[str]]:
+        """
+        Revoke the permissions of every user with one set-based DELETE. The
+        unknown users are skipped.
+
+        Returns:
+            tuple: The number of grants deleted and the skipped user ids.
+        """
+        user_ids, skipped = await self.split_existing_user_ids(user_ids)
+        if not user_ids or not permissions:
+            return 0, skipped
+
+        result = await self.session.execute(
+            delete(UserPermission)
+            .where(UserPermission.user_id.in_(user_ids))
+            .where(UserPermission.permission.in_([PermissionEnum(permission).value for permission in permissions]))
+        )
+        await UnitOfWork.save(self.session)
+        return result.rowcount, skipped
     
     async def get_all_user_permissions(self, user_id: str):
         statement = select(UserRole.role_id).where(UserRole.user_id == user_id)
@@ -495,58 +547,33 @@ class UserService:
                 fix_number="0000000000",
                 lang="fr",
                 status=UserStatusEnum.ACTIVE,
-                password=pwd_context.hash("admin"),
+                password=await PasswordHelper.hash("admin"),
                 user_type=UserTypeEnum.ADMIN
             )
             self.session.add(user)
             await self.session.commit()
             await self.session.refresh(user)
 
-        admin = None
+        # role.name has no unique constraint: the existing roles are read once
+        result = await self.session.execute(select(Role).where(Role.name.in_([role.value for role in RoleEnum])))
+        roles = {role_data.name: role_data for role_data in result.scalars().all()}
         for role in RoleEnum:
-            statement = select(Role).where(Role.name == role.value)
-            result = await self.session.execute(statement)
-            role_data = result.scalars().first()
-            if role_data is None:
-                role_data = Role(name=role)
-                self.session.add(role_data)
-
-            if role_data.name == RoleEnum.SUPER_ADMIN.value:
-                admin = role_data
-
-        await self.session.commit()
-        await self.session.refresh(admin)
-
-        if admin is not None:
-            for permission in PermissionEnum:
-                statement = (
-                    select(UserPermission).where(UserPermission.role_id == admin.id)
-                    .where(UserPermission.permission == permission.value)
-                )
-                result = await self.session.execute(statement)
-                user_permission = result.scalars().first()
-                if user_permission is None:
-                    user_permission = UserPermission(
-                        role_id=admin.id,
-                        permission=permission.value
-                    )
-                    self.session.add(user_permission)
-
+            if role.value not in roles:
+                roles[role.value] = Role(name=role)
+                self.session.add(roles[role.value])
+        await self.session.flush()
+        admin = roles[RoleEnum.SUPER_ADMIN.value]
+
+        await self.session.execute(
+            pg_insert(UserPermission)
+            .values([{"role_id": admin.id, "permission": permission.value} for permission in PermissionEnum])
+            .on_conflict_do_nothing()
+        )
+        await self.session.execute(
+            pg_insert(UserRole).values(user_id=user.id, role_id=admin.id).on_conflict_do_nothing()
+        )
         await self.session.commit()
 
-        statement = select(UserRole).where(UserRole.user_id == user.id).where(UserRole.role_id == admin.id)
-        result = await self.session.execute(statement)
-        user_role = result.scalars().first()
-
-        if user_role is None:
-            user_role = UserRole(
-                user_id=user.id,
-                role_id=admin.id
-            )
-            self.session.add(user_role)
-
-            await self.session.commit()
-
         return True
 
     async def has_all_permissions(self,user_id :str, permissions : list = []) -> bool: 
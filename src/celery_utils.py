@@ -1,9 +1,11 @@
 import functools
 import ssl
-from celery import current_app as current_celery_app, shared_task
+from celery import current_app as current_celery_app, shared_task, signals
 from celery.result import AsyncResult
 from celery.utils.time import get_exponential_backoff_interval
-from src.config import settings
+from src.config import route_task, settings
+from src.helper.log_helper import LogHelper, bind_request_id
+from src.helper.task_status import TaskStatus
 
 ssl_options = {
     "ssl_cert_reqs": ssl.CERT_REQUIRED,  # ⚠️ Insecure, use CERT_REQUIRED in production
@@ -23,19 +25,29 @@ def create_celery():
         task_acks_late=True,
         worker_prefetch_multiplier=1,
         task_reject_on_worker_lost=True,
+        task_ignore_result=settings.CELERY_TASK_IGNORE_RESULT,
+        result_expires=settings.CELERY_RESULT_EXPIRES,
         broker_transport_options={
-                "global_keyprefix": "lafaom:" 
+                "global_keyprefix": "lafaom:",
+                "queue_order_strategy": "priority",
+                "priority_steps": settings.CELERY_PRIORITY_STEPS,
             },
         result_backend_transport_options={
                 "global_keyprefix": "lafaom:" 
             },
-        task_default_queue="lafaom_default",
-        task_queues={
-            "lafaom_default": {
-                "exchange": "lafaom",
-                "routing_key": "lafaom.default",
-            },
-        }
+        beat_schedule=settings.CELERY_BEAT_SCHEDULE,
+        # task modules not imported by the api routers
+        imports=(
+            "src.helper.storage_gc",
+            "src.helper.session_store",
+        ),
+        task_default_queue=settings.CELERY_TASK_DEFAULT_QUEUE,
+        task_default_exchange="lafaom",
+        task_default_routing_key="lafaom.default",
+        task_default_priority=settings.CELERY_TASK_DEFAULT_PRIORITY,
+        task_create_missing_queues=settings.CELERY_TASK_CREATE_MISSING_QUEUES,
+        task_queues=settings.CELERY_TASK_QUEUES,
+        task_routes=(settings.CELERY_TASK_ROUTES, route_task),
         # Other configurations
     )
 
@@ -43,10 +55,34 @@ def create_celery():
     return celery_app
 
 
+@signals.setup_logging.connect
+def setup_logging(**kwargs):
+    """Workers log through the same queue / JSON pipeline as the API"""
+    LogHelper.setup()
+
+
+@signals.task_prerun.connect
+def bind_task_id(task_id=None, **kwargs):
+    # the task id plays the part of the request id in the worker records
+    bind_request_id(task_id)
+
+
+@signals.task_postrun.connect
+def unbind_task_id(**kwargs):
+    bind_request_id(None)
+
+
 def get_task_info(task_id):
     """
-    return task info according to the task_id
+    return task info according to the task_id: the compact status record of
+    the tracked tasks, the result backend for the tasks storing their result
     """
+    status = TaskStatus.get(task_id)
+    if status is not None:
+        if status["state"] == "FAILURE":
+            return {"state": status["state"], "error": status["result"], "user_id": status.get("user_id")}
+        return status
+
     task = AsyncResult(task_id)
     
 
@@ -3,7 +3,8 @@ from pydantic import ConfigDict, model_validator,EmailStr, BeforeValidator,AnyUr
 from typing import ClassVar, Literal,Annotated,Any
 from typing_extensions import Self
 import secrets
-from kombu import Queue
+from kombu import Exchange, Queue
+from celery.schedules import crontab
 
 #
 def parse_cors(v: Any) -> list[str] | str:
@@ -31,11 +32,74 @@ class Settings(BaseSettings):
     
     ACCESS_TOKEN_EXPIRE_MINUTES : int = 3600
     REFRESH_TOKEN_EXPIRE_MINUTES : int = 3600
+    ## Expired refresh tokens deleted by the beat task, rows per transaction
+    REFRESH_TOKEN_CLEANUP_BATCH: int = 5000
     OTP_CODE_EXPIRE_MINUTES : int = 30
+
+    ## One-time codes (2FA, password reset, email change, job application
+    ## update), kept in Redis
+    OTP_MAX_ATTEMPTS: int = 5  # wrong codes before the code is dropped
+    OTP_RATE_LIMIT: int = 5  # codes sent per email and purpose in the window
+    OTP_RATE_WINDOW_SECONDS: int = 3600
+    ## Also record the codes (their HMAC) in the Postgres tables, from a Celery task
+    OTP_AUDIT_LOG: bool = False
+
+    ## Rate limits (token buckets in Redis) by endpoint: "<key>:<n>/<period>"
+    ## with key ip, email (of the JSON body) or user (of the bearer token).
+    ## Behind a proxy, run uvicorn with --proxy-headers for the client ip.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: dict[str, list[str]] = {
+        "auth_token": ["ip:30/minute", "email:10/minute"],
+        "auth_code": ["ip:30/minute", "email:10/minute"],
+        "password_forgotten": ["ip:10/minute", "email:5/hour"],
+        "job_application_otp": ["ip:10/minute", "email:5/hour"],
+        "payment_initiation": ["ip:20/minute", "email:10/hour", "user:10/minute"],
+    }
+
+    ## Password hashing: bcrypt cost (raising it rehashes the passwords at
+    ## the next login) and the processes running it out of the event loop
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    ## Key of the refresh token digests (HMAC-SHA256), SECRET_KEY when unset
+    REFRESH_TOKEN_SECRET: str | None = None
+
+    ## Revoked JWT ids (Redis), mirrored by a Bloom filter in each process:
+    ## a revocation reaches the other processes within the sync interval
+    JWT_REVOCATION_SYNC_SECONDS: int = 10
+    JWT_REVOCATION_BLOOM_CAPACITY: int = 100000
+    JWT_REVOCATION_BLOOM_ERROR_RATE: float = 0.001
     
     ## Sentry Debugging url 
     SENTRY_DSN: HttpUrl | None = None
-    
+    SENTRY_TRACES_SAMPLE_RATE: float = 0.1
+    ## Sample rate by path prefix, the longest matching prefix wins
+    SENTRY_ROUTE_SAMPLE_RATES: dict[str, float] = {
+        "/health": 0.0,
+        "/metrics": 0.0,
+        "/static": 0.0,
+        "/api/v1/payments": 1.0,
+    }
+
+    ## Query budgets (N+1 detection): "warn" logs, "raise" fails (tests),
+    ## default: warn in development, off elsewhere
+    QUERY_BUDGET_MODE: Literal["off", "warn", "raise"] | None = None
+
+    ## Prometheus metrics (/metrics), protected by a bearer token when set
+    METRICS_TOKEN: str | None = None
+    METRICS_EXCLUDED_PATHS: list[str] = ["/metrics", "/health"]
+
+    ## Logging: records formatted and written by a background thread
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    LOG_LEVEL: str = "INFO"
+    ## Level by logger name, e.g. {"src.helper.moodle": "DEBUG", "uvicorn.access": "WARNING"}
+    LOG_LEVELS: dict[str, str] = {}
+    ## Share of the DEBUG records kept, by logger name prefix (the longest
+    ## matching prefix wins), LOG_DEBUG_SAMPLE_RATE otherwise
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0
+    LOG_SAMPLE_RATES: dict[str, float] = {}
+    ## Records waiting to be written, the next ones are dropped when it is full
+    LOG_QUEUE_SIZE: int = 10000
+
     ## Allow Cors origins
     BACKEND_CORS_ORIGINS: Annotated[
         list[AnyUrl] | str, BeforeValidator(parse_cors)
@@ -77,6 +141,12 @@ class Settings(BaseSettings):
     
     ## Credential to connect to Firebase Cloud Messaging for push notification
     FCM_SERVER_KEY:str = ""
+    PUSH_BATCH_SIZE: int = 500  # devices per FCM multicast call (FCM maximum)
+
+    ## In-app notifications inbox: fan-out inserts switch to COPY from this
+    ## number of recipients; unread counters cached in Redis
+    NOTIFICATION_COPY_THRESHOLD: int = 1000
+    NOTIFICATION_UNREAD_TTL_SECONDS: int = 900  # a recounted value is trusted this long at most
     
     
     
@@ -86,6 +156,26 @@ class Settings(BaseSettings):
     
     #Max file upload size (20MB for PDF documents)
     MAX_FILE_SIZE: int = 20971520
+
+    ## Image derivatives (resized covers / profile pictures)
+    IMAGE_DERIVATIVE_WIDTHS: list[int] = [320, 640, 1280]
+    IMAGE_DERIVATIVE_FORMATS: list[str] = ["webp", "jpeg"]
+    IMAGE_DERIVATIVE_QUALITY: int = 80
+    IMAGE_PROCESS_WORKERS: int = 2
+    IMAGE_CACHE_MAX_AGE: int = 31536000  # one year, derivatives are immutable
+
+    ## PDF attachments processing
+    PDF_PROCESS_TIMEOUT: int = 120  # seconds per document
+    PDF_TEXT_MAX_CHARS: int = 100000
+
+    ## Dossier ZIP exports
+    ZIP_PREFETCH_CHUNKS: int = 8  # 1MB chunks read ahead from the storage
+    EXPORT_ZIP_MAX_APPLICATIONS: int = 500
+
+    ## Background CSV/XLSX exports
+    EXPORT_YIELD_PER: int = 2000  # rows fetched per server-side cursor round trip
+    EXPORT_PROGRESS_EVERY: int = 10000  # rows between two progress updates
+    EXPORT_LINK_EXPIRE_SECONDS: int = 3600
     
     
     ## Credential to connect to AWS S3 Bucket
@@ -93,6 +183,12 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY : str = ""
     AWS_REGION : str = "us-east-1"
     AWS_BUCKET_NAME : str = "your-bucket-name"
+
+    ## Storage garbage collection
+    STORAGE_DELETE_CONCURRENCY: int = 4  # delete_objects requests in flight
+    STORAGE_GC_PREFIXES: list[str] = ["student-applications", "job-applications"]
+    STORAGE_GC_GRACE_HOURS: int = 24  # never collect files younger than this (upload before association)
+    STORAGE_GC_DRY_RUN: bool = True
     
     MOODLE_API_URL : str = "https://moodle.example.com"
     MOODLE_API_TOKEN : str = ""
@@ -127,6 +223,29 @@ class Settings(BaseSettings):
     
     ## The Redis Cache turn around time
     CACHE_TTL:int   = 3600
+    ## Per-process cache in front of Redis for cached responses
+    CACHE_L1_TTL: int = 5
+    CACHE_L1_MAX_ENTRIES: int = 1000
+
+    ## orjson responses, list pages serialized straight from the ORM rows
+    FAST_JSON_RESPONSE: bool = False
+
+    ## Response compression (gzip / brotli) and precompressed static files
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes, smaller bodies are sent as they are
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # on the fly, the static siblings use 11
+    COMPRESSION_CONTENT_TYPES: list[str] = [
+        "application/json",
+        "application/javascript",
+        "application/xml",
+        "image/svg+xml",
+        "text/",
+    ]
+    STATIC_PRECOMPRESS: bool = True
+
+    ## HTTP caching of the read endpoints (ETag / Cache-Control)
+    HTTP_PUBLIC_MAX_AGE: int = 60
+    HTTP_STALE_WHILE_REVALIDATE: int = 300
     
     ## Redis cache url
     REDIS_CACHE_URL:str = "redis://127.0.0.1:6379/0"
@@ -139,6 +258,14 @@ class Settings(BaseSettings):
     JWK_ALGORITHM : str = "RS256"
 
     CELERY_BEAT_SCHEDULE: dict = {
+        "storage-orphan-cleanup": {
+            "task": "src.helper.storage_gc.storage_orphan_cleanup_task",
+            "schedule": crontab(hour=3, minute=0),
+        },
+        "refresh-token-cleanup": {
+            "task": "src.helper.session_store.refresh_token_cleanup_task",
+            "schedule": crontab(minute=15),
+        },
         # "task-schedule-work": {
         #     "task": "task_schedule_work",
         #     "schedule": 5.0,  # five seconds
@@ -162,13 +289,45 @@ class Settings(BaseSettings):
     # Force all queues to be explicitly listed in `CELERY_TASK_QUEUES` to help prevent typos
     CELERY_TASK_CREATE_MISSING_QUEUES: bool = False
 
-    CELERY_TASK_QUEUES: list[Queue]  = [
-        Queue("lafaom_default"),
-        Queue("lafaom_high_priority"),
-        Queue("lafaom_low_priority"),
+    CELERY_TASK_QUEUES: ClassVar[list[Queue]]  = [
+        Queue("lafaom_high_priority", Exchange("lafaom"), routing_key="lafaom.high"),
+        Queue("lafaom_default", Exchange("lafaom"), routing_key="lafaom.default"),
+        Queue("lafaom_low_priority", Exchange("lafaom"), routing_key="lafaom.low"),
     ]
 
-    CELERY_TASK_ROUTES: ClassVar[tuple] = (route_task,)
+    ## Queue and priority (0 first, 9 last, inside the queue) by task family,
+    ## glob patterns on the task names; the other tasks use route_task.
+    ## Each queue has its own worker pool (celery_compose/worker/start):
+    ## a bulk send never delays a payment confirmation.
+    CELERY_TASK_ROUTES: ClassVar[dict] = {
+        # payment confirmation
+        "src.api.payments.utils.*": {"queue": "lafaom_high_priority", "priority": 0},
+        # single emails (OTP, login alert, password reset) and push notifications
+        "src.helper.utils.send_smtp_email": {"queue": "lafaom_high_priority", "priority": 3},
+        "src.helper.utils.send_mailgun_email": {"queue": "lafaom_high_priority", "priority": 3},
+        "src.helper.utils.send_push_notification": {"queue": "lafaom_high_priority", "priority": 6},
+        "src.helper.utils.send_in_app_notification": {"queue": "lafaom_high_priority", "priority": 6},
+        "src.helper.utils.send_push_notifications": {"queue": "lafaom_low_priority", "priority": 3},
+        # LMS sync and uploaded files processing
+        "src.helper.moodle.*": {"queue": "lafaom_default", "priority": 3},
+        "src.helper.pdf_helper.*": {"queue": "lafaom_default", "priority": 6},
+        # bulk emails, exports, audit and cleanup
+        "src.helper.utils.send_email_batch": {"queue": "lafaom_low_priority", "priority": 3},
+        "src.helper.export_helper.*": {"queue": "lafaom_low_priority", "priority": 3},
+        "src.helper.otp_store.*": {"queue": "lafaom_low_priority", "priority": 6},
+        "src.helper.session_store.*": {"queue": "lafaom_low_priority", "priority": 9},
+        "src.helper.storage_gc.*": {"queue": "lafaom_low_priority", "priority": 9},
+    }
+    ## Broker side priorities: one Redis list per priority step and queue
+    CELERY_PRIORITY_STEPS: ClassVar[list[int]] = [0, 3, 6, 9]
+    CELERY_TASK_DEFAULT_PRIORITY: int = 6
+
+    ## Task results: not stored unless the task sets ignore_result=False,
+    ## stored ones expire after CELERY_RESULT_EXPIRES seconds. The tasks
+    ## polled by the clients (exports) keep a compact status record instead.
+    CELERY_TASK_IGNORE_RESULT: bool = True
+    CELERY_RESULT_EXPIRES: int = 3600
+    TASK_STATUS_TTL_SECONDS: int = 21600
     
 
 
@@ -1,14 +1,18 @@
 from contextlib import contextmanager
+from fastapi import Depends
 from sqlmodel import create_engine, Session
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 
 from typing import AsyncGenerator
 from src.config import settings
+from src.helper.metrics import MetricsHelper
+from src.helper.unit_of_work import UnitOfWork
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
+MetricsHelper.instrument_engine(engine)
 
 
 
@@ -19,8 +23,15 @@ def get_session():
 
 DATABASE_URL = settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
 engine_async = create_async_engine(DATABASE_URL )#echo=True)
+MetricsHelper.instrument_engine(engine_async.sync_engine)
 async_session = sessionmaker(engine_async, class_=AsyncSession, expire_on_commit=False)
 
 async def get_session_async() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def get_unit_of_work(session: AsyncSession = Depends(get_session_async)) -> AsyncGenerator[UnitOfWork, None]:
+    """Request scoped transaction: committed once at the end of the request, rolled back when it raises"""
+    async with UnitOfWork(session) as unit_of_work:
+        yield unit_of_work
@@ -0,0 +1,112 @@
+import asyncio
+import inspect
+import logging
+import threading
+import weakref
+
+import httpx
+from celery import Task, signals
+
+from src.helper.metrics import InstrumentedAsyncTransport
+
+
+logger = logging.getLogger(__name__)
+
+
+_local = threading.local()
+# shared client of each event loop (its connections belong to the loop)
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """The event loop of the worker process (of the thread, with the threads pool), kept across tasks"""
+
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        _local.loop = loop
+    return loop
+
+
+def run_async(coroutine):
+    """Run a coroutine to completion on the worker loop, from sync code (a task, a script)"""
+
+    return get_worker_loop().run_until_complete(coroutine)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    HTTP client shared by the calls made on the running loop: the
+    connections (and TLS sessions) to CinetPay, Moodle, ... are reused
+    instead of being opened by each call. Per call timeouts go on the
+    request: client.post(url, ..., timeout=30).
+    """
+
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=30, transport=InstrumentedAsyncTransport())
+        _http_clients[loop] = client
+    return client
+
+
+class AsyncTask(Task):
+    """
+    Task base running `async def` tasks on the long-lived loop of the worker
+    process, so the async services run as tasks as they are, with the
+    pooled asyncpg connections and HTTP clients of the process:
+
+        @shared_task(base=AsyncTask)
+        async def check_cash_in_status(transaction_id: str) -> dict:
+            async with async_session() as session:
+                ...
+
+    Needs a pool running the tasks one at a time per process or thread
+    (prefork, solo, threads), not gevent / eventlet.
+    """
+
+    abstract = True
+
+    def __call__(self, *args, **kwargs):
+        result = super().__call__(*args, **kwargs)
+        if inspect.isawaitable(result):
+            return run_async(result)
+        return result
+
+
+@signals.worker_process_init.connect
+def init_worker_process(**kwargs):
+    """
+    Forked worker process: drop the database connections inherited from the
+    parent (they belong to its sockets and loop) and start the loop of the
+    process.
+    """
+
+    from src.database import engine, engine_async
+
+    engine.dispose(close=False)
+    engine_async.sync_engine.dispose(close=False)
+    get_worker_loop()
+
+
+@signals.worker_process_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        return
+
+    from src.database import engine_async
+
+    async def close():
+        client = _http_clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+        await engine_async.dispose()
+
+    try:
+        loop.run_until_complete(close())
+    except Exception:
+        logger.exception("Error while closing the worker connections")
+    finally:
+        loop.close()
@@ -0,0 +1,266 @@
+import logging
+import functools
+import hashlib
+import inspect
+import json
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import serialize_response
+from pydantic import BaseModel
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import InstanceState
+
+from src.config import settings
+from src.helper.json_response import FastJSONResponse, default_response_class, dump_response
+from src.redis_client import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Two level cache of rendered JSON responses.
+
+    L1 is a small per-process LRU with a short TTL (CACHE_L1_TTL), L2 is Redis
+    (CACHE_TTL). Each entry is tagged by entity ("training:<id>") or
+    collection ("trainings"); services purge the tags after their writes.
+    Purges reach the Redis entries and the L1 of the purging process, other
+    processes keep their L1 copy at most CACHE_L1_TTL seconds.
+    """
+
+    _l1: "OrderedDict[str, tuple[float, str, tuple]]" = OrderedDict()
+
+    @staticmethod
+    def entry_key(namespace: str, params: dict) -> str:
+        normalized = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.sha1(normalized.encode()).hexdigest()
+        return f"{settings.REDIS_NAMESPACE}:cache:entry:{namespace}:{digest}"
+
+    @staticmethod
+    def tag_key(tag: str) -> str:
+        return f"{settings.REDIS_NAMESPACE}:cache:tag:{tag}"
+
+    @staticmethod
+    def normalize_params(kwargs: dict) -> dict:
+        """
+        Build the cache key parameters from the validated endpoint arguments:
+        filter models are dumped with their defaults, so "?page=1" and "" or a
+        different parameter order give the same key, and unknown query
+        parameters are ignored. Dependencies (services) are skipped, table
+        instances (current_user...) are replaced by their primary key.
+        """
+
+        params = {}
+        for name, value in kwargs.items():
+            state = sa_inspect(value, raiseerr=False)
+            if isinstance(state, InstanceState):
+                # a SQLModel table is a BaseModel too: never dump the row (password hash...)
+                params[name] = [str(part) for part in state.mapper.primary_key_from_instance(value)]
+            elif isinstance(value, BaseModel):
+                params[name] = value.model_dump(mode="json")
+            elif value is None or isinstance(value, (str, int, float, bool, list, tuple)):
+                params[name] = value
+        return params
+
+    # L1
+
+    @staticmethod
+    def l1_get(key: str) -> Optional[str]:
+        entry = ResponseCache._l1.get(key)
+        if entry is None:
+            return None
+        expires_at, body, _ = entry
+        if expires_at < time.monotonic():
+            ResponseCache._l1.pop(key, None)
+            return None
+        ResponseCache._l1.move_to_end(key)
+        return body
+
+    @staticmethod
+    def l1_set(key: str, body: str, tags: Iterable[str]):
+        ResponseCache._l1[key] = (time.monotonic() + settings.CACHE_L1_TTL, body, tuple(tags))
+        ResponseCache._l1.move_to_end(key)
+        while len(ResponseCache._l1) > settings.CACHE_L1_MAX_ENTRIES:
+            ResponseCache._l1.popitem(last=False)
+
+    @staticmethod
+    def l1_invalidate(tags: set):
+        for key in [k for k, (_, _, entry_tags) in ResponseCache._l1.items() if tags.intersection(entry_tags)]:
+            ResponseCache._l1.pop(key, None)
+
+    # Redis
+
+    @staticmethod
+    async def get(key: str) -> Optional[str]:
+        body = ResponseCache.l1_get(key)
+        if body is not None:
+            return body
+        try:
+            body = await get_redis().get(key)
+        except Exception as e:
+            logger.warning("Response cache unavailable: %s", e)
+            return None
+        if body is not None:
+            # the tags are not needed for L1 entries coming from Redis, they expire quickly
+            ResponseCache.l1_set(key, body, ())
+        return body
+
+    @staticmethod
+    async def set(key: str, body: str, tags: Iterable[str], ttl: int):
+        tags = set(tags)
+        ResponseCache.l1_set(key, body, tags)
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.set(key, body, ex=ttl)
+            for tag in tags:
+                pipe.sadd(ResponseCache.tag_key(tag), key)
+                # the tag set outlives every entry it points to
+                pipe.expire(ResponseCache.tag_key(tag), ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning("Response cache unavailable: %s", e)
+
+    @staticmethod
+    async def invalidate(*tags: str):
+        """
+        Purge every cached response tagged with one of `tags`.
+        """
+
+        tags = {tag for tag in tags if tag}
+        if not tags:
+            return
+        ResponseCache.l1_invalidate(tags)
+        try:
+            redis_client = get_redis()
+            tag_keys = [ResponseCache.tag_key(tag) for tag in tags]
+            pipe = redis_client.pipeline(transaction=False)
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = await pipe.execute()
+            keys = set().union(*members)
+            await redis_client.delete(*keys, *tag_keys)
+        except Exception as e:
+            logger.warning("Response cache invalidation failed: %s", e)
+
+    @staticmethod
+    def item_tags(template: str, payload) -> set:
+        data = payload.get("data") if isinstance(payload, dict) else None
+        items = data if isinstance(data, (list, tuple)) else [data]
+        tags = set()
+        for item in items:
+            if item is None:
+                continue
+            try:
+                tags.add(template.format_map(_ItemFields(item)))
+            except KeyError:
+                continue
+        return tags
+
+
+class _ItemFields:
+    """Expose the fields of a dict, a Row or an ORM object to str.format_map"""
+
+    def __init__(self, item):
+        self.item = item if isinstance(item, dict) else getattr(item, "_mapping", item)
+
+    def __getitem__(self, name):
+        if isinstance(self.item, dict) or hasattr(self.item, "keys"):
+            return self.item[name]
+        try:
+            return getattr(self.item, name)
+        except AttributeError:
+            raise KeyError(name)
+
+
+def with_request_param(func, name: str):
+    """
+    Return the signature FastAPI should see for a wrapped endpoint, with a
+    Request parameter added under `name` when the endpoint has none.
+
+    Returns:
+        tuple: (signature, request parameter name, injected)
+    """
+
+    signature = inspect.signature(func)
+    existing = next((p.name for p in signature.parameters.values() if p.annotation is Request), None)
+    if existing is not None:
+        return signature, existing, False
+    parameters = list(signature.parameters.values())
+    parameters.append(inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+    return signature.replace(parameters=parameters), name, True
+
+
+async def render_response(request: Request, payload, headers: Optional[dict] = None) -> Response:
+    """
+    Render an endpoint return value like FastAPI does, using the response
+    model options of the matched route (or the ORM fast path, see
+    dump_response).
+    """
+
+    route = request.scope.get("route")
+    body = dump_response(route, payload)
+    if body is not None:
+        return FastJSONResponse(content=body, headers=headers)
+
+    content = await serialize_response(
+        field=getattr(route, "response_field", None),
+        response_content=payload,
+        include=getattr(route, "response_model_include", None),
+        exclude=getattr(route, "response_model_exclude", None),
+        by_alias=getattr(route, "response_model_by_alias", True),
+        exclude_unset=getattr(route, "response_model_exclude_unset", False),
+        exclude_defaults=getattr(route, "response_model_exclude_defaults", False),
+        exclude_none=getattr(route, "response_model_exclude_none", False),
+        is_coroutine=True,
+    )
+    return default_response_class()(content=content, headers=headers)
+
+
+def cache_response(namespace: str, tags: Iterable[str] = (), item_tag: Optional[str] = None, ttl: Optional[int] = None):
+    """
+    Cache the JSON response of a public GET endpoint.
+
+    Args:
+        namespace (str): Prefix of the cache keys of the endpoint.
+        tags (Iterable[str]): Tags of every entry, formatted with the endpoint
+            arguments (e.g. "trainings", "post:{post_slug}").
+        item_tag (str, optional): Tag template applied to each item of
+            `data` (e.g. "training:{id}"), so purging one entity also purges
+            the pages listing it.
+        ttl (int, optional): Redis TTL, defaults to CACHE_TTL.
+
+    Only successful responses are cached; the response model of the route is
+    applied once, when the entry is built.
+    """
+
+    def decorator(func):
+        endpoint_signature, request_param, injected = with_request_param(func, "_cache_request")
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs.pop(request_param) if injected else kwargs[request_param]
+
+            key = ResponseCache.entry_key(namespace, ResponseCache.normalize_params(kwargs))
+            body = await ResponseCache.get(key)
+            if body is not None:
+                return Response(content=body, media_type="application/json", headers={"X-Cache": "HIT"})
+
+            payload = await func(*args, **kwargs)
+            if isinstance(payload, Response):
+                return payload
+
+            response = await render_response(request, payload, headers={"X-Cache": "MISS"})
+            entry_tags = {tag.format(**kwargs) for tag in tags}
+            if item_tag is not None:
+                entry_tags |= ResponseCache.item_tags(item_tag, payload)
+            await ResponseCache.set(key, response.body.decode(), entry_tags, ttl or settings.CACHE_TTL)
+            return response
+
+        wrapper.__signature__ = endpoint_signature
+        return wrapper
+
+    return decorator
@@ -0,0 +1,311 @@
+import gzip
+import mimetypes
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - Brotli is in requirements.txt
+    brotli = None
+
+
+# precompressed siblings, by order of preference
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+class _BrotliCompressor:
+    """Give brotli.Compressor the compress/flush interface of zlib"""
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionHelper:
+
+    # Negotiation
+
+    @staticmethod
+    def supported_encodings() -> list[str]:
+        return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    @staticmethod
+    def accepted_encodings(accept_encoding: Optional[str]) -> list[str]:
+        """
+        Encodings we support which the Accept-Encoding header allows, brotli
+        first when available, then gzip. Codings with q=0 are refused.
+        """
+
+        if not accept_encoding:
+            return []
+        accepted = {}
+        for item in accept_encoding.split(","):
+            coding, _, params = item.strip().partition(";")
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            accepted[coding.strip().lower()] = quality
+        return [
+            encoding for encoding in CompressionHelper.supported_encodings()
+            if accepted.get(encoding, accepted.get("*", 0.0)) > 0
+        ]
+
+    @staticmethod
+    def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+        """
+        Pick the encoding of a response from the Accept-Encoding header.
+
+        Returns:
+            str | None: "br", "gzip" or None (identity).
+        """
+
+        encodings = CompressionHelper.accepted_encodings(accept_encoding)
+        return encodings[0] if encodings else None
+
+    @staticmethod
+    def is_compressible(content_type: Optional[str]) -> bool:
+        """Check a content type against COMPRESSION_CONTENT_TYPES ("text/" matches every text type)"""
+
+        if not content_type:
+            return False
+        content_type = content_type.split(";")[0].strip().lower()
+        return any(
+            content_type.startswith(allowed) if allowed.endswith("/") else content_type == allowed
+            for allowed in settings.COMPRESSION_CONTENT_TYPES
+        )
+
+    @staticmethod
+    def compressor(encoding: str):
+        if encoding == "br":
+            return _BrotliCompressor(settings.COMPRESSION_BROTLI_QUALITY)
+        # wbits=31: gzip container
+        return zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    # Static files
+
+    @staticmethod
+    def precompress_file(path: str) -> list[str]:
+        """
+        Write the .br / .gz siblings of a static file, with the maximum
+        compression levels since they are built once and served many times.
+
+        Files which are not compressible (images, PDF, archives) or smaller
+        than COMPRESSION_MIN_SIZE are skipped.
+
+        Args:
+            path (str): Path of the file on disk ("src/static/...").
+
+        Returns:
+            list[str]: The paths of the written siblings.
+        """
+
+        if not settings.STATIC_PRECOMPRESS or not os.path.isfile(path):
+            return []
+        content_type, _ = mimetypes.guess_type(path)
+        if not CompressionHelper.is_compressible(content_type) or os.path.getsize(path) < settings.COMPRESSION_MIN_SIZE:
+            return []
+
+        with open(path, "rb") as f:
+            data = f.read()
+
+        written = []
+        for encoding in CompressionHelper.supported_encodings():
+            if encoding == "br":
+                compressed = brotli.compress(data, quality=11)
+            else:
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            # a sibling which does not save anything is never worth serving
+            if len(compressed) >= len(data):
+                continue
+            sibling = path + PRECOMPRESSED_SUFFIXES[encoding]
+            with open(sibling, "wb") as f:
+                f.write(compressed)
+            written.append(sibling)
+        return written
+
+    @staticmethod
+    def delete_precompressed(path: str):
+        for suffix in PRECOMPRESSED_SUFFIXES.values():
+            try:
+                os.remove(path + suffix)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def precompress_directory(directory: str = "src/static") -> int:
+        """Build the missing or outdated siblings of every file of a directory"""
+
+        count = 0
+        suffixes = tuple(PRECOMPRESSED_SUFFIXES.values())
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(suffixes):
+                    continue
+                path = os.path.join(root, name)
+                mtime = os.path.getmtime(path)
+                siblings = [path + suffix for suffix in suffixes]
+                if all(os.path.isfile(s) and os.path.getmtime(s) >= mtime for s in siblings):
+                    continue
+                count += len(CompressionHelper.precompress_file(path))
+        return count
+
+
+class CompressionMiddleware:
+    """
+    gzip / brotli compression of the responses.
+
+    Only the content types of COMPRESSION_CONTENT_TYPES are compressed
+    (JSON, text, ...), never images, PDF or ZIP files which are already
+    compressed, and only when the body reaches COMPRESSION_MIN_SIZE. Streamed
+    bodies are compressed chunk by chunk. Responses which already have a
+    Content-Encoding (precompressed static files) are sent as they are.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = CompressionHelper.negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self.app, encoding, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+class _CompressionResponder:
+
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.initial_message: Optional[Message] = None
+        self.started = False
+        self.compressor = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    def should_compress(self, headers: Headers, body: bytes, more_body: bool) -> bool:
+        if self.initial_message["status"] in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        if not CompressionHelper.is_compressible(headers.get("content-type")):
+            return False
+        content_length = headers.get("content-length")
+        if content_length is not None and content_length.isdigit():
+            return int(content_length) >= self.minimum_size
+        return more_body or len(body) >= self.minimum_size
+
+    async def send_with_compression(self, message: Message):
+        if message["type"] == "http.response.start":
+            # held until the first body chunk tells whether it is worth compressing
+            self.initial_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            headers = Headers(raw=self.initial_message["headers"])
+            if not self.should_compress(headers, body, more_body):
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            self.compressor = CompressionHelper.compressor(self.encoding)
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+                body = self.compressor.compress(body)
+            else:
+                body = self.compressor.compress(body) + self.compressor.flush()
+                headers["Content-Length"] = str(len(body))
+            await self.send(self.initial_message)
+            await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        if self.compressor is None:
+            await self.send(message)
+            return
+
+        body = self.compressor.compress(body)
+        if not more_body:
+            body += self.compressor.flush()
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles serving the .br / .gz sibling of a file (written at upload
+    time by CompressionHelper.precompress_file) when the client accepts it.
+    """
+
+    async def get_response(self, path: str, scope: Scope):
+        response = await super().get_response(path, scope)
+        if not isinstance(response, FileResponse) or response.status_code != 200:
+            return response
+
+        encodings = CompressionHelper.accepted_encodings(Headers(scope=scope).get("accept-encoding"))
+        if not encodings:
+            return response
+        original_mtime = os.path.getmtime(response.path)
+        for candidate in encodings:
+            sibling = response.path + PRECOMPRESSED_SUFFIXES[candidate]
+            try:
+                stat_result = os.stat(sibling)
+            except FileNotFoundError:
+                continue
+            # an outdated sibling (file replaced in place) is ignored
+            if stat_result.st_mtime < original_mtime:
+                continue
+            # same validators as the original, so If-None-Match keeps working
+            return FileResponse(
+                sibling,
+                stat_result=stat_result,
+                media_type=response.media_type,
+                headers={
+                    "Content-Encoding": candidate,
+                    "Vary": "Accept-Encoding",
+                    "ETag": response.headers["etag"],
+                    "Last-Modified": response.headers["last-modified"],
+                },
+            )
+        return response
+
+
+if __name__ == "__main__":
+    # python -m src.helper.compression : precompress the files already uploaded
+    print(f"{CompressionHelper.precompress_directory()} precompressed files written")
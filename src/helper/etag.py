@@ -0,0 +1,147 @@
+import functools
+import hashlib
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from enum import Enum
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+from src.config import settings
+from src.helper.cache import ResponseCache, render_response, with_request_param
+
+
+PUBLIC = "public"
+PRIVATE = "private"
+
+# depth of the loaded relationships taken into the fingerprint
+FINGERPRINT_MAX_DEPTH = 3
+
+_SCALARS = (str, int, float, bool, Decimal, datetime, date, Enum, type(None))
+
+
+def cache_control(scope: str) -> str:
+    if scope == PUBLIC:
+        return f"public, max-age={settings.HTTP_PUBLIC_MAX_AGE}, stale-while-revalidate={settings.HTTP_STALE_WHILE_REVALIDATE}"
+    # private data: the browser keeps it but revalidates every time (cheap with a 304)
+    return "private, no-cache"
+
+
+def fingerprint(value, depth: int = 0):
+    """
+    Cheap representation of an endpoint payload, computed before any
+    Pydantic serialization.
+
+    ORM objects contribute (table, id, updated_at), or their column values
+    when they have no updated_at, plus their already loaded relationships
+    (never triggers a lazy load). Rows from column selects contribute all
+    their values.
+    """
+
+    if isinstance(value, _SCALARS):
+        return value
+    if isinstance(value, dict):
+        return tuple((key, fingerprint(item, depth)) for key, item in value.items())
+    if isinstance(value, (list, tuple, set)) and not hasattr(value, "_mapping"):
+        return tuple(fingerprint(item, depth) for item in value)
+    if hasattr(value, "_mapping"):
+        return tuple(value)
+    if hasattr(value, "__table__"):
+        attributes = vars(value)
+        if "updated_at" in attributes:
+            key = (value.__tablename__, attributes.get("id"), attributes.get("updated_at"))
+        else:
+            key = (value.__tablename__,) + tuple(
+                (name, item) for name, item in attributes.items()
+                if not name.startswith("_") and isinstance(item, _SCALARS)
+            )
+        if depth >= FINGERPRINT_MAX_DEPTH:
+            return key
+        relations = tuple(
+            (name, fingerprint(item, depth + 1)) for name, item in attributes.items()
+            if not name.startswith("_") and (hasattr(item, "__table__") or isinstance(item, list))
+        )
+        return key + relations
+    if hasattr(value, "model_dump"):
+        return fingerprint(value.model_dump(), depth)
+    return repr(value)
+
+
+def make_etag(data) -> str:
+    if isinstance(data, bytes):
+        digest = hashlib.sha1(data).hexdigest()
+    else:
+        digest = hashlib.sha1(repr(data).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def last_modified(payload) -> Optional[datetime]:
+    data = payload.get("data") if isinstance(payload, dict) else payload
+    items = data if isinstance(data, (list, tuple)) else [data]
+    dates = []
+    for item in items:
+        updated_at = getattr(item, "updated_at", None)
+        if isinstance(updated_at, datetime):
+            dates.append(updated_at)
+    return max(dates) if dates else None
+
+
+def conditional_response(scope: str = PRIVATE):
+    """
+    Add ETag / Cache-Control headers to a GET endpoint and answer 304 Not
+    Modified when the client already has the current representation.
+
+    The weak ETag is a hash of the payload fingerprint and the normalized
+    endpoint arguments (filters, page), so a 304 skips the serialization of
+    the response models entirely. Responses already rendered (cache_response
+    hits) are tagged from their body.
+
+    Args:
+        scope (str): PUBLIC for catalog data shared by every client, PRIVATE
+            for user or back-office data.
+    """
+
+    def decorator(func):
+        endpoint_signature, request_param, injected = with_request_param(func, "_etag_request")
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs.pop(request_param) if injected else kwargs[request_param]
+            headers = {"Cache-Control": cache_control(scope)}
+
+            payload = await func(*args, **kwargs)
+            if isinstance(payload, Response):
+                if payload.status_code != status.HTTP_200_OK or not hasattr(payload, "body"):
+                    return payload
+                etag = make_etag(payload.body)
+            else:
+                etag = make_etag((ResponseCache.normalize_params(kwargs), fingerprint(payload)))
+                modified = last_modified(payload)
+                if modified is not None:
+                    if modified.tzinfo is not None:
+                        modified = modified.astimezone(timezone.utc)
+                    headers["Last-Modified"] = modified.strftime("%a, %d %b %Y %H:%M:%S GMT")
+            headers["ETag"] = etag
+
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            if isinstance(payload, Response):
+                payload.headers.update(headers)
+                return payload
+            return await render_response(request, payload, headers=headers)
+
+        wrapper.__signature__ = endpoint_signature
+        return wrapper
+
+    return decorator
@@ -0,0 +1,417 @@
+import csv
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Iterable, Optional
+from xml.sax.saxutils import escape
+
+from celery import shared_task
+from sqlalchemy import func, or_, select
+
+from src.api.job_offers.models import JobApplication, JobOffer
+from src.api.payments.models import Payment
+from src.api.payments.schemas import PaymentFilter
+from src.api.training.models import StudentApplication, Training, TrainingSession
+from src.api.job_offers.schemas import JobApplicationFilter
+from src.api.training.schemas import StudentApplicationFilter
+from src.api.user.models import User
+from src.api.user.schemas import UserFilter
+from src.config import settings
+from src.database import get_session
+from src.helper.file_helper import FileHelper
+from src.helper.task_status import TrackedTask
+
+
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Excel limit, rows beyond it go to the next sheet
+XLSX_MAX_ROWS = 1048576
+
+# XML 1.0 does not allow most control characters, even escaped
+_XML_ILLEGAL = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+
+# Writers
+
+
+def plain_value(value):
+    """Enum members are written as their value, not as `StatusEnum.MEMBER`"""
+
+    return value.value if isinstance(value, Enum) else value
+
+
+class CsvExportWriter:
+
+    def __init__(self, path: str, headers: list[str]):
+        # utf-8-sig so that Excel detects the encoding
+        self.file = open(path, "w", newline="", encoding="utf-8-sig")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(headers)
+
+    def write_rows(self, rows: Iterable[tuple]):
+        self.writer.writerows([plain_value(value) for value in row] for row in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class XlsxExportWriter:
+    """
+    Minimal streaming XLSX writer: the sheet XML is deflated into the archive
+    batch by batch (inline strings, no shared string table), so the memory does
+    not depend on the number of rows.
+    """
+
+    def __init__(self, path: str, headers: list[str]):
+        self.archive = zipfile.ZipFile(path, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+        self.headers = headers
+        self.sheet_count = 0
+        self.sheet = None
+        self.sheet_rows = 0
+        self._open_sheet()
+
+    def _open_sheet(self):
+        self.sheet_count += 1
+        self.sheet = self.archive.open(f"xl/worksheets/sheet{self.sheet_count}.xml", mode="w", force_zip64=True)
+        self.sheet.write(
+            b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        )
+        self.sheet_rows = 0
+        self._write_row(self.headers)
+
+    def _close_sheet(self):
+        self.sheet.write(b"</sheetData></worksheet>")
+        self.sheet.close()
+
+    @staticmethod
+    def _cell(value) -> str:
+        value = plain_value(value)
+        if value is None:
+            return "<c/>"
+        if isinstance(value, bool):
+            value = "yes" if value else "no"
+        elif isinstance(value, (int, float, Decimal)):
+            return f"<c><v>{value}</v></c>"
+        elif isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        text = escape(str(value).translate(_XML_ILLEGAL))
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+    def _write_row(self, row):
+        self.sheet.write(self._row(row).encode())
+        self.sheet_rows += 1
+
+    def _row(self, row) -> str:
+        return "<row>" + "".join(self._cell(v) for v in row) + "</row>"
+
+    def write_rows(self, rows: Iterable[tuple]):
+        # one write per batch of rows (a cursor partition), deflate is much faster on big writes
+        buffer = []
+        for row in rows:
+            if self.sheet_rows >= XLSX_MAX_ROWS:
+                self.sheet.write("".join(buffer).encode())
+                buffer = []
+                self._close_sheet()
+                self._open_sheet()
+            buffer.append(self._row(row))
+            self.sheet_rows += 1
+        self.sheet.write("".join(buffer).encode())
+
+    def close(self):
+        self._close_sheet()
+        sheets = range(1, self.sheet_count + 1)
+        self.archive.writestr("[Content_Types].xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + "".join(
+                f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                for i in sheets
+            )
+            + "</Types>"
+        ))
+        self.archive.writestr("_rels/.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+            "</Relationships>"
+        ))
+        self.archive.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + "".join(f'<sheet name="Sheet{i}" sheetId="{i}" r:id="rId{i}"/>' for i in sheets)
+            + "</sheets></workbook>"
+        ))
+        self.archive.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(
+                f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                for i in sheets
+            )
+            + "</Relationships>"
+        ))
+        self.archive.close()
+
+
+EXPORT_WRITERS = {
+    "csv": CsvExportWriter,
+    "xlsx": XlsxExportWriter,
+}
+
+
+# Datasets
+
+
+def users_statement(filters: UserFilter):
+    statement = (
+        select(
+            User.id, User.civility, User.first_name, User.last_name, User.email, User.country_code,
+            User.mobile_number, User.fix_number, User.user_type, User.status, User.lang,
+            User.birth_date, User.last_login, User.created_at,
+        )
+        .where(User.delete_at.is_(None))
+    )
+    if filters.search is not None:
+        statement = statement.where(
+            or_(
+                User.first_name.contains(filters.search),
+                User.last_name.contains(filters.search),
+                User.email.contains(filters.search),
+                User.mobile_number.contains(filters.search),
+                User.fix_number.contains(filters.search),
+                User.country_code.contains(filters.search),
+            )
+        )
+    if filters.user_type is not None:
+        statement = statement.where(User.user_type == filters.user_type)
+    if filters.country_code is not None:
+        statement = statement.where(User.country_code == filters.country_code)
+
+    column = getattr(User, filters.order_by)
+    return statement.order_by(column if filters.asc == "asc" else column.desc(), User.id)
+
+
+def student_applications_statement(filters: StudentApplicationFilter):
+    statement = (
+        select(
+            StudentApplication.id, StudentApplication.application_number, StudentApplication.status,
+            StudentApplication.refusal_reason, User.first_name, User.last_name, User.email, User.mobile_number,
+            Training.title, TrainingSession.start_date, TrainingSession.end_date,
+            StudentApplication.registration_fee, StudentApplication.training_fee, StudentApplication.currency,
+            StudentApplication.payment_id, StudentApplication.created_at,
+        )
+        .join(User, User.id == StudentApplication.user_id)
+        .join(Training, Training.id == StudentApplication.training_id)
+        .join(TrainingSession, TrainingSession.id == StudentApplication.target_session_id)
+        .where(StudentApplication.delete_at.is_(None))
+    )
+    if filters.search is not None:
+        statement = statement.where(
+            or_(
+                User.first_name.contains(filters.search),
+                User.last_name.contains(filters.search),
+                Training.title.contains(filters.search),
+                Training.presentation.contains(filters.search),
+            )
+        )
+    if filters.status is not None:
+        statement = statement.where(StudentApplication.status == filters.status)
+    if filters.training_id is not None:
+        statement = statement.where(StudentApplication.training_id == filters.training_id)
+    if filters.training_session_id is not None:
+        statement = statement.where(StudentApplication.target_session_id == filters.training_session_id)
+
+    column = StudentApplication.created_at
+    return statement.order_by(column if filters.asc == "asc" else column.desc(), StudentApplication.id)
+
+
+def job_applications_statement(filters: JobApplicationFilter):
+    statement = (
+        select(
+            JobApplication.id, JobApplication.application_number, JobApplication.status,
+            JobApplication.refusal_reason, JobApplication.civility, JobApplication.first_name,
+            JobApplication.last_name, JobApplication.email, JobApplication.phone_number,
+            JobApplication.city, JobApplication.country_code, JobOffer.reference, JobOffer.title,
+            JobApplication.submission_fee, JobApplication.currency, JobApplication.payment_id,
+            JobApplication.created_at,
+        )
+        .join(JobOffer, JobOffer.id == JobApplication.job_offer_id)
+        .where(JobApplication.delete_at.is_(None))
+    )
+    if filters.search is not None:
+        statement = statement.where(
+            or_(
+                JobApplication.first_name.contains(filters.search),
+                JobApplication.last_name.contains(filters.search),
+                JobApplication.email.contains(filters.search),
+                JobOffer.title.contains(filters.search),
+                JobOffer.reference.contains(filters.search),
+                JobApplication.application_number.contains(filters.search),
+            )
+        )
+    if filters.status is not None:
+        statement = statement.where(JobApplication.status == filters.status)
+    if filters.job_offer_id is not None:
+        statement = statement.where(JobApplication.job_offer_id == filters.job_offer_id)
+
+    column = getattr(JobApplication, filters.order_by)
+    return statement.order_by(column if filters.asc == "asc" else column.desc(), JobApplication.id)
+
+
+def payments_statement(filters: PaymentFilter):
+    statement = (
+        select(
+            Payment.id, Payment.transaction_id, Payment.status, Payment.product_amount, Payment.product_currency,
+            Payment.payment_currency, Payment.daily_rate, Payment.payable_type, Payment.payable_id,
+            Payment.payment_type, Payment.created_at,
+        )
+        .where(Payment.delete_at.is_(None))
+    )
+    if filters.search is not None:
+        statement = statement.where(
+            or_(
+                Payment.transaction_id.contains(filters.search),
+                Payment.payable_type.contains(filters.search),
+                Payment.payment_type.contains(filters.search),
+                Payment.product_currency.contains(filters.search),
+            )
+        )
+    if filters.currency is not None:
+        statement = statement.where(Payment.product_currency == filters.currency)
+    if filters.status is not None:
+        statement = statement.where(Payment.status == filters.status)
+    if filters.min_amount is not None:
+        statement = statement.where(Payment.product_amount >= filters.min_amount)
+    if filters.max_amount is not None:
+        statement = statement.where(Payment.product_amount <= filters.max_amount)
+    if filters.date_from is not None:
+        statement = statement.where(Payment.created_at >= filters.date_from)
+    if filters.date_to is not None:
+        statement = statement.where(Payment.created_at <= filters.date_to)
+
+    column = Payment.product_amount if filters.order_by == "amount" else Payment.created_at
+    return statement.order_by(column if filters.asc == "asc" else column.desc(), Payment.id)
+
+
+# dataset -> (filter schema, statement builder)
+EXPORT_DATASETS = {
+    "users": (UserFilter, users_statement),
+    "student_applications": (StudentApplicationFilter, student_applications_statement),
+    "job_applications": (JobApplicationFilter, job_applications_statement),
+    "payments": (PaymentFilter, payments_statement),
+}
+
+
+class ExportHelper:
+    """
+    Export a dataset (users, student/job applications, payments) to CSV or
+    XLSX in constant memory: rows are fetched through a server-side cursor
+    (`yield_per`) and written to a temporary file, which is then moved to the
+    private storage.
+    """
+
+    @staticmethod
+    def file_name(dataset: str, fmt: str, task_id: str) -> str:
+        return f"{dataset}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{task_id[:8]}.{fmt}"
+
+    @staticmethod
+    def store(temp_path: str, file_name: str, fmt: str) -> str:
+        """
+        Move the finished export to the private storage.
+
+        Returns:
+            str: The stored path ("uploads/exports/..." locally, the S3 key otherwise).
+        """
+
+        if settings.STORAGE_LOCATION == "local":
+            os.makedirs("src/uploads/exports", exist_ok=True)
+            shutil.move(temp_path, f"src/uploads/exports/{file_name}")
+            return f"uploads/exports/{file_name}"
+
+        key = f"private/exports/{file_name}"
+        # upload_file sends the file in multipart chunks, it is never fully loaded
+        FileHelper.get_s3_client().upload_file(
+            temp_path, settings.AWS_BUCKET_NAME, key,
+            ExtraArgs={"ContentType": EXPORT_CONTENT_TYPES[fmt]},
+        )
+        os.remove(temp_path)
+        return key
+
+    @staticmethod
+    def run(session, dataset: str, fmt: str, filters: dict, task_id: str, progress=None) -> dict:
+        """
+        Write the dataset matching `filters` and store the file.
+
+        Args:
+            progress (callable, optional): Called with (rows, total) every
+                EXPORT_PROGRESS_EVERY rows.
+        """
+
+        filter_model, build_statement = EXPORT_DATASETS[dataset]
+        statement = build_statement(filter_model(**(filters or {})))
+        total = session.execute(select(func.count()).select_from(statement.order_by(None).subquery())).scalar_one()
+
+        result = session.execute(statement.execution_options(yield_per=settings.EXPORT_YIELD_PER))
+        headers = list(result.keys())
+
+        fd, temp_path = tempfile.mkstemp(suffix=f".{fmt}")
+        os.close(fd)
+        rows = 0
+        try:
+            writer = EXPORT_WRITERS[fmt](temp_path, headers)
+            try:
+                for partition in result.partitions():
+                    writer.write_rows(partition)
+                    previous, rows = rows, rows + len(partition)
+                    if progress is not None and rows // settings.EXPORT_PROGRESS_EVERY != previous // settings.EXPORT_PROGRESS_EVERY:
+                        progress(rows, total)
+            finally:
+                writer.close()
+                result.close()
+
+            file_name = ExportHelper.file_name(dataset, fmt, task_id)
+            file_path = ExportHelper.store(temp_path, file_name, fmt)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        return {"rows": rows, "file_name": file_name, "file_path": file_path}
+
+    @staticmethod
+    def download_location(file_path: str) -> str:
+        """Local file path to serve, or a presigned url for S3 exports"""
+        if file_path.startswith("uploads/"):
+            return f"src/{file_path}"
+        return FileHelper.generate_s3_presigned_url(file_path, expires_in=settings.EXPORT_LINK_EXPIRE_SECONDS)
+
+
+@shared_task(bind=True, base=TrackedTask)
+def export_dataset_task(self, dataset: str, fmt: str, filters: Optional[dict], user_id: str) -> dict:
+    """
+    Celery task exporting a dataset to the private storage.
+
+    While running, the task status is PROGRESS with the number of written
+    rows, so `get_task_info` reports the progress (TrackedTask).
+    """
+
+    meta = {"dataset": dataset, "format": fmt, "user_id": user_id}
+
+    def progress(rows, total):
+        self.update_status("PROGRESS", {**meta, "rows": rows, "total": total})
+
+    with get_session() as session:
+        report = ExportHelper.run(session, dataset, fmt, filters, self.request.id or "local", progress)
+
+    return {**meta, **report}
@@ -1,6 +1,7 @@
 import asyncio
 import hashlib
 import hmac
+import logging
 import shutil
 from typing import Optional
 from urllib.parse import urlencode
@@ -8,10 +9,17 @@ from fastapi import UploadFile
 import os
 from datetime import datetime, time
 from src.config import settings
+from src.helper.compression import CompressionHelper
 import boto3
 from fastapi import UploadFile
 import re
 from botocore.exceptions import BotoCoreError, ClientError, NoCredentialsError 
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# S3 accepts at most 1000 keys per delete_objects request
+S3_DELETE_BATCH_SIZE = 1000
 
 
 class FileHelper:
@@ -94,9 +102,58 @@ class FileHelper:
         if settings.STORAGE_LOCATION == "local":
             return FileHelper.delete_file_local(file_path)
         else:
-            return FileHelper.delete_file_from_s3(file_path)
+            return FileHelper.delete_file_from_s3(FileHelper.get_s3_key(file_path))
     
     
+    @staticmethod
+    def delete_files(file_paths: list[str]):
+        """
+        Delete many files from the specified storage location at once.
+
+        On S3 the keys are removed with batched `delete_objects` calls instead
+        of one `delete_object` request per file.
+
+        Args:
+            file_paths (list[str]): The paths, keys or public urls of the files
+                to delete. Empty values are ignored.
+
+        Returns:
+            dict: {"deleted": int, "errors": list}
+        """
+
+        file_paths = [file_path for file_path in file_paths if file_path]
+        if settings.STORAGE_LOCATION == "local":
+            deleted = sum(1 for file_path in file_paths if FileHelper.delete_file_local(file_path)["success"])
+            return {"deleted": deleted, "errors": []}
+        return FileHelper.delete_s3_keys(FileHelper.get_s3_key(file_path) for file_path in file_paths)
+
+    @staticmethod
+    def open_file(file_path: str):
+        """
+        Open a stored file for streaming reads.
+
+        Local paths ("static/..." for public files, "uploads/..." for private
+        ones) are opened from the src folder, anything else is read from S3.
+
+        Args:
+            file_path (str): The stored path, S3 key or public url of the file.
+
+        Returns:
+            A binary file-like object with `read(size)` and `close()`, or None
+            if the file does not exist.
+        """
+
+        if file_path.startswith(("static/", "uploads/")):
+            full_path = os.path.join("src", file_path)
+            if not os.path.isfile(full_path):
+                return None
+            return open(full_path, "rb")
+
+        s3_object = FileHelper.get_aws_object(FileHelper.get_s3_key(file_path))
+        if s3_object is None:
+            return None
+        return s3_object["Body"]
+
     @staticmethod
     def delete_folder(file_path: Optional[str] = None):
         
@@ -308,26 +365,96 @@ class FileHelper:
     
     
     
+    @staticmethod
+    def iter_s3_objects(prefix: str):
+        """
+        Iterate over every object of the bucket starting with a given prefix.
+
+        `list_objects_v2` returns at most 1000 keys per call, so the listing is
+        paginated until the whole prefix has been walked.
+
+        Args:
+            prefix (str): The prefix to match objects against.
+
+        Yields:
+            dict: The S3 object description (Key, Size, LastModified, ...).
+        """
+
+        s3 = FileHelper.get_s3_client()
+        paginator = s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=settings.AWS_BUCKET_NAME, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                yield obj
+
+    @staticmethod
+    def delete_s3_keys(keys, batch_size: int = S3_DELETE_BATCH_SIZE) -> dict:
+        """
+        Delete many S3 keys with batched `delete_objects` calls.
+
+        Keys are grouped by `batch_size` (1000 is the S3 maximum per request) and
+        the batches are sent concurrently on STORAGE_DELETE_CONCURRENCY threads.
+
+        Args:
+            keys (Iterable[str]): The keys to delete. May be a generator.
+            batch_size (int, optional): Number of keys per request. Defaults to 1000.
+
+        Returns:
+            dict: {"deleted": int, "errors": list[dict]} where each error holds
+            the key, code and message returned by S3.
+        """
+
+        s3 = FileHelper.get_s3_client()
+        report = {"deleted": 0, "errors": []}
+
+        def _delete_batch(batch):
+            response = s3.delete_objects(
+                Bucket=settings.AWS_BUCKET_NAME,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+            return len(batch), response.get("Errors", [])
+
+        def _collect(future):
+            sent, errors = future.result()
+            report["deleted"] += sent - len(errors)
+            report["errors"].extend(
+                {"key": e.get("Key"), "code": e.get("Code"), "message": e.get("Message")} for e in errors
+            )
+
+        with ThreadPoolExecutor(max_workers=settings.STORAGE_DELETE_CONCURRENCY) as executor:
+            pending = []
+            batch = []
+            for key in keys:
+                batch.append(key.strip("/"))
+                if len(batch) == batch_size:
+                    pending.append(executor.submit(_delete_batch, batch))
+                    batch = []
+                # keep a bounded number of batches in flight
+                if len(pending) >= settings.STORAGE_DELETE_CONCURRENCY * 2:
+                    _collect(pending.pop(0))
+            if batch:
+                pending.append(executor.submit(_delete_batch, batch))
+            for future in pending:
+                _collect(future)
+
+        return report
+
     @staticmethod
     def delete_s3_folder(prefix: str):
         """
         Delete all objects in an S3 bucket that start with a given prefix.
 
-        Given a prefix string, this function lists all objects in the
-        S3 bucket that start with that prefix, and then deletes them.
+        The prefix is listed page by page and the keys are removed with batched
+        `delete_objects` calls (see `delete_s3_keys`).
 
         Parameters:
         prefix (str): The prefix to match objects against.
 
         Returns:
-        None
+        dict: {"deleted": int, "errors": list[dict]}
         """
-        s3 = FileHelper.get_s3_client()
-        response = s3.list_objects_v2(Bucket=settings.AWS_BUCKET_NAME, Prefix=prefix)
-        if "Contents" in response:
-            for obj in response["Contents"]:
-                s3.delete_object(Bucket=settings.AWS_BUCKET_NAME, Key=obj["Key"])
-                print(f"🗑 Deleted {obj['Key']}")
+        report = FileHelper.delete_s3_keys(obj["Key"] for obj in FileHelper.iter_s3_objects(prefix))
+        logger.info("Deleted %s objects under %s (%s errors)", report["deleted"], prefix, len(report["errors"]))
+        return report
 
     @staticmethod
     def delete_file_from_s3(key: str) -> bool:
@@ -357,6 +484,18 @@ class FileHelper:
         except BotoCoreError as e:
             raise RuntimeError(f"S3 error: {str(e)}")
     
+    @staticmethod
+    def get_s3_key(file_path: str) -> str:
+        """
+        Return the S3 key of a stored file, whether the database holds the key
+        itself (private files) or the public url (public files).
+        """
+
+        public_url = FileHelper.get_s3_public_url("")
+        if file_path.startswith(public_url):
+            return file_path[len(public_url):]
+        return file_path.strip("/")
+
     @staticmethod
     def get_s3_public_url(key: str):
         """
@@ -440,13 +579,11 @@ class FileHelper:
             return  s3.get_object(Bucket=settings.AWS_BUCKET_NAME, Key=key)
             
         except ClientError as e:
-            print(e)
             if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
                 
                 return None 
             raise RuntimeError(f"Could not get the object : {str(e)}")
         except Exception as e:
-            print(e)
             raise RuntimeError(f"Could not get the object: {str(e)}")
 
     @staticmethod
@@ -457,13 +594,11 @@ class FileHelper:
             return  s3.list_objects_v2(Bucket=settings.AWS_BUCKET_NAME, Prefix=prefix)
         
         except ClientError as e:
-            print(e)
             if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
                 
                 return None 
             raise RuntimeError(f"Could not get the object : {str(e)}")
         except Exception as e:
-            print(e)
             raise RuntimeError(f"Could not get the object: {str(e)}")
         
 
@@ -552,11 +687,13 @@ class FileHelper:
             contents = await file.read()
             with open(path_save, "wb") as f:
                 f.write(contents)
+            # .br / .gz siblings served by the /static mount
+            await asyncio.to_thread(CompressionHelper.precompress_file, path_save)
 
             return path, back_name, file.content_type
 
-        except Exception as e:
-            print(e)
+        except Exception:
+            logger.exception("Error when saving a file")
             return None, None, None
 
     @staticmethod
@@ -602,8 +739,8 @@ class FileHelper:
             extension = file.content_type
             return path, back_name, extension
 
-        except Exception as e:
-            print(e)
+        except Exception:
+            logger.exception("Error when saving a file")
             return None, None, None
     
     @staticmethod
@@ -644,8 +781,8 @@ class FileHelper:
             
             return path, name, extension
 
-        except Exception as e:
-            print(e)
+        except Exception:
+            logger.exception("Error when saving a file")
             return None, None, None
     
     @staticmethod
@@ -667,11 +804,11 @@ class FileHelper:
             path_save = f"{path_save}/{name}"
             with open(path_save, "wb") as f:
                 f.write(file)
-            print(path_save)
+            await asyncio.to_thread(CompressionHelper.precompress_file, path_save)
             return path, name, extension
 
-        except Exception as e:
-            print(e)
+        except Exception:
+            logger.exception("Error when saving a file")
             return None, None, None
     
     
@@ -696,12 +833,13 @@ class FileHelper:
             # Check if the file exists
             if os.path.exists(full_path):
                 os.remove(full_path)
+                CompressionHelper.delete_precompressed(full_path)
                 return {"message": "File deleted successfully", "success": True}
             else:
                 return {"message": "File not found", "success": False}
 
-        except Exception as e:
-            print(e)
+        except Exception:
+            logger.exception("Error when deleting %s", file_path)
             return {"message": "Exception has occur", "success": False}
 
     @staticmethod
@@ -711,7 +849,7 @@ class FileHelper:
 
         This function takes the relative path to a folder, constructs its absolute path,
         and deletes it if it exists. If the folder does not exist, a message indicating
-        that the folder was not found is printed.
+        that the folder was not found is logged.
 
         Args:
             folder_path (str): The relative path to the folder to be deleted.
@@ -721,6 +859,6 @@ class FileHelper:
     
         if os.path.isdir(absolute_path):
             shutil.rmtree(absolute_path)
-            print(f"🗑 Deleted local folder: {absolute_path}")
+            logger.info("Deleted local folder: %s", absolute_path)
         else:
-            print(f"⚠ Folder not found: {absolute_path}")
\ No newline at end of file
+            logger.warning("Folder not found: %s", absolute_path)
\ No newline at end of file
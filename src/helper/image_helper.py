@@ -0,0 +1,352 @@
+import logging
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from urllib.parse import urlencode
+
+from botocore.exceptions import ClientError
+
+from src.config import settings
+from src.helper.file_helper import FileHelper
+
+
+logger = logging.getLogger(__name__)
+
+
+IMAGE_CONTENT_TYPES = {
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+_image_pool: Optional[ProcessPoolExecutor] = None
+_background_tasks: set = set()
+
+
+def get_image_pool() -> ProcessPoolExecutor:
+    """
+    Return the process pool used to resize images, creating it on first use.
+
+    Pillow decoding/encoding is CPU bound, so it is kept out of the event loop
+    and out of the default thread pool.
+    """
+
+    global _image_pool
+    if _image_pool is None:
+        _image_pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _image_pool
+
+
+def render_derivative(data: bytes, width: int, fmt: str, quality: int) -> bytes:
+    """
+    Resize an image to the given width (keeping the ratio) and encode it.
+
+    Runs inside the process pool, so it only takes and returns plain bytes.
+    Images smaller than the requested width are re-encoded but never upscaled.
+    """
+
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+
+        output = io.BytesIO()
+        if fmt == "jpeg":
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            image.save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
+        else:
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.mode else "RGB")
+            image.save(output, format="WEBP", quality=quality, method=4)
+
+    return output.getvalue()
+
+
+class ImageHelper:
+
+    # Derivative keys
+
+    @staticmethod
+    def normalize_width(width: Optional[int]) -> int:
+        """
+        Snap a requested width to the closest configured derivative width.
+
+        Only the widths in IMAGE_DERIVATIVE_WIDTHS are ever generated, so an
+        arbitrary `w` query parameter can not fill the storage with variants.
+
+        Args:
+            width (Optional[int]): The requested width. None returns the largest width.
+
+        Returns:
+            int: The smallest configured width greater or equal to the request,
+            or the largest configured width.
+        """
+
+        widths = sorted(settings.IMAGE_DERIVATIVE_WIDTHS)
+        if width is None:
+            return widths[-1]
+        for candidate in widths:
+            if candidate >= width:
+                return candidate
+        return widths[-1]
+
+    @staticmethod
+    def is_supported_source(source: str) -> bool:
+        """
+        Check that the source is a public image we manage (local static file or
+        public S3 object) and not an arbitrary path or URL.
+        """
+
+        if not source or ".." in source:
+            return False
+        if source.startswith("static/"):
+            return True
+        return source.startswith(FileHelper.get_s3_public_url("public/"))
+
+    @staticmethod
+    def derivative_key(source: str, width: int, fmt: str) -> str:
+        """
+        Build the deterministic storage key of a derivative.
+
+        The key only depends on the source path, the width, the format and the
+        quality, so the same request always maps to the same (immutable) file.
+
+        Args:
+            source (str): The stored path or public URL of the original image.
+            width (int): The derivative width.
+            fmt (str): The derivative format ("webp" or "jpeg").
+
+        Returns:
+            str: The relative key of the derivative, e.g. "derivatives/ab/ab12..._640.webp".
+        """
+
+        digest = hashlib.sha1(
+            f"{source}:{width}:{fmt}:{settings.IMAGE_DERIVATIVE_QUALITY}".encode()
+        ).hexdigest()
+        extension = "jpg" if fmt == "jpeg" else fmt
+        return f"derivatives/{digest[:2]}/{digest}_{width}.{extension}"
+
+    @staticmethod
+    def derivative_url(source: Optional[str], width: Optional[int] = None, fmt: Optional[str] = "webp") -> Optional[str]:
+        """
+        Return the public URL of the media endpoint serving a derivative of
+        `source`. Without `fmt` the endpoint negotiates it from the Accept header.
+        """
+
+        if not source:
+            return source
+        params = {"src": source, "w": ImageHelper.normalize_width(width)}
+        if fmt is not None:
+            params["fmt"] = fmt
+        return f"/api/v1/media/images?{urlencode(params)}"
+
+    @staticmethod
+    def srcset(source: Optional[str]) -> Optional[str]:
+        """
+        Return the `srcset` of an image ("<url> 320w, <url> 640w, ...") over
+        the configured derivative widths, for the responses exposing it next
+        to the full-size URL. None for the sources the media endpoint does
+        not serve.
+        """
+
+        if not source or not ImageHelper.is_supported_source(source):
+            return None
+        return ", ".join(
+            f"{ImageHelper.derivative_url(source, width, fmt=None)} {width}w"
+            for width in sorted(settings.IMAGE_DERIVATIVE_WIDTHS)
+        )
+
+    @staticmethod
+    def supported_formats() -> list[str]:
+        """
+        Return the configured derivative formats the installed Pillow can encode
+        (some Pillow builds ship without libwebp).
+        """
+
+        from PIL import features
+
+        return [
+            fmt for fmt in settings.IMAGE_DERIVATIVE_FORMATS
+            if fmt != "webp" or features.check("webp")
+        ]
+
+    @staticmethod
+    def cache_control() -> str:
+        return f"public, max-age={settings.IMAGE_CACHE_MAX_AGE}, immutable"
+
+    # Storage access
+
+    @staticmethod
+    def read_source(source: str) -> Optional[bytes]:
+        """
+        Read the original image from the local static folder or from S3.
+
+        Returns:
+            Optional[bytes]: The image content, or None if it does not exist.
+        """
+
+        if source.startswith("static/"):
+            full_path = os.path.join("src", source)
+            if not os.path.isfile(full_path):
+                return None
+            with open(full_path, "rb") as f:
+                return f.read()
+
+        s3_object = FileHelper.get_aws_object(FileHelper.get_s3_key(source))
+        if s3_object is None:
+            return None
+        return s3_object["Body"].read()
+
+    @staticmethod
+    def derivative_exists(key: str) -> bool:
+        if settings.STORAGE_LOCATION == "local":
+            return os.path.isfile(os.path.join("src/static/uploads", key))
+        try:
+            FileHelper.get_s3_client().head_object(Bucket=settings.AWS_BUCKET_NAME, Key=f"public/{key}")
+            return True
+        except ClientError:
+            return False
+
+    @staticmethod
+    def store_derivative(key: str, content: bytes, fmt: str) -> str:
+        """
+        Store a derivative under its deterministic key with long-lived cache headers.
+
+        Returns:
+            str: The local path ("static/uploads/derivatives/...") or the public S3 URL.
+        """
+
+        if settings.STORAGE_LOCATION == "local":
+            full_path = os.path.join("src/static/uploads", key)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            tmp_path = f"{full_path}.tmp{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, full_path)
+            return f"static/uploads/{key}"
+
+        FileHelper.get_s3_client().put_object(
+            Bucket=settings.AWS_BUCKET_NAME,
+            Key=f"public/{key}",
+            Body=content,
+            ContentType=IMAGE_CONTENT_TYPES[fmt],
+            CacheControl=ImageHelper.cache_control(),
+        )
+        return FileHelper.get_s3_public_url(f"public/{key}")
+
+    @staticmethod
+    def stored_location(key: str) -> str:
+        if settings.STORAGE_LOCATION == "local":
+            return f"static/uploads/{key}"
+        return FileHelper.get_s3_public_url(f"public/{key}")
+
+    # Generation
+
+    @staticmethod
+    async def get_or_create_derivative(source: str, width: Optional[int] = None, fmt: str = "webp", data: Optional[bytes] = None) -> Optional[str]:
+        """
+        Return the location of a derivative, generating it on first request.
+
+        Args:
+            source (str): The stored path or public URL of the original image.
+            width (Optional[int]): The requested width, snapped to a configured width.
+            fmt (str): "webp" or "jpeg".
+            data (Optional[bytes]): The original content if already in memory.
+
+        Returns:
+            Optional[str]: The local path or public URL of the derivative, or None
+            if the original image can not be found.
+        """
+
+        width = ImageHelper.normalize_width(width)
+        key = ImageHelper.derivative_key(source, width, fmt)
+        loop = asyncio.get_running_loop()
+
+        if await loop.run_in_executor(None, ImageHelper.derivative_exists, key):
+            return ImageHelper.stored_location(key)
+
+        if data is None:
+            data = await loop.run_in_executor(None, ImageHelper.read_source, source)
+            if data is None:
+                return None
+
+        try:
+            content = await loop.run_in_executor(
+                get_image_pool(), render_derivative, data, width, fmt, settings.IMAGE_DERIVATIVE_QUALITY
+            )
+        except BrokenProcessPool:
+            # a worker died (OOM on a huge image...), start a fresh pool next time
+            global _image_pool
+            _image_pool = None
+            raise
+        return await loop.run_in_executor(None, ImageHelper.store_derivative, key, content, fmt)
+
+    @staticmethod
+    async def generate_derivatives(source: Optional[str]):
+        """
+        Generate every configured width/format derivative of an uploaded image.
+
+        Errors are swallowed: a missing derivative is generated lazily by the
+        media endpoint anyway.
+        """
+
+        if not source or not ImageHelper.is_supported_source(source):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(None, ImageHelper.read_source, source)
+            if data is None:
+                return
+            for fmt in ImageHelper.supported_formats():
+                for width in settings.IMAGE_DERIVATIVE_WIDTHS:
+                    await ImageHelper.get_or_create_derivative(source, width, fmt, data=data)
+        except Exception as e:
+            logger.warning("Error when generating image derivatives: %s", e)
+
+    @staticmethod
+    def schedule_derivatives(source: Optional[str]):
+        """
+        Generate the derivatives of an uploaded image in the background, so the
+        upload request does not wait for the resize.
+        """
+
+        task = asyncio.get_running_loop().create_task(ImageHelper.generate_derivatives(source))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    @staticmethod
+    def _delete_files(paths: list[str]):
+        try:
+            FileHelper.delete_files(paths)
+        except Exception as e:
+            logger.warning("Error when deleting image derivatives: %s", e)
+
+    @staticmethod
+    def delete_derivatives(source: Optional[str]):
+        """
+        Delete the derivatives of an image that is being replaced or removed.
+        """
+
+        if not source:
+            return
+        paths = [
+            ImageHelper.stored_location(ImageHelper.derivative_key(source, width, fmt))
+            for fmt in settings.IMAGE_DERIVATIVE_FORMATS
+            for width in settings.IMAGE_DERIVATIVE_WIDTHS
+        ]
+        # one batched delete_objects call, off the event loop
+        task = asyncio.get_running_loop().run_in_executor(None, ImageHelper._delete_files, paths)
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
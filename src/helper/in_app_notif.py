@@ -68,3 +68,10 @@ class NotificationType(Enum):
         {"en": "Don't forget to join the event '{event_title}' at {event_time}.", "fr": "N'oubliez pas de rejoindre l'événement '{event_title}' à {event_time}."},
         [{"name_en": "Join now", "name_fr": "Rejoindre maintenant", "url": "/streaming"}]
     )
+
+    APPLICATION_STATUS_CHANGED = (
+        "application_status_changed",
+        {"en": "📄 Application status updated.", "fr": "📄 Statut de candidature mis à jour."},
+        {"en": "Your application {application_number} for '{training_title}' is now {status}.", "fr": "Votre candidature {application_number} pour '{training_title}' est maintenant {status}."},
+        [{"name_en": "View my application", "name_fr": "Voir ma candidature", "url": "/student-applications/{application_id}"}]
+    )
@@ -0,0 +1,97 @@
+import functools
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from src.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson (falls back to the json module when
+    orjson is not installed).
+
+    `content` may also be an already serialized body (bytes) or a Pydantic
+    model, which is dumped by pydantic-core without going through Python
+    dicts.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode()
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return super().render(content)
+
+
+def loaded_values(value):
+    """
+    Replace the ORM objects of a payload by their loaded attributes (the
+    instance __dict__): no instrumented attribute access per field, and
+    an unloaded relationship is simply missing instead of being lazy loaded.
+    """
+
+    if isinstance(value, dict):
+        return {key: loaded_values(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [loaded_values(item) for item in value]
+    if hasattr(value, "_sa_instance_state"):
+        return {
+            key: loaded_values(item) if isinstance(item, list) or hasattr(item, "_sa_instance_state") else item
+            for key, item in vars(value).items() if not key.startswith("_")
+        }
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def response_adapter(response_model) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def dump_response(route, payload) -> Optional[bytes]:
+    """
+    Serialize an endpoint return value straight from the ORM objects / Rows
+    to JSON bytes with the response model of `route`.
+
+    FastAPI first dumps every SQLModel object to a dict (dropping the loaded
+    relationships), validates the dicts into the response model, dumps the
+    result back to Python objects and finally json encodes them. Here the
+    response model reads the attributes of the rows (from_attributes) and
+    pydantic-core writes the JSON in a single pass. Loaded relationships
+    are part of the output.
+
+    Returns None when the fast path does not apply (disabled, no response
+    model, a relationship of the response model is not loaded, invalid
+    payload); the caller then falls back to the FastAPI serialization.
+    """
+
+    response_model = getattr(route, "response_model", None)
+    if not settings.FAST_JSON_RESPONSE or response_model is None:
+        return None
+    adapter = response_adapter(response_model)
+    try:
+        value = adapter.validate_python(loaded_values(payload), from_attributes=True)
+    except ValidationError:
+        # unloaded relationship or invalid payload: FastAPI gives the usual result / error
+        return None
+    return adapter.dump_json(
+        value,
+        include=route.response_model_include,
+        exclude=route.response_model_exclude,
+        by_alias=route.response_model_by_alias,
+        exclude_unset=route.response_model_exclude_unset,
+        exclude_defaults=route.response_model_exclude_defaults,
+        exclude_none=route.response_model_exclude_none,
+    )
+
+
+def default_response_class():
+    return FastJSONResponse if settings.FAST_JSON_RESPONSE else JSONResponse
@@ -0,0 +1,65 @@
+from typing import Callable, Sequence, Type
+
+from pydantic import BaseModel
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.interfaces import LoaderOption
+from sqlalchemy.sql import Select
+from sqlmodel import SQLModel
+
+
+def schema_columns(model: Type[SQLModel], schema: Type[BaseModel]) -> LoaderOption:
+    """
+    load_only option restricted to the columns of `model` which `schema`
+    outputs. The primary key is always loaded by SQLAlchemy, updated_at too
+    since the ETags and Last-Modified headers are computed from it.
+
+    Only use it for rows which go straight to the response: reading a column
+    which was not loaded raises from an async session.
+    """
+
+    columns = [
+        getattr(model, column.key) for column in model.__table__.columns
+        if column.key in schema.model_fields or column.key == "updated_at"
+    ]
+    return load_only(*columns)
+
+
+class LoaderProfiles:
+    """
+    Named loading strategies of a model ("list", "detail", "admin"), so each
+    endpoint loads the relations and columns its response schema needs in a
+    fixed number of queries:
+
+    - joinedload for many-to-one relations (same query),
+    - selectinload for collections (one query per relation, whatever the
+      number of rows),
+    - load_only (schema_columns) for list pages.
+
+        STUDENT_APPLICATION_LOADERS = LoaderProfiles(
+            StudentApplication,
+            detail=lambda: (joinedload(StudentApplication.training), selectinload(StudentApplication.attachments)),
+        )
+        statement = STUDENT_APPLICATION_LOADERS.apply(select(StudentApplication), "detail")
+
+    The profiles are given as functions, built on first use: building
+    loader options configures the mappers, which cannot happen while the
+    models are still being imported.
+    """
+
+    def __init__(self, model: Type[SQLModel], **profiles: Callable[[], Sequence[LoaderOption]]):
+        self.model = model
+        self.profiles = profiles
+        self._options: dict[str, tuple] = {}
+
+    def options(self, profile: str) -> tuple:
+        options = self._options.get(profile)
+        if options is None:
+            try:
+                factory = self.profiles[profile]
+            except KeyError:
+                raise KeyError(f"No '{profile}' loader profile for {self.model.__name__}") from None
+            options = self._options[profile] = tuple(factory())
+        return options
+
+    def apply(self, statement: Select, profile: str) -> Select:
+        return statement.options(*self.options(profile))
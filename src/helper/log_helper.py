@@ -0,0 +1,212 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+
+REQUEST_ID_HEADER = "X-Request-ID"
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+# ids sent by a proxy / client are kept only when they look like ids
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# attributes of every LogRecord, the others come from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def bind_request_id(request_id: Optional[str]) -> contextvars.Token:
+    """Set the id added to the records of the current context (request, Celery task)"""
+
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token: contextvars.Token):
+    _request_id.reset(token)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, logger, message, request_id,
+    the code location and the extra={...} fields of the call.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        if orjson is not None:
+            return orjson.dumps(entry, default=str).decode()
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _ContextFilter(logging.Filter):
+    """Attach the request id while still in the thread of the caller"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a share of the DEBUG records (LOG_SAMPLE_RATES / LOG_DEBUG_SAMPLE_RATE)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = LogHelper.sample_rate(record.name)
+        return rate >= 1 or random.random() < rate
+
+
+class _QueueHandler(QueueHandler):
+    """
+    QueueHandler which leaves the formatting to the listener thread: only
+    the message is built here, since its arguments may change once the
+    logging call returns. A full queue drops the record instead of blocking.
+    """
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _QueueHandler.dropped += 1
+
+
+class LogHelper:
+    """
+    Logging of the API and of the Celery workers: the loggers only put the
+    records in a queue, a QueueListener thread formats them (JSON by
+    default) and writes them to stdout, so a slow stdout pipe never blocks
+    the event loop.
+
+        logger = logging.getLogger(__name__)
+        logger.info("Payment confirmed", extra={"transaction_id": transaction_id})
+    """
+
+    _listener: Optional[QueueListener] = None
+
+    @staticmethod
+    def setup():
+        """Configure the root logger, once per process"""
+
+        if LogHelper._listener is not None:
+            return
+
+        output = logging.StreamHandler(sys.stdout)
+        if settings.LOG_FORMAT == "json":
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        handler = _QueueHandler(log_queue)
+        handler.addFilter(_ContextFilter())
+        handler.addFilter(SamplingFilter())
+
+        root = logging.getLogger()
+        root.handlers = [handler]
+        root.setLevel(settings.LOG_LEVEL.upper())
+        # uvicorn installs its own stream handlers, its records go through the queue too
+        for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+            logger = logging.getLogger(name)
+            logger.handlers = []
+            logger.propagate = True
+        for name, level in settings.LOG_LEVELS.items():
+            logging.getLogger(name).setLevel(level.upper())
+
+        LogHelper._listener = QueueListener(log_queue, output, respect_handler_level=True)
+        LogHelper._listener.start()
+        atexit.register(LogHelper.shutdown)
+
+    @staticmethod
+    def shutdown():
+        """Write the records still in the queue and stop the listener thread"""
+
+        if LogHelper._listener is not None:
+            LogHelper._listener.stop()
+            LogHelper._listener = None
+
+    @staticmethod
+    def sample_rate(logger_name: str) -> float:
+        matches = [
+            prefix for prefix in settings.LOG_SAMPLE_RATES
+            if logger_name == prefix or logger_name.startswith(prefix + ".")
+        ]
+        if matches:
+            return settings.LOG_SAMPLE_RATES[max(matches, key=len)]
+        return settings.LOG_DEBUG_SAMPLE_RATE
+
+
+class RequestIdMiddleware:
+    """
+    Give each request an id (the X-Request-ID header of the proxy when it
+    sends a valid one), added to its log records and to the response headers.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        if not request_id or not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        token = _request_id.set(request_id)
+
+        async def send_with_request_id(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _request_id.reset(token)
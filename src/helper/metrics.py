@@ -0,0 +1,343 @@
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+import redis
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+@dataclass
+class RequestStats:
+    """Counters of the request being handled (see current_stats)"""
+
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    db_commits: int = 0
+    http_calls: int = 0
+    http_seconds: float = 0.0
+
+
+_request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+class Histogram:
+
+    def __init__(self, name: str, documentation: str, labels: tuple, buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [bucket counts..., sum, count]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series.setdefault(label_values, [0] * len(self.buckets) + [0.0, 0])
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list[str]:
+        return self._render(self._series)
+
+    def _render(self, all_series: dict) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(all_series.items()):
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{labels}}} {series[-1]}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_shared_client: Optional[redis.Redis] = None
+
+
+def _shared_redis() -> redis.Redis:
+    # sync client: observed by the Celery workers, rendered by /metrics in the threadpool
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = redis.Redis.from_url(settings.REDIS_CACHE_URL, decode_responses=True)
+    return _shared_client
+
+
+class SharedHistogram(Histogram):
+    """
+    Histogram kept in a Redis hash instead of the process, for the metrics
+    observed by the Celery workers (which are not scraped): every API worker
+    exposes the same totals. Fields: "<label values as JSON>|<bucket index>",
+    "...|sum" and "...|count".
+    """
+
+    def _key(self) -> str:
+        return f"{settings.REDIS_NAMESPACE}:metrics:{self.name}"
+
+    def observe(self, value: float, *label_values):
+        labels = json.dumps(label_values)
+        index = bisect.bisect_left(self.buckets, value)
+        try:
+            pipe = _shared_redis().pipeline(transaction=False)
+            if index < len(self.buckets):
+                pipe.hincrby(self._key(), f"{labels}|{index}", 1)
+            pipe.hincrbyfloat(self._key(), f"{labels}|sum", value)
+            pipe.hincrby(self._key(), f"{labels}|count", 1)
+            pipe.execute()
+        except (redis.RedisError, OSError) as e:
+            logger.warning("Metric %s not recorded: %s", self.name, e)
+
+    def render(self) -> list[str]:
+        try:
+            fields = _shared_redis().hgetall(self._key())
+        except (redis.RedisError, OSError) as e:
+            logger.warning("Metric %s not rendered: %s", self.name, e)
+            return []
+        all_series: dict[tuple, list] = {}
+        for field, value in fields.items():
+            labels, _, slot = field.rpartition("|")
+            series = all_series.setdefault(tuple(json.loads(labels)), [0] * len(self.buckets) + [0.0, 0])
+            if slot == "sum":
+                series[-2] = float(value)
+            elif slot == "count":
+                series[-1] = int(value)
+            else:
+                series[int(slot)] = int(value)
+        return self._render(all_series)
+
+
+class MetricsHelper:
+    """
+    In-process metrics, exposed in the Prometheus text format by /metrics.
+
+    Each worker process keeps its own series: scrape every worker (or run a
+    single one per container) to get the totals. The metrics of the Celery
+    tasks are SharedHistograms, totals kept in Redis.
+    """
+
+    _lock = threading.Lock()
+
+    request_duration = Histogram(
+        "http_request_duration_seconds", "Latency of the HTTP requests",
+        ("method", "route", "status"), LATENCY_BUCKETS,
+    )
+    request_db_queries = Histogram(
+        "http_request_db_queries", "Number of SQL statements executed per HTTP request",
+        ("method", "route"), QUERY_COUNT_BUCKETS,
+    )
+    request_db_commits = Histogram(
+        "http_request_db_commits", "Number of transactions committed per HTTP request",
+        ("method", "route"), QUERY_COUNT_BUCKETS,
+    )
+    request_db_duration = Histogram(
+        "http_request_db_duration_seconds", "Total SQL time per HTTP request",
+        ("method", "route"), LATENCY_BUCKETS,
+    )
+    request_outbound_duration = Histogram(
+        "http_request_outbound_duration_seconds", "Total time of the outbound HTTP calls per HTTP request",
+        ("method", "route"), LATENCY_BUCKETS,
+    )
+    outbound_duration = Histogram(
+        "outbound_http_duration_seconds", "Latency of the outbound HTTP calls (payment provider, Moodle, ...)",
+        ("host",), LATENCY_BUCKETS,
+    )
+    password_hash_queue_depth = Histogram(
+        "password_hash_queue_depth", "Password hashing calls already waiting or running when one is submitted",
+        ("operation",), QUERY_COUNT_BUCKETS,
+    )
+    password_hash_duration = Histogram(
+        "password_hash_duration_seconds", "Latency of the password hashing calls, queue wait included",
+        ("operation",), LATENCY_BUCKETS,
+    )
+    push_batch_duration = SharedHistogram(
+        "push_batch_duration_seconds", "Latency of the FCM multicast calls",
+        (), LATENCY_BUCKETS,
+    )
+    push_messages = SharedHistogram(
+        "push_messages", "Push notifications delivered / failed / pruned (unregistered token) per send",
+        ("result",), (0, 1, 10, 100, 500, 1000, 5000, 10000),
+    )
+
+    @staticmethod
+    def observe(histogram: Histogram, value: float, *label_values):
+        with MetricsHelper._lock:
+            histogram.observe(value, *label_values)
+
+    @staticmethod
+    def render() -> str:
+        histograms = (
+            MetricsHelper.request_duration,
+            MetricsHelper.request_db_queries,
+            MetricsHelper.request_db_commits,
+            MetricsHelper.request_db_duration,
+            MetricsHelper.request_outbound_duration,
+            MetricsHelper.outbound_duration,
+            MetricsHelper.password_hash_queue_depth,
+            MetricsHelper.password_hash_duration,
+            MetricsHelper.push_batch_duration,
+            MetricsHelper.push_messages,
+        )
+        with MetricsHelper._lock:
+            lines = [line for histogram in histograms for line in histogram.render()]
+        return "\n".join(lines) + "\n"
+
+    # SQLAlchemy
+
+    @staticmethod
+    def instrument_engine(engine: Engine):
+        """
+        Count the statements, the commits and the DB time of the current
+        request. For an AsyncEngine pass its sync_engine.
+        """
+
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "commit", _commit)
+        event.listen(engine, "handle_error", _handle_error)
+
+    # Outbound HTTP
+
+    @staticmethod
+    def record_outbound(host: str, seconds: float):
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.http_calls += 1
+            stats.http_seconds += seconds
+        MetricsHelper.observe(MetricsHelper.outbound_duration, seconds, host)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_query_start"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def _commit(conn):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_commits += 1
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("metrics_query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+class InstrumentedAsyncTransport(httpx.AsyncHTTPTransport):
+    """httpx transport timing the outbound calls, e.g. httpx.AsyncClient(transport=InstrumentedAsyncTransport())"""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            return await super().handle_async_request(request)
+        finally:
+            MetricsHelper.record_outbound(request.url.host, time.perf_counter() - started)
+
+
+class InstrumentedTransport(httpx.HTTPTransport):
+    """Sync counterpart of InstrumentedAsyncTransport"""
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            return super().handle_request(request)
+        finally:
+            MetricsHelper.record_outbound(request.url.host, time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """
+    Record the latency, the SQL statements / DB time and the outbound HTTP
+    time of each request, labelled by route template ("/api/v1/users/{user_id}"),
+    never by raw path.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in settings.METRICS_EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            route = scope.get("route")
+            # unknown paths (404, scans) share one series
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            MetricsHelper.observe(MetricsHelper.request_duration, elapsed, method, route_path, status_code)
+            MetricsHelper.observe(MetricsHelper.request_db_queries, stats.db_queries, method, route_path)
+            MetricsHelper.observe(MetricsHelper.request_db_commits, stats.db_commits, method, route_path)
+            MetricsHelper.observe(MetricsHelper.request_db_duration, stats.db_seconds, method, route_path)
+            MetricsHelper.observe(MetricsHelper.request_outbound_duration, stats.http_seconds, method, route_path)
+
+
+def sentry_traces_sampler(sampling_context: dict) -> float:
+    """
+    Per-route Sentry sample rate: the longest prefix of SENTRY_ROUTE_SAMPLE_RATES
+    matching the request path wins, SENTRY_TRACES_SAMPLE_RATE otherwise. A
+    trace continued from an upstream service keeps the upstream decision.
+    """
+
+    parent_sampled = sampling_context.get("parent_sampled")
+    if parent_sampled is not None:
+        return float(parent_sampled)
+
+    scope = sampling_context.get("asgi_scope") or {}
+    path = scope.get("path", "")
+    matches = [prefix for prefix in settings.SENTRY_ROUTE_SAMPLE_RATES if path.startswith(prefix)]
+    if matches:
+        return settings.SENTRY_ROUTE_SAMPLE_RATES[max(matches, key=len)]
+    return settings.SENTRY_TRACES_SAMPLE_RATE
@@ -8,14 +8,16 @@ class CustomBaseModel(SQLModel):
     id: int  = Field(default=None, primary_key=True)
     
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=TIMESTAMP(timezone=True))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=TIMESTAMP(timezone=True))
+    # onupdate keeps updated_at meaningful for the ETags of the read endpoints
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=TIMESTAMP(timezone=True), sa_column_kwargs={"onupdate": lambda: datetime.now(timezone.utc)})
     delete_at: Optional[datetime] = Field(default=None, nullable=True, sa_type=TIMESTAMP(timezone=True))
     
     
 class CustomBaseUUIDModel(SQLModel):
     id: str = Field(default_factory=lambda: str(uuid4()), nullable=False, primary_key=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=TIMESTAMP(timezone=True))
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=TIMESTAMP(timezone=True))
+    # onupdate keeps updated_at meaningful for the ETags of the read endpoints
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_type=TIMESTAMP(timezone=True), sa_column_kwargs={"onupdate": lambda: datetime.now(timezone.utc)})
     delete_at: Optional[datetime] = Field(default=None, nullable=True, sa_type=TIMESTAMP(timezone=True))
     
 
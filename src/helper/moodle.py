@@ -1,6 +1,10 @@
-import httpx
+import logging
 from typing import Any, Dict, List, Optional
 from src.config import settings
+from src.helper.async_task import get_http_client
+
+
+logger = logging.getLogger(__name__)
 
 
 class MoodleAPIError(Exception):
@@ -17,11 +21,13 @@ class MoodleService:
     - MOODLE_STUDENT_ROLE_ID: int (typically 5)
     """
 
+    @staticmethod
+    def is_configured() -> bool:
+        return bool(getattr(settings, "MOODLE_API_URL", "") and getattr(settings, "MOODLE_API_TOKEN", None))
+
     def __init__(self, base_url: Optional[str] = None, token: Optional[str] = None) -> None:
         self.base_url = (base_url or getattr(settings, "MOODLE_API_URL", "")).rstrip("/")
         self.token = token or getattr(settings, "MOODLE_API_TOKEN", None)
-        
-        print(self.base_url, self.token)
         if not self.base_url or not self.token:
             raise ValueError("MoodleService requires MOODLE_BASE_URL and MOODLE_TOKEN in settings")
 
@@ -32,16 +38,14 @@ class MoodleService:
             "wsfunction": wsfunction,
             "moodlewsrestformat": "json",
         }
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.post(url, params=query, data=params)
-            resp.raise_for_status()
-            data = resp.json()
-            
-            print(data)
-            # Moodle errors often come as {exception, errorcode, message}
-            if isinstance(data, dict) and data.get("exception"):
-                raise MoodleAPIError(f"{data.get('errorcode')}: {data.get('message')}")
-            return data
+        resp = await get_http_client().post(url, params=query, data=params, timeout=30)
+        resp.raise_for_status()
+        data = resp.json()
+        logger.debug("Moodle %s response", wsfunction, extra={"response": data})
+        # Moodle errors often come as {exception, errorcode, message}
+        if isinstance(data, dict) and data.get("exception"):
+            raise MoodleAPIError(f"{data.get('errorcode')}: {data.get('message')}")
+        return data
 
     # Courses
     async def get_course_by_shortname(self, shortname: str) -> Optional[Dict[str, Any]]:
@@ -123,49 +127,72 @@ class MoodleService:
         return True
 
 
-# Celery tasks wrappers (optional)
+# Celery tasks wrappers (optional), run on the worker event loop
 try:
     from celery import shared_task
+    from src.helper.async_task import AsyncTask
 except Exception:
     shared_task = None
 
 if shared_task:
-    @shared_task
-    def moodle_create_course_task(fullname: str, shortname: str) -> int:
-        import asyncio
-        async def _run():
-            service = MoodleService()
-            return await service.create_course(fullname=fullname, shortname=shortname)
-        return asyncio.run(_run())
-
-    @shared_task
-    def moodle_ensure_user_task(email: str, firstname: str, lastname: str, password: str | None = None) -> int:
-        import asyncio
-        async def _run():
-            service = MoodleService()
-            return await service.ensure_user(email=email, firstname=firstname, lastname=lastname, password=password)
-        return asyncio.run(_run())
-
-    @shared_task
-    def moodle_enrol_user_task(user_id: int, course_id: int, role_id: int | None = None) -> bool:
-        import asyncio
-        async def _run():
-            service = MoodleService()
-            return await service.enrol_user_manual(user_id=user_id, course_id=course_id, role_id=role_id)
-        return asyncio.run(_run())
-
-    @shared_task
-    def moodle_enrol_user_by_email_task(email: str, course_id: int, role_id: int | None = None) -> bool:
-        import asyncio
-        async def _run():
-            service = MoodleService()
-            user = await service.get_user_by_email(email)
-            if user is None:
-                # If user not found, we cannot enrol by email without creating; ensure creates user
-                uid = await service.ensure_user(email=email, firstname="", lastname="")
-            else:
-                uid = int(user["id"])
-            return await service.enrol_user_manual(user_id=uid, course_id=course_id, role_id=role_id)
-        return asyncio.run(_run())
-
-
+    @shared_task(base=AsyncTask)
+    async def moodle_create_course_task(fullname: str, shortname: str) -> int:
+        service = MoodleService()
+        return await service.create_course(fullname=fullname, shortname=shortname)
+
+    @shared_task(base=AsyncTask)
+    async def moodle_ensure_user_task(email: str, firstname: str, lastname: str, password: str | None = None) -> int:
+        service = MoodleService()
+        return await service.ensure_user(email=email, firstname=firstname, lastname=lastname, password=password)
+
+    @shared_task(base=AsyncTask)
+    async def moodle_enrol_user_task(user_id: int, course_id: int, role_id: int | None = None) -> bool:
+        service = MoodleService()
+        return await service.enrol_user_manual(user_id=user_id, course_id=course_id, role_id=role_id)
+
+    @shared_task(base=AsyncTask)
+    async def moodle_enrol_participants_task(course_id: int, user_ids: List[str]) -> dict:
+        """
+        Enrol session participants on the Moodle course, creating (and
+        recording) their Moodle account when missing. Best-effort: a failing
+        user is logged and the others are still enrolled.
+        """
+
+        from sqlalchemy import select, update
+
+        from src.api.user.models import User
+        from src.database import async_session
+
+        service = MoodleService()
+        enrolled, failed = 0, 0
+        async with async_session() as session:
+            # plain rows: nothing to reload after a rollback
+            users = (await session.execute(
+                select(User.id, User.email, User.first_name, User.last_name, User.moodle_user_id).where(User.id.in_(user_ids))
+            )).all()
+            for user_id, email, first_name, last_name, moodle_user_id in users:
+                if not email:
+                    continue
+                try:
+                    if not moodle_user_id:
+                        moodle_user_id = await service.ensure_user(email=email, firstname=first_name, lastname=last_name)
+                        await session.execute(update(User).where(User.id == user_id).values(moodle_user_id=moodle_user_id))
+                        await session.commit()
+                    await service.enrol_user_manual(user_id=moodle_user_id, course_id=course_id)
+                    enrolled += 1
+                except Exception:
+                    await session.rollback()
+                    failed += 1
+                    logger.exception("Moodle enrolment failed", extra={"user_id": user_id, "course_id": course_id})
+        return {"enrolled": enrolled, "failed": failed}
+
+    @shared_task(base=AsyncTask)
+    async def moodle_enrol_user_by_email_task(email: str, course_id: int, role_id: int | None = None) -> bool:
+        service = MoodleService()
+        user = await service.get_user_by_email(email)
+        if user is None:
+            # If user not found, we cannot enrol by email without creating; ensure creates user
+            uid = await service.ensure_user(email=email, firstname="", lastname="")
+        else:
+            uid = int(user["id"])
+        return await service.enrol_user_manual(user_id=uid, course_id=course_id, role_id=role_id)
@@ -24,6 +24,14 @@ class NotificationBase(BaseModel):
         else : 
             NotificationHelper.send_mailgun_email.delay( data)
         return True
+
+    @staticmethod
+    def send_notifications(notifications: list["NotificationBase"]):
+        """Send several emails with one task (one SMTP connection / HTTP client)"""
+
+        if notifications:
+            NotificationHelper.send_email_batch.delay([notification.email_data() for notification in notifications])
+        return True
             
 
 
@@ -260,6 +268,30 @@ class JobApplicationCredentialsNotification(NotificationBase):
             }
         }
 
+class ApplicationStatusNotification(NotificationBase):
+    subject: str = "Application Status Update"
+    email_template: str = "application_status.html"
+    application_number: str = ""
+    candidate_name: str = ""
+    title: str = ""
+    status: str = ""
+    reason: str = ""
+
+    def email_data(self) -> dict:
+        return {
+            "to_email": self.email,
+            "subject": self.subject,
+            "template_name": self.email_template,
+            "lang": self.lang,
+            "context": {
+                "application_number": self.application_number,
+                "candidate_name": self.candidate_name,
+                "title": self.title,
+                "status": self.status,
+                "reason": self.reason
+            }
+        }
+
 class NotificationService:
     def __init__(self):
         pass
@@ -0,0 +1,170 @@
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Optional
+
+from celery import shared_task
+from sqlmodel import select
+
+from src.config import settings
+from src.database import get_session
+from src.helper.password_helper import token_digest
+from src.redis_client import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+
+class OtpPurpose(str, Enum):
+    TWO_FACTOR = "two_factor"
+    FORGOTTEN_PASSWORD = "forgotten_password"
+    CHANGE_EMAIL = "change_email"
+    JOB_APPLICATION = "job_application"
+
+
+class OtpStatus(str, Enum):
+    VALID = "valid"
+    INVALID = "invalid"  # wrong code, attempts left
+    EXPIRED = "expired"  # no code: expired, already used or never sent
+    LOCKED = "locked"  # too many wrong codes, the code is dropped
+
+
+# KEYS: code, rate counter  ARGV: digest, data, rate limit, rate window, ttl
+_ISSUE = """
+local sent = redis.call('INCR', KEYS[2])
+if sent == 1 then redis.call('EXPIRE', KEYS[2], ARGV[4]) end
+if sent > tonumber(ARGV[3]) then return 0 end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'code', ARGV[1], 'data', ARGV[2], 'attempts', 0)
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return 1
+"""
+
+# KEYS: code  ARGV: digest, max attempts
+_CONSUME = """
+local code = redis.call('HGET', KEYS[1], 'code')
+if not code then return {'expired'} end
+if code == ARGV[1] then
+    local data = redis.call('HGET', KEYS[1], 'data')
+    redis.call('DEL', KEYS[1])
+    return {'valid', data}
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return {'locked'}
+end
+return {'invalid'}
+"""
+
+_scripts: dict = {}
+
+
+def _script(source: str):
+    # registered once per client: EVALSHA, with a fallback to EVAL after a Redis restart
+    if source not in _scripts:
+        _scripts[source] = get_redis().register_script(source)
+    return _scripts[source]
+
+
+def _key(purpose: OtpPurpose, subject: str) -> str:
+    return f"{settings.REDIS_NAMESPACE}:otp:{purpose.value}:{subject.lower()}"
+
+
+class OtpStore:
+    """
+    One-time codes (2FA, password reset, email change, job application
+    update) kept in Redis instead of Postgres: they expire with the key TTL,
+    are checked and consumed atomically by a Lua script, are dropped after
+    OTP_MAX_ATTEMPTS wrong codes, and each email gets at most OTP_RATE_LIMIT
+    codes per purpose and window. Only the HMAC of a code is stored.
+
+    The subject identifies the code holder: the email, prefixed by what the
+    code is bound to (the user of an email change, the application).
+
+        if not await OtpStore.issue(OtpPurpose.TWO_FACTOR, email, code, {"user_id": user.id}):
+            ...  # rate limited
+        status, data = await OtpStore.consume(OtpPurpose.TWO_FACTOR, email, code)
+    """
+
+    @staticmethod
+    async def issue(purpose: OtpPurpose, subject: str, code: str, data: Optional[dict] = None, email: Optional[str] = None) -> bool:
+        """
+        Store `code` (replacing the previous one of the subject) with `data`.
+
+        Returns:
+            bool: False when the rate limit of the email is reached, nothing is stored then.
+        """
+
+        email = (email or subject).lower()
+        ttl = settings.OTP_CODE_EXPIRE_MINUTES * 60
+        digest = token_digest(code)
+        stored = await _script(_ISSUE)(
+            keys=[_key(purpose, subject), f"{settings.REDIS_NAMESPACE}:otp_rate:{purpose.value}:{email}"],
+            args=[digest, json.dumps(data or {}), settings.OTP_RATE_LIMIT, settings.OTP_RATE_WINDOW_SECONDS, ttl],
+        )
+        if not stored:
+            logger.warning("OTP rate limit reached", extra={"purpose": purpose.value})
+            return False
+
+        if settings.OTP_AUDIT_LOG:
+            otp_audit_task.delay(purpose.value, email, digest, data or {}, "issued")
+        return True
+
+    @staticmethod
+    async def consume(purpose: OtpPurpose, subject: str, code: str) -> tuple[OtpStatus, Optional[dict]]:
+        """
+        Check `code` and consume it when it matches.
+
+        Returns:
+            tuple: The status and, when valid, the data stored with the code.
+        """
+
+        digest = token_digest(code)
+        result = await _script(_CONSUME)(keys=[_key(purpose, subject)], args=[digest, settings.OTP_MAX_ATTEMPTS])
+        status = OtpStatus(result[0])
+        if status != OtpStatus.VALID:
+            return status, None
+
+        data = json.loads(result[1] or "{}")
+        if settings.OTP_AUDIT_LOG:
+            otp_audit_task.delay(purpose.value, (data.get("email") or subject).lower(), digest, data, "consumed")
+        return status, data
+
+
+@shared_task
+def otp_audit_task(purpose: str, email: str, digest: str, data: dict, event: str):
+    """
+    Record an issued / consumed code in its Postgres table (OTP_AUDIT_LOG),
+    out of the request: the OTP flows themselves never touch the database.
+    The table keeps the HMAC of the code, never the code.
+    """
+
+    from src.api.auth.models import ChangeEmailCode, ForgottenPAsswordCode, TwoFactorCode
+    from src.api.job_offers.models import JobApplicationCode
+
+    model = {
+        OtpPurpose.TWO_FACTOR.value: TwoFactorCode,
+        OtpPurpose.FORGOTTEN_PASSWORD.value: ForgottenPAsswordCode,
+        OtpPurpose.CHANGE_EMAIL.value: ChangeEmailCode,
+        OtpPurpose.JOB_APPLICATION.value: JobApplicationCode,
+    }[purpose]
+
+    with get_session() as session:
+        if event == "issued":
+            row = model(
+                email=email,
+                code=digest,
+                end_time=datetime.now(timezone.utc) + timedelta(minutes=settings.OTP_CODE_EXPIRE_MINUTES),
+            )
+            if model is JobApplicationCode:
+                row.application_id = data["application_id"]
+            else:
+                row.user_id = data.get("user_id")
+            session.add(row)
+        else:
+            for row in session.scalars(select(model).where(model.email == email, model.code == digest, model.active.is_(True))):
+                row.active = False
+                session.add(row)
+        session.commit()
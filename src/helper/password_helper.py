@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from src.config import settings
+from src.helper.metrics import MetricsHelper
+
+
+# min_rounds: the hashes made with a lower cost are upgraded at the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+)
+
+_password_pool: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+def get_password_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Return the process pool used to hash / verify passwords, creating it on
+    first use, or None when the current process can not have children
+    (daemonic Celery prefork child): the task then hashes inline.
+
+    bcrypt is CPU bound by design (100-300 ms a call), so it is kept out of
+    the event loop and out of the default thread pool: a burst of logins
+    waits for a worker instead of stalling every other request.
+    """
+
+    global _password_pool
+    if multiprocessing.current_process().daemon:
+        return None
+    if _password_pool is None:
+        _password_pool = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _password_pool
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password_and_update(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Return whether the password matches and its new hash when its cost is outdated"""
+
+    if not hashed_password:
+        return False, None
+    try:
+        return pwd_context.verify_and_update(password, hashed_password)
+    except ValueError:
+        # not a bcrypt hash
+        return False, None
+
+
+def token_digest(token: str) -> str:
+    """
+    Keyed HMAC-SHA256 of a high-entropy token (refresh tokens): a slow hash
+    adds nothing against guessing 112 random bytes, and this one costs a
+    microsecond instead of a bcrypt round.
+    """
+
+    key = (settings.REFRESH_TOKEN_SECRET or settings.SECRET_KEY).encode()
+    return hmac.new(key, token.encode(), hashlib.sha256).hexdigest()
+
+
+class PasswordHelper:
+    """
+    Async wrappers running bcrypt in the password process pool.
+
+        hashed = await PasswordHelper.hash(password)
+        valid, new_hash = await PasswordHelper.verify_and_update(password, user.password)
+    """
+
+    @staticmethod
+    async def _run(operation: str, function, *args):
+        global _pending, _password_pool
+
+        loop = asyncio.get_running_loop()
+        MetricsHelper.observe(MetricsHelper.password_hash_queue_depth, _pending, operation)
+        _pending += 1
+        started = time.perf_counter()
+        try:
+            pool = get_password_pool()
+            if pool is None:
+                # worker task: the process runs one task at a time, nothing to keep responsive
+                return function(*args)
+            return await loop.run_in_executor(pool, function, *args)
+        except BrokenProcessPool:
+            # a worker died, start a fresh pool next time
+            _password_pool = None
+            raise
+        finally:
+            _pending -= 1
+            MetricsHelper.observe(MetricsHelper.password_hash_duration, time.perf_counter() - started, operation)
+
+    @staticmethod
+    async def hash(password: str) -> str:
+        return await PasswordHelper._run("hash", hash_password, password)
+
+    @staticmethod
+    async def verify(password: str, hashed_password: str) -> bool:
+        valid, _ = await PasswordHelper.verify_and_update(password, hashed_password)
+        return valid
+
+    @staticmethod
+    async def verify_and_update(password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        return await PasswordHelper._run("verify", verify_password_and_update, password, hashed_password)
+
+    @staticmethod
+    async def verify_token(token: str, stored: str) -> bool:
+        """
+        Check a refresh token against its stored digest. The tokens stored
+        before the HMAC digests are bcrypt hashes, verified in the pool until
+        they expire.
+        """
+
+        if stored.startswith("$2"):
+            return await PasswordHelper.verify(token, stored)
+        return hmac.compare_digest(token_digest(token), stored)
@@ -0,0 +1,228 @@
+import logging
+import io
+import os
+from enum import Enum
+from typing import Optional
+
+import billiard
+from celery import shared_task
+from sqlalchemy import select
+
+from src.config import settings
+from src.database import get_session
+from src.helper.file_helper import FileHelper
+
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentProcessingStatusEnum(str, Enum):
+    PENDING = "PENDING"
+    VALID = "VALID"
+    INVALID = "INVALID"
+    FAILED = "FAILED"
+
+
+def analyse_pdf(data: bytes, max_text_chars: int) -> dict:
+    """
+    Validate a PDF, extract its page count and text and build a compacted copy.
+
+    Runs inside a child process (see PdfHelper.analyse), so it only takes
+    and returns plain data.
+
+    Returns:
+        dict: {"valid", "page_count", "text", "optimized", "error"} where
+        `optimized` holds the re-written bytes only when they are smaller.
+    """
+
+    from PyPDF2 import PdfFileReader, PdfFileWriter
+
+    result = {"valid": False, "page_count": None, "text": None, "optimized": None, "error": None}
+
+    # the header may be preceded by garbage, but must be in the first kilobyte
+    if b"%PDF-" not in data[:1024]:
+        result["error"] = "Missing PDF header"
+        return result
+
+    try:
+        reader = PdfFileReader(io.BytesIO(data), strict=False)
+        if reader.isEncrypted and not reader.decrypt(""):
+            result["error"] = "Encrypted PDF"
+            return result
+
+        result["page_count"] = reader.getNumPages()
+        result["valid"] = True
+
+        texts = []
+        length = 0
+        writer = PdfFileWriter()
+        for page in reader.pages:
+            if length < max_text_chars:
+                try:
+                    text = page.extractText() or ""
+                except Exception:
+                    text = ""
+                texts.append(text)
+                length += len(text)
+            page.compressContentStreams()
+            writer.addPage(page)
+
+        # postgres text columns do not accept NUL characters
+        result["text"] = "\n".join(texts)[:max_text_chars].replace("\x00", "")
+
+        output = io.BytesIO()
+        writer.write(output)
+        optimized = output.getvalue()
+        if len(optimized) < len(data):
+            result["optimized"] = optimized
+
+    except Exception as e:
+        result["error"] = str(e)[:255]
+
+    return result
+
+
+def _analyse_pdf_child(connection, data: bytes, max_text_chars: int):
+    try:
+        connection.send(analyse_pdf(data, max_text_chars))
+    finally:
+        connection.close()
+
+
+class PdfHelper:
+
+    @staticmethod
+    def is_pdf(file_path: Optional[str]) -> bool:
+        return bool(file_path) and file_path.lower().split("?")[0].endswith(".pdf")
+
+    @staticmethod
+    def read_file(file_path: str) -> Optional[bytes]:
+        """
+        Read a stored attachment from the local storage or from S3.
+        """
+
+        file = FileHelper.open_file(file_path)
+        if file is None:
+            return None
+        try:
+            return file.read()
+        finally:
+            file.close()
+
+    @staticmethod
+    def write_optimized_file(file_path: str, content: bytes) -> str:
+        """
+        Store the compacted copy next to the original file, using the same
+        path format (local path, S3 key or public url) as the original.
+        """
+
+        stem, _ = os.path.splitext(file_path)
+        optimized_path = f"{stem}_optimized.pdf"
+
+        if file_path.startswith(("static/", "uploads/")):
+            with open(os.path.join("src", optimized_path), "wb") as f:
+                f.write(content)
+            return optimized_path
+
+        FileHelper.get_s3_client().put_object(
+            Bucket=settings.AWS_BUCKET_NAME,
+            Key=FileHelper.get_s3_key(optimized_path),
+            Body=content,
+            ContentType="application/pdf",
+        )
+        return optimized_path
+
+    @staticmethod
+    def analyse(data: bytes) -> dict:
+        """
+        Run analyse_pdf in a child process, killed after PDF_PROCESS_TIMEOUT
+        seconds: a malformed PDF looping in PyPDF2 can not hold the worker.
+        billiard processes may be started from the daemonic prefork children.
+
+        Raises:
+            TimeoutError: The document took longer than PDF_PROCESS_TIMEOUT.
+            RuntimeError: The child process died without a result.
+        """
+
+        receiver, sender = billiard.Pipe(duplex=False)
+        process = billiard.Process(target=_analyse_pdf_child, args=(sender, data, settings.PDF_TEXT_MAX_CHARS), daemon=True)
+        process.start()
+        sender.close()
+        try:
+            # the result is read before join: a large optimized copy would fill the pipe
+            if not receiver.poll(settings.PDF_PROCESS_TIMEOUT):
+                raise TimeoutError(f"PDF processing took more than {settings.PDF_PROCESS_TIMEOUT} seconds")
+            try:
+                return receiver.recv()
+            except EOFError:
+                raise RuntimeError(f"PDF processing stopped (exit code {process.exitcode})")
+        finally:
+            receiver.close()
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+    @staticmethod
+    def process_attachment(attachment) -> dict:
+        """
+        Validate and compact the PDF of an attachment row and record the results
+        on it (processing_status, page_count, extracted_text, optimized copy).
+        """
+
+        data = PdfHelper.read_file(attachment.file_path)
+        if data is None:
+            attachment.processing_status = DocumentProcessingStatusEnum.FAILED
+            return {"status": attachment.processing_status, "error": "File not found"}
+
+        attachment.file_size = len(data)
+        result = PdfHelper.analyse(data)
+
+        if not result["valid"]:
+            attachment.processing_status = DocumentProcessingStatusEnum.INVALID
+            return {"status": attachment.processing_status, "error": result["error"]}
+
+        attachment.page_count = result["page_count"]
+        attachment.extracted_text = result["text"]
+        if result["optimized"] is not None:
+            attachment.optimized_file_path = PdfHelper.write_optimized_file(attachment.file_path, result["optimized"])
+            attachment.optimized_file_size = len(result["optimized"])
+        attachment.processing_status = DocumentProcessingStatusEnum.VALID
+
+        return {
+            "status": attachment.processing_status,
+            "page_count": attachment.page_count,
+            "file_size": attachment.file_size,
+            "optimized_file_size": attachment.optimized_file_size,
+        }
+
+
+@shared_task
+def process_attachment_pdf_task(attachment_type: str, attachment_id: int) -> dict:
+    """
+    Celery task validating and compacting an uploaded PDF attachment.
+
+    Args:
+        attachment_type (str): "student" or "job".
+        attachment_id (int): The attachment id.
+    """
+
+    from src.api.job_offers.models import JobAttachment
+    from src.api.training.models import StudentAttachment
+
+    model = {"student": StudentAttachment, "job": JobAttachment}[attachment_type]
+
+    with get_session() as session:
+        attachment = session.scalars(select(model).where(model.id == attachment_id)).first()
+        if attachment is None or not PdfHelper.is_pdf(attachment.file_path):
+            return {"status": None}
+
+        try:
+            report = PdfHelper.process_attachment(attachment)
+        except Exception as e:
+            logger.warning("Error when processing attachment %s:%s: %s", attachment_type, attachment_id, e)
+            attachment.processing_status = DocumentProcessingStatusEnum.FAILED
+            report = {"status": attachment.processing_status, "error": str(e)}
+
+        session.add(attachment)
+        session.commit()
+        return report
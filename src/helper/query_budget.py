@@ -0,0 +1,158 @@
+import contextvars
+import functools
+import logging
+import threading
+import traceback
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# frames of these files are noise in the reported stacks
+_IGNORED_FRAMES = ("src/helper/query_budget.py", "src/helper/metrics.py")
+STACK_DEPTH = 8
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in "raise" mode (tests) when a block runs more statements than its budget"""
+
+
+def budget_mode() -> str:
+    """QUERY_BUDGET_MODE, or "warn" in development and "off" elsewhere when it is not set"""
+
+    if settings.QUERY_BUDGET_MODE is not None:
+        return settings.QUERY_BUDGET_MODE
+    return "warn" if settings.ENV == "development" else "off"
+
+
+class _Tracker:
+
+    def __init__(self):
+        self.statements: list[tuple[str, list]] = []
+
+    def record(self, statement: str, stack: list):
+        self.statements.append((statement, stack))
+
+
+_active: contextvars.ContextVar[tuple] = contextvars.ContextVar("query_budget_trackers", default=())
+# trackers counting the statements of every thread (tests: TestClient runs the app in another thread)
+_global_trackers: list = []
+_global_lock = threading.Lock()
+
+
+def _application_stack() -> list:
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if "/src/" in frame.filename and not frame.filename.endswith(_IGNORED_FRAMES)
+    ]
+    return frames[-STACK_DEPTH:]
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    trackers = _active.get()
+    if _global_trackers:
+        with _global_lock:
+            trackers = trackers + tuple(_global_trackers)
+    if not trackers:
+        return
+    stack = _application_stack()
+    for tracker in trackers:
+        tracker.record(statement, stack)
+
+
+class query_budget:
+    """
+    Maximum number of SQL statements a block of code (or an endpoint) may
+    run, to catch N+1 patterns (one lazy load / follow-up query per row).
+
+    As a context manager:
+
+        with query_budget(2, name="student applications page"):
+            await service.get_student_application(filters)
+
+    As a decorator, innermost (after the route and caching decorators):
+
+        @router.get("/student-applications", ...)
+        @conditional_response(PRIVATE)
+        @query_budget(2)
+        async def list_student_applications_admin(...):
+
+    Only the statements of the endpoint body are counted, the dependencies
+    (authentication, ...) are not. What happens on overflow depends on
+    QUERY_BUDGET_MODE: "warn" logs a warning with the statements and the
+    application stack of each of them, "raise" raises QueryBudgetExceeded
+    (tests), "off" disables the counting (decorated endpoints are called
+    directly).
+
+    Args:
+        max_queries (int): The budget.
+        name (str, optional): Label of the reports, the endpoint name by default.
+        mode (str, optional): Overrides QUERY_BUDGET_MODE.
+        all_threads (bool): Count the statements of every thread instead of
+            the current context only (used by the test fixture).
+    """
+
+    def __init__(self, max_queries: int, name: Optional[str] = None, mode: Optional[str] = None, all_threads: bool = False):
+        self.max_queries = max_queries
+        self.name = name
+        self.mode = mode
+        self.all_threads = all_threads
+        self._tracker: Optional[_Tracker] = None
+        self._token = None
+
+    @property
+    def statements(self) -> list[str]:
+        return [statement for statement, _ in self._tracker.statements] if self._tracker else []
+
+    def __enter__(self):
+        self._tracker = _Tracker()
+        if self.all_threads:
+            with _global_lock:
+                _global_trackers.append(self._tracker)
+        else:
+            self._token = _active.set(_active.get() + (self._tracker,))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.all_threads:
+            with _global_lock:
+                _global_trackers.remove(self._tracker)
+        else:
+            _active.reset(self._token)
+        if exc_type is None:
+            self.check(self.mode or budget_mode())
+        return False
+
+    def check(self, mode: str):
+        count = len(self._tracker.statements)
+        if count <= self.max_queries or mode == "off":
+            return
+        message = f"Query budget exceeded for {self.name or 'block'}: {count} statements, budget {self.max_queries}"
+        if mode == "raise":
+            raise QueryBudgetExceeded(message + "\n" + self.report())
+        logger.warning("%s\n%s", message, self.report())
+
+    def report(self) -> str:
+        lines = []
+        for index, (statement, stack) in enumerate(self._tracker.statements, start=1):
+            lines.append(f"[{index}] {' '.join(statement.split())[:300]}")
+            lines.extend("    " + line.rstrip() for line in traceback.format_list(stack))
+        return "\n".join(lines)
+
+    def __call__(self, func):
+        name = self.name or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if (self.mode or budget_mode()) == "off":
+                return await func(*args, **kwargs)
+            with query_budget(self.max_queries, name=name, mode=self.mode):
+                return await func(*args, **kwargs)
+
+        return wrapper
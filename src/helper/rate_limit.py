@@ -0,0 +1,173 @@
+import hashlib
+import logging
+import math
+import re
+import time
+from typing import Optional
+
+import jwt
+from fastapi import HTTPException, Request, status
+from redis.exceptions import RedisError
+
+from src.config import settings
+from src.helper.schemas import BaseOutFail, ErrorMessage
+from src.redis_client import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RULE = re.compile(r"^(ip|email|user):(\d+)/(second|minute|hour|day)$")
+
+# Token bucket refilled continuously: `capacity` requests per `period`.
+# KEYS: bucket  ARGV: capacity, period (seconds)
+# Returns {allowed, milliseconds before the next token}
+_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = capacity / tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[2])) + 1)
+return {allowed, wait}
+"""
+
+_script = None
+# key -> monotonic time until which it is known to be throttled
+_blocked: dict[str, float] = {}
+_BLOCKED_MAX_ENTRIES = 10000
+
+
+def parse_rule(rule: str) -> tuple[str, int, int]:
+    """"email:5/hour" -> ("email", 5, 3600)"""
+
+    match = _RULE.match(rule.strip())
+    if match is None:
+        raise ValueError(f"Invalid rate limit rule: {rule!r}")
+    key_type, capacity, period = match.groups()
+    return key_type, int(capacity), _PERIODS[period]
+
+
+class RateLimiter:
+    """
+    Token buckets in Redis, shared by every worker, checked by one atomic
+    Lua script per rule. A key throttled once is remembered in the process
+    until its next token: the following requests of an abusive client are
+    refused without a Redis round trip.
+
+    Redis errors let the request through (logged): the limiter must not take
+    the login down with it.
+    """
+
+    @staticmethod
+    async def hit(bucket: str, capacity: int, period: int) -> float:
+        """
+        Take a token from `bucket`.
+
+        Returns:
+            float: 0 when allowed, otherwise the seconds before the next token.
+        """
+
+        now = time.monotonic()
+        blocked_until = _blocked.get(bucket)
+        if blocked_until is not None:
+            if blocked_until > now:
+                return blocked_until - now
+            del _blocked[bucket]
+
+        global _script
+        if _script is None:
+            _script = get_redis().register_script(_TOKEN_BUCKET)
+        try:
+            allowed, wait = await _script(keys=[bucket], args=[capacity, period])
+        except (RedisError, OSError) as e:
+            logger.warning("Rate limiter unavailable, request allowed: %s", e)
+            return 0
+        if allowed:
+            return 0
+
+        if len(_blocked) >= _BLOCKED_MAX_ENTRIES:
+            _blocked.clear()
+        _blocked[bucket] = now + wait / 1000
+        return wait / 1000
+
+    @staticmethod
+    def reset_local():
+        _blocked.clear()
+
+
+async def _key_value(request: Request, key_type: str) -> Optional[str]:
+    if key_type == "ip":
+        return request.client.host if request.client else None
+
+    if key_type == "email":
+        # the body is already parsed by FastAPI, request.json() returns its cache
+        if "json" not in request.headers.get("content-type", ""):
+            return None
+        try:
+            body = await request.json()
+        except ValueError:
+            return None
+        email = body.get("email") if isinstance(body, dict) else None
+        if not isinstance(email, str) or not email:
+            return None
+        # no personal data in the Redis keys
+        return hashlib.blake2b(email.strip().lower().encode(), digest_size=12).hexdigest()
+
+    if key_type == "user":
+        authorization = request.headers.get("authorization", "")
+        if not authorization.lower().startswith("bearer "):
+            return None
+        try:
+            payload = jwt.decode(authorization[7:], settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except jwt.InvalidTokenError:
+            return None
+        return payload.get("sub")
+
+    return None
+
+
+def rate_limit(name: str):
+    """
+    Dependency applying the rules of settings.RATE_LIMITS[name], e.g.
+    ["ip:30/minute", "email:10/minute"]: every rule must have a token left,
+    otherwise 429 with a Retry-After header.
+
+        @router.post("/token", dependencies=[Depends(rate_limit("auth_token"))])
+    """
+
+    rules = [parse_rule(rule) for rule in settings.RATE_LIMITS.get(name, [])]
+
+    async def check_rate_limit(request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        for key_type, capacity, period in rules:
+            value = await _key_value(request, key_type)
+            if value is None:
+                continue
+            bucket = f"{settings.REDIS_NAMESPACE}:rate:{name}:{key_type}:{value}"
+            wait = await RateLimiter.hit(bucket, capacity, period)
+            if wait:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=BaseOutFail(
+                        message=ErrorMessage.TOO_MANY_REQUESTS.description,
+                        error_code=ErrorMessage.TOO_MANY_REQUESTS.value,
+                    ).model_dump(),
+                    headers={"Retry-After": str(math.ceil(wait))},
+                )
+
+    return check_rate_limit
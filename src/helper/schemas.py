@@ -13,9 +13,12 @@ class BaseOutPage(BaseModel):
     -    number :int (the number of record in the data)
     -    total_number : int (the total number of record found for the query)  
     -    number_page : int (the total number of page for the query)
-        
+
+    `data` can hold ORM objects or Rows: validate with
+    from_attributes=True (as helper.json_response.dump_response does)
+    to read their attributes, nested models included.
     """
-    
+
     data : Any
     page : int
     number :int
@@ -46,6 +49,20 @@ class BaseOutSuccess(BaseOut):
     message : str  
     data : Any  
 
+class BulkStatusChangeOut(BaseModel):
+    updated : list[int]
+    skipped : list[int]
+
+class BulkStatusChangeOutSuccess(BaseOutSuccess):
+    data : BulkStatusChangeOut
+
+class BulkWriteOut(BaseModel):
+    count : int
+    skipped : list[str] = []
+
+class BulkWriteOutSuccess(BaseOutSuccess):
+    data : BulkWriteOut
+
 class BaseOutFail(BaseOut):
     
     """
@@ -117,6 +134,9 @@ class ErrorMessage(Enum):
     CODE_NOT_EXIST = ("code_not_exist","Code does not exist")
     CODE_ALREADY_USED= ("code_already_used","Code already used")
     CODE_HAS_EXPIRED = ("code_has_expired","Code has expired")
+    TOO_MANY_ATTEMPTS = ("too_many_attempts","Too many wrong codes, request a new one")
+    TOO_MANY_CODE_REQUESTS = ("too_many_code_requests","Too many codes requested, try later")
+    TOO_MANY_REQUESTS = ("too_many_requests","Too many requests, try later")
 
     USER_NOT_ACTIVE = ('user_not_active',"User is not active")
     COULD_NOT_VALIDATE_CREDENTIALS = ('could_not_validate_credentials',"Could not validate credentials")
@@ -128,6 +148,7 @@ class ErrorMessage(Enum):
     
     REFRESH_TOKEN_NOT_FOUND = ('refresh_token_not_found',"Refresh token not found")
     REFRESH_TOKEN_HAS_EXPIRED = ('refresh_token_has_expired',"Refresh token has expired")
+    REFRESH_TOKEN_REVOKED = ('refresh_token_revoked',"Refresh token revoked, log in again")
 
     SOME_THING_WENT_WRONG = ('something_went_wrong',"Something went wrong try later")
     TOUPESU_USER_NOT_FOUND = ('toupesu_user_not_found',"Toupesu user not found")
@@ -203,5 +224,15 @@ class ErrorMessage(Enum):
     NO_ROLE_FOUND = ('no_role_found',"No role found")
     
     ROLE_NOT_FOUND = ('role_not_found',"Role not found")
+    
+    INVALID_IMAGE_SOURCE = ('invalid_image_source',"Invalid image source")
+    IMAGE_FORMAT_NOT_SUPPORTED = ('image_format_not_supported',"Image format not supported")
+    IMAGE_NOT_FOUND = ('image_not_found',"Image not found")
+    EXPORT_NOT_FOUND = ('export_not_found',"Export not found")
+    EXPORT_NOT_READY = ('export_not_ready',"Export is not ready yet")
+    EXPORT_FILTER_REQUIRED = ('export_filter_required',"Select the applications to export")
+    EXPORT_TOO_LARGE = ('export_too_large',"Too many applications to export at once, narrow the selection")
+    NOTIFICATION_TYPE_NOT_FOUND = ('notification_type_not_found',"Notification type not found")
+    INVALID_CURSOR = ('invalid_cursor',"Invalid pagination cursor")
     def __str__(self):
         return self.value
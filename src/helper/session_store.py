@@ -0,0 +1,108 @@
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from celery import shared_task
+from redis.exceptions import RedisError
+from sqlmodel import delete, select
+
+from src.config import settings
+from src.database import get_session
+from src.redis_client import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+
+def _key(user_id: str) -> str:
+    return f"{settings.REDIS_NAMESPACE}:sessions:{user_id}"
+
+
+class SessionStore:
+    """
+    Active sessions (refresh token families) of each user, cached in a Redis
+    set next to the refresh_token table: a refresh of a session logged out
+    everywhere is refused without reading the table. The table stays the
+    reference: the set is rebuilt from it at each login, its TTL follows the
+    newest token of the user, and a missing set or a Redis error means
+    "unknown", never "revoked".
+    """
+
+    @staticmethod
+    async def replace(user_id: str, family_ids: Iterable[str]):
+        """Set the active sessions of the user (read from the table)"""
+
+        try:
+            # an empty set would be indistinguishable from a missing one:
+            # a placeholder member keeps "no active session" explicit
+            pipe = get_redis().pipeline(transaction=True)
+            pipe.delete(_key(user_id))
+            pipe.sadd(_key(user_id), "", *family_ids)
+            pipe.expire(_key(user_id), settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60)
+            await pipe.execute()
+        except (RedisError, OSError) as e:
+            logger.warning("Session store unavailable: %s", e)
+
+    @staticmethod
+    async def touch(user_id: str):
+        """A token was rotated: the set lives as long as the new token (no-op on a missing set)"""
+
+        try:
+            await get_redis().expire(_key(user_id), settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60)
+        except (RedisError, OSError) as e:
+            logger.warning("Session store unavailable: %s", e)
+
+    @staticmethod
+    async def remove(user_id: str, family_id: str):
+        try:
+            await get_redis().srem(_key(user_id), family_id)
+        except (RedisError, OSError) as e:
+            logger.warning("Session store unavailable: %s", e)
+
+    @staticmethod
+    async def clear(user_id: str):
+        """Log out everywhere: the next refresh of every session is refused"""
+
+        await SessionStore.replace(user_id, ())
+
+    @staticmethod
+    async def is_active(user_id: str, family_id: str) -> Optional[bool]:
+        """None when the store does not know the user (check the table then)"""
+
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.exists(_key(user_id))
+            pipe.sismember(_key(user_id), family_id)
+            exists, member = await pipe.execute()
+        except (RedisError, OSError) as e:
+            logger.warning("Session store unavailable: %s", e)
+            return None
+        if not exists:
+            return None
+        return bool(member)
+
+
+@shared_task
+def refresh_token_cleanup_task(batch_size: Optional[int] = None) -> dict:
+    """
+    Celery beat task deleting the expired refresh tokens by batches (one
+    short transaction each, on the expires_at index), so the table only
+    holds the live sessions.
+    """
+
+    from src.api.auth.models import RefreshToken
+
+    batch_size = batch_size or settings.REFRESH_TOKEN_CLEANUP_BATCH
+    now = datetime.now(timezone.utc)
+    deleted = 0
+    with get_session() as session:
+        while True:
+            expired = select(RefreshToken.id).where(RefreshToken.expires_at < now).limit(batch_size)
+            result = session.execute(delete(RefreshToken).where(RefreshToken.id.in_(expired.scalar_subquery())))
+            session.commit()
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                break
+
+    logger.info("Refresh token cleanup: %s expired tokens deleted", deleted)
+    return {"deleted": deleted}
@@ -0,0 +1,213 @@
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from celery import shared_task
+from sqlalchemy import and_, delete, or_, select
+
+from src.api.job_offers.models import JobApplication, JobAttachment
+from src.api.training.models import StudentApplication, StudentAttachment
+from src.config import settings
+from src.database import get_session
+from src.helper.file_helper import FileHelper
+
+
+logger = logging.getLogger(__name__)
+
+
+# (attachment model, application model) pairs reconciled against the storage
+ATTACHMENT_TABLES = (
+    (StudentAttachment, StudentApplication),
+    (JobAttachment, JobApplication),
+)
+
+REPORT_SAMPLE_SIZE = 50
+ROW_DELETE_BATCH_SIZE = 1000
+
+
+class StorageGarbageCollector:
+    """
+    Find and remove stored files no attachment row points to anymore.
+
+    A file is an orphan when it lives under one of STORAGE_GC_PREFIXES, is
+    older than STORAGE_GC_GRACE_HOURS and is not referenced by an attachment
+    of a live application. Attachment rows left without application
+    (`dissociate_*_attachment`) or attached to a soft-deleted application are
+    collected as well.
+
+    With local storage the task must run on a worker that mounts the uploads
+    volume.
+    """
+
+    def __init__(self, session, prefixes: Optional[list[str]] = None, grace_hours: Optional[int] = None):
+        self.session = session
+        self.prefixes = prefixes or settings.STORAGE_GC_PREFIXES
+        grace_hours = settings.STORAGE_GC_GRACE_HOURS if grace_hours is None else grace_hours
+        self.cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+
+    @staticmethod
+    def storage_key(file_path: str) -> str:
+        if settings.STORAGE_LOCATION == "local":
+            return file_path.strip("/")
+        return FileHelper.get_s3_key(file_path)
+
+    def referenced_keys(self) -> set[str]:
+        keys = set()
+        for attachment_model, application_model in ATTACHMENT_TABLES:
+            statement = (
+                select(attachment_model.file_path, attachment_model.optimized_file_path)
+                .join(application_model, application_model.id == attachment_model.application_id)
+                .where(attachment_model.delete_at.is_(None), application_model.delete_at.is_(None))
+                .execution_options(yield_per=5000)
+            )
+            for paths in self.session.execute(statement):
+                keys.update(self.storage_key(path) for path in paths if path)
+        return keys
+
+    def dangling_rows(self):
+        """
+        Yield (model, id, file_path) for attachment rows without a live application
+        for longer than the grace period. The optimized copy of a row is yielded with a None id.
+        """
+
+        for attachment_model, application_model in ATTACHMENT_TABLES:
+            statement = (
+                select(attachment_model.id, attachment_model.file_path, attachment_model.optimized_file_path)
+                .outerjoin(application_model, application_model.id == attachment_model.application_id)
+                .where(
+                    or_(
+                        # dissociated rows: the grace period runs from their upload
+                        and_(attachment_model.application_id.is_(None), attachment_model.created_at < self.cutoff),
+                        # from the soft delete of the application, which may still be restored
+                        application_model.delete_at < self.cutoff,
+                    )
+                )
+                .execution_options(yield_per=5000)
+            )
+            for row_id, file_path, optimized_file_path in self.session.execute(statement):
+                yield attachment_model, row_id, file_path
+                if optimized_file_path:
+                    yield attachment_model, None, optimized_file_path
+
+    def iter_stored_files(self):
+        """
+        Yield (key, size) for every stored file under the managed prefixes that
+        is older than the grace period.
+        """
+
+        cutoff_ts = self.cutoff.timestamp()
+        for prefix in self.prefixes:
+            prefix = prefix.strip("/")
+            if settings.STORAGE_LOCATION == "local":
+                root = os.path.join("src/static/uploads", prefix)
+                for dir_path, _, file_names in os.walk(root):
+                    for file_name in file_names:
+                        full_path = os.path.join(dir_path, file_name)
+                        stat = os.stat(full_path)
+                        if stat.st_mtime < cutoff_ts:
+                            yield os.path.relpath(full_path, "src"), stat.st_size
+            else:
+                for visibility in ("public", "private"):
+                    for obj in FileHelper.iter_s3_objects(f"{visibility}/{prefix}/"):
+                        if obj["LastModified"] < self.cutoff:
+                            yield obj["Key"], obj["Size"]
+
+    def delete_keys(self, keys: list[str]) -> dict:
+        if settings.STORAGE_LOCATION == "local":
+            return FileHelper.delete_files(keys)
+        return FileHelper.delete_s3_keys(keys)
+
+    def delete_rows(self, rows: dict) -> int:
+        deleted = 0
+        for model, ids in rows.items():
+            for start in range(0, len(ids), ROW_DELETE_BATCH_SIZE):
+                chunk = ids[start:start + ROW_DELETE_BATCH_SIZE]
+                self.session.execute(delete(model).where(model.id.in_(chunk)))
+                deleted += len(chunk)
+        self.session.commit()
+        return deleted
+
+    def run(self, dry_run: bool = True) -> dict:
+        """
+        Reconcile the storage with the attachment tables.
+
+        Args:
+            dry_run (bool): Only report what would be deleted. Defaults to True.
+
+        Returns:
+            dict: The report with counters, a sample of orphan keys and the
+            listing/deletion throughput.
+        """
+
+        started = time.monotonic()
+        referenced = self.referenced_keys()
+
+        orphan_rows: dict = {}
+        orphan_keys = set()
+        for model, row_id, file_path in self.dangling_rows():
+            if row_id is not None:
+                orphan_rows.setdefault(model, []).append(row_id)
+            if file_path:
+                key = self.storage_key(file_path)
+                if key not in referenced:
+                    orphan_keys.add(key)
+
+        scanned = 0
+        orphan_bytes = 0
+        for key, size in self.iter_stored_files():
+            scanned += 1
+            if key not in referenced and key not in orphan_keys:
+                orphan_keys.add(key)
+                orphan_bytes += size
+        scan_seconds = time.monotonic() - started
+
+        report = {
+            "dry_run": dry_run,
+            "storage": settings.STORAGE_LOCATION,
+            "prefixes": self.prefixes,
+            "cutoff": self.cutoff.isoformat(),
+            "scanned_files": scanned,
+            "referenced_files": len(referenced),
+            "orphan_files": len(orphan_keys),
+            "orphan_bytes": orphan_bytes,
+            "orphan_rows": sum(len(ids) for ids in orphan_rows.values()),
+            "sample": sorted(orphan_keys)[:REPORT_SAMPLE_SIZE],
+            "deleted_files": 0,
+            "deleted_rows": 0,
+            "errors": [],
+            "scan_seconds": round(scan_seconds, 3),
+            "scanned_per_second": round(scanned / scan_seconds, 1) if scan_seconds else scanned,
+        }
+
+        if dry_run:
+            return report
+
+        delete_started = time.monotonic()
+        result = self.delete_keys(sorted(orphan_keys))
+        report["deleted_files"] = result["deleted"]
+        report["errors"] = result["errors"][:REPORT_SAMPLE_SIZE]
+        report["deleted_rows"] = self.delete_rows(orphan_rows)
+        delete_seconds = time.monotonic() - delete_started
+        report["delete_seconds"] = round(delete_seconds, 3)
+        report["deleted_per_second"] = round(result["deleted"] / delete_seconds, 1) if delete_seconds else result["deleted"]
+        return report
+
+
+@shared_task
+def storage_orphan_cleanup_task(dry_run: Optional[bool] = None, prefixes: Optional[list[str]] = None, grace_hours: Optional[int] = None) -> dict:
+    """
+    Celery task reconciling stored attachment files with the database.
+    Defaults to STORAGE_GC_DRY_RUN so a scheduled run only reports.
+    """
+
+    dry_run = settings.STORAGE_GC_DRY_RUN if dry_run is None else dry_run
+    with get_session() as session:
+        report = StorageGarbageCollector(session, prefixes, grace_hours).run(dry_run=dry_run)
+    logger.info(
+        "Storage GC (%s): %s scanned, %s orphan files (%s bytes), %s orphan rows, %s files deleted",
+        "dry run" if dry_run else "delete", report["scanned_files"], report["orphan_files"],
+        report["orphan_bytes"], report["orphan_rows"], report["deleted_files"],
+    )
+    return report
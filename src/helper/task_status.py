@@ -0,0 +1,91 @@
+import inspect
+import json
+import logging
+from typing import Optional
+
+import redis
+from celery import Task
+
+from src.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+_client: Optional[redis.Redis] = None
+
+
+def _redis() -> redis.Redis:
+    # sync client: used by the workers and by get_task_info
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.CELERY_RESULT_BACKEND, decode_responses=True)
+    return _client
+
+
+def _key(task_id: str) -> str:
+    return f"{settings.REDIS_NAMESPACE}:task_status:{task_id}"
+
+
+class TaskStatus:
+    """
+    Compact status records of the tasks polled by the clients (exports...):
+    one small JSON string per task, {"state", "result", "user_id"},
+    expiring after TASK_STATUS_TTL_SECONDS, instead of the full Celery result
+    meta (traceback, children, args...) of every task. `user_id` is the
+    owner of the task, the only user allowed to read its status.
+    """
+
+    @staticmethod
+    def set(task_id: str, state: str, result=None, user_id: Optional[str] = None):
+        try:
+            _redis().set(
+                _key(task_id),
+                json.dumps({"state": state, "result": result, "user_id": user_id}, default=str, separators=(",", ":")),
+                ex=settings.TASK_STATUS_TTL_SECONDS,
+            )
+        except redis.RedisError as e:
+            logger.warning("Task status not saved: %s", e)
+
+    @staticmethod
+    def get(task_id: str) -> Optional[dict]:
+        """None when the task has no record (not tracked, not started yet or expired)"""
+
+        value = _redis().get(_key(task_id))
+        return json.loads(value) if value else None
+
+
+class TrackedTask(Task):
+    """
+    Task base recording its status (STARTED, SUCCESS with the returned value,
+    FAILURE with the error) in TaskStatus, for the tasks whose progress or
+    result is polled through get_task_info; the other tasks store nothing
+    (ignore_result by default). Every record carries the `user_id` argument
+    of the task, its owner.
+
+        @shared_task(bind=True, base=TrackedTask)
+        def export_dataset_task(self, ..., user_id: str):
+            self.update_status("PROGRESS", {"rows": rows})
+    """
+
+    abstract = True
+
+    def owner(self, args, kwargs) -> Optional[str]:
+        try:
+            user_id = inspect.signature(self.run).bind_partial(*args, **kwargs).arguments.get("user_id")
+        except TypeError:
+            return None
+        return str(user_id) if user_id is not None else None
+
+    def update_status(self, state: str, meta: Optional[dict] = None):
+        if self.request.id:
+            TaskStatus.set(self.request.id, state, meta, self.owner(self.request.args or (), self.request.kwargs or {}))
+
+    def before_start(self, task_id, args, kwargs):
+        TaskStatus.set(task_id, "STARTED", user_id=self.owner(args, kwargs))
+
+    def on_success(self, retval, task_id, args, kwargs):
+        TaskStatus.set(task_id, "SUCCESS", retval, self.owner(args, kwargs))
+
+    def on_failure(self, exc, task_id, args, kwargs, einfo):
+        TaskStatus.set(task_id, "FAILURE", str(exc), self.owner(args, kwargs))
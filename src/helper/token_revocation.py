@@ -0,0 +1,147 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from redis.exceptions import RedisError
+
+from src.config import settings
+from src.redis_client import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+
+def _revoked_key() -> str:
+    # sorted set: jti -> expiration timestamp of the token
+    return f"{settings.REDIS_NAMESPACE}:revoked_jtis"
+
+
+def _version_key() -> str:
+    return f"{settings.REDIS_NAMESPACE}:revoked_jtis:version"
+
+
+class _BloomFilter:
+    """Bit array with k positions per item (double hashing of one blake2b digest)"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class TokenRevocation:
+    """
+    Revoked JWT ids shared by every process (uvicorn workers, Celery): a
+    Redis sorted set scored by the token expiration, trimmed as the tokens
+    expire. Each process keeps a Bloom filter of the set, rebuilt in the
+    background (on the executor) when the set changed, at most every
+    JWT_REVOCATION_SYNC_SECONDS: a token missing from the filter is accepted
+    without a Redis round trip, a filter hit is confirmed in Redis.
+
+    A revocation made in another process is seen at the next sync. Redis
+    errors keep the last filter; a hit that cannot be confirmed is refused.
+    Until a first sync succeeds there is no filter: every check asks Redis.
+    """
+
+    _filter: Optional[_BloomFilter] = None
+    _version: Optional[str] = None
+    _synced_at: float = 0
+    _sync_task: Optional[asyncio.Task] = None
+    # revoked by this process while a rebuild runs, added to the new filter
+    _revoked_meanwhile: Optional[list] = None
+
+    @staticmethod
+    def _build(jtis: Iterable[str], count: int) -> _BloomFilter:
+        bloom = _BloomFilter(max(settings.JWT_REVOCATION_BLOOM_CAPACITY, 2 * count), settings.JWT_REVOCATION_BLOOM_ERROR_RATE)
+        for jti in jtis:
+            bloom.add(jti)
+        return bloom
+
+    @classmethod
+    async def sync(cls, force: bool = False):
+        if not force and cls._filter is not None and time.monotonic() - cls._synced_at < settings.JWT_REVOCATION_SYNC_SECONDS:
+            return
+        # the concurrent checks keep using the current filter meanwhile
+        cls._synced_at = time.monotonic()
+        try:
+            redis = get_redis()
+            version = await redis.get(_version_key())
+            if force or cls._filter is None or version != cls._version:
+                cls._revoked_meanwhile = []
+                pipe = redis.pipeline(transaction=False)
+                pipe.zremrangebyscore(_revoked_key(), "-inf", time.time())
+                pipe.zrange(_revoked_key(), 0, -1)
+                _, jtis = await pipe.execute()
+                # hashing the whole set is CPU work: off the event loop
+                bloom = await asyncio.get_running_loop().run_in_executor(None, cls._build, jtis, len(jtis))
+                for jti in cls._revoked_meanwhile:
+                    bloom.add(jti)
+                cls._filter = bloom
+                cls._version = version
+        except (RedisError, OSError) as e:
+            logger.warning("Token revocation list unavailable, last filter kept: %s", e)
+        finally:
+            cls._revoked_meanwhile = None
+
+    @classmethod
+    def _schedule_sync(cls):
+        """Refresh the filter in the background when due: the checks never wait for a rebuild"""
+
+        if time.monotonic() - cls._synced_at < settings.JWT_REVOCATION_SYNC_SECONDS:
+            return
+        if cls._sync_task is not None and not cls._sync_task.done():
+            return
+        cls._sync_task = asyncio.get_running_loop().create_task(cls.sync())
+
+    @classmethod
+    async def revoke(cls, jti: str, expires_at: int | float | datetime):
+        """Revoke `jti` until the expiration of its token (the `exp` claim)"""
+
+        if isinstance(expires_at, datetime):
+            expires_at = expires_at.timestamp()
+        if expires_at <= datetime.now(timezone.utc).timestamp():
+            return
+
+        pipe = get_redis().pipeline(transaction=True)
+        pipe.zadd(_revoked_key(), {jti: expires_at})
+        pipe.incr(_version_key())
+        await pipe.execute()
+        if cls._filter is not None:
+            cls._filter.add(jti)
+        if cls._revoked_meanwhile is not None:
+            cls._revoked_meanwhile.append(jti)
+
+    @classmethod
+    async def is_revoked(cls, jti: str) -> bool:
+        if cls._filter is None:
+            # first check of the process, or no sync succeeded yet
+            await cls.sync()
+        else:
+            cls._schedule_sync()
+        if cls._filter is not None and jti not in cls._filter:
+            return False
+
+        try:
+            expires_at = await get_redis().zscore(_revoked_key(), jti)
+        except (RedisError, OSError) as e:
+            logger.warning("Token revocation list unavailable, token refused: %s", e)
+            return True
+        return expires_at is not None and expires_at > time.time()
@@ -0,0 +1,79 @@
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+_SESSION_KEY = "unit_of_work"
+
+
+class UnitOfWork:
+    """
+    One transaction per request: the service methods only flush their
+    changes (UnitOfWork.save) and the unit commits them once when the
+    request ends, or rolls everything back when it raises (HTTPException
+    included). Used through the get_unit_of_work dependency:
+
+        @router.post("/...", dependencies=[Depends(get_unit_of_work)])
+
+    Outside of a unit of work (Celery tasks, scripts, the other endpoints)
+    UnitOfWork.save commits right away, as before.
+
+    The defaults of the models (ids aside) are computed in Python, so the
+    objects do not need a refresh after a flush: the generated ids are set
+    by the INSERT ... RETURNING of the flush.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self._after_commit: list[Callable[[], Awaitable]] = []
+
+    @staticmethod
+    def current(session: AsyncSession) -> Optional["UnitOfWork"]:
+        return session.info.get(_SESSION_KEY)
+
+    async def __aenter__(self) -> "UnitOfWork":
+        if _SESSION_KEY in self.session.info:
+            raise RuntimeError("The session already belongs to a unit of work")
+        self.session.info[_SESSION_KEY] = self
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.session.info.pop(_SESSION_KEY, None)
+        if exc_type is not None:
+            await self.session.rollback()
+            return False
+        try:
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        for callback in self._after_commit:
+            await callback()
+        return False
+
+    @staticmethod
+    async def save(session: AsyncSession):
+        """
+        Commit point of a service method: flush only when the session belongs
+        to a unit of work (ids and constraints are checked now, the unit
+        commits at the end), commit otherwise.
+        """
+
+        if _SESSION_KEY in session.info:
+            await session.flush()
+        else:
+            await session.commit()
+
+    @staticmethod
+    async def after_commit(session: AsyncSession, callback: Callable[[], Awaitable]):
+        """
+        Run `callback` (cache invalidation, ...) once the changes are
+        committed: at the end of the unit of work, right away without one.
+        Nothing runs when the unit is rolled back.
+        """
+
+        unit_of_work = UnitOfWork.current(session)
+        if unit_of_work is None:
+            await callback()
+        else:
+            unit_of_work._after_commit.append(callback)
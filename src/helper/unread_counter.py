@@ -0,0 +1,128 @@
+import logging
+from typing import Optional
+
+from redis.exceptions import RedisError
+
+from src.config import settings
+from src.redis_client import get_redis
+
+
+logger = logging.getLogger(__name__)
+
+
+# KEYS: counter, generation  ARGV: delta, generation ttl
+# Only an existing counter moves: a missing one is recounted from the table
+# at the next read, never started from a wrong value. The generation moves
+# in every case, so a recount running meanwhile is not cached.
+_ADJUST = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+if redis.call('EXISTS', KEYS[1]) == 0 then return nil end
+local count = redis.call('INCRBY', KEYS[1], ARGV[1])
+if count < 0 then redis.call('SET', KEYS[1], 0, 'KEEPTTL') end
+return count
+"""
+
+# KEYS: counter, generation  ARGV: count, generation read before the count, ttl
+_STORE = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[2] then return 0 end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+return 1
+"""
+
+# KEYS: counter, generation  ARGV: generation ttl
+_RESET = """
+redis.call('DEL', KEYS[1])
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+"""
+
+_scripts = {}
+
+
+def _key(user_id: str) -> str:
+    return f"{settings.REDIS_NAMESPACE}:notifications_unread:{user_id}"
+
+
+def _generation_key(user_id: str) -> str:
+    return f"{settings.REDIS_NAMESPACE}:notifications_unread:{user_id}:generation"
+
+
+def _script(source: str):
+    if source not in _scripts:
+        _scripts[source] = get_redis().register_script(source)
+    return _scripts[source]
+
+
+class UnreadCounter:
+    """
+    Unread notifications count of each user kept in Redis, so the badge is
+    one GET. The notifications table stays the reference: the counter is
+    recounted (partial index on the unread rows) when missing, a Redis error
+    means "unknown".
+
+    A recount is cached only if no change happened while it ran (generation
+    of the user, moved by every adjust / reset), and for at most
+    NOTIFICATION_UNREAD_TTL_SECONDS: a change racing the recount costs one
+    more recount, an adjust landing after a recount that already saw its
+    row is corrected at expiry.
+    """
+
+    @staticmethod
+    async def get(user_id: str) -> tuple[Optional[int], Optional[str]]:
+        """The cached count (None when missing) and the generation to pass to `store`"""
+
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.get(_key(user_id))
+            pipe.get(_generation_key(user_id))
+            value, generation = await pipe.execute()
+        except (RedisError, OSError) as e:
+            logger.warning("Unread counter unavailable: %s", e)
+            return None, None
+        return (int(value) if value is not None else None), (generation or "0")
+
+    @staticmethod
+    async def store(user_id: str, count: int, generation: Optional[str]):
+        """Cache a recounted value, unless the counter changed since `get`"""
+
+        if generation is None:
+            return
+        try:
+            await _script(_STORE)(
+                keys=[_key(user_id), _generation_key(user_id)],
+                args=[count, generation, settings.NOTIFICATION_UNREAD_TTL_SECONDS],
+            )
+        except (RedisError, OSError) as e:
+            logger.warning("Unread counter unavailable: %s", e)
+
+    @staticmethod
+    async def reset(user_id: str):
+        """Drop the counter (everything read): the next read recounts"""
+
+        try:
+            await _script(_RESET)(
+                keys=[_key(user_id), _generation_key(user_id)],
+                args=[settings.NOTIFICATION_UNREAD_TTL_SECONDS],
+            )
+        except (RedisError, OSError) as e:
+            logger.warning("Unread counter unavailable: %s", e)
+
+    @staticmethod
+    async def adjust(deltas: dict[str, int]):
+        """Add a delta to the counter of each user, in one round trip"""
+
+        if not deltas:
+            return
+        try:
+            script = _script(_ADJUST)
+            pipe = get_redis().pipeline(transaction=False)
+            for user_id, delta in deltas.items():
+                await script(
+                    keys=[_key(user_id), _generation_key(user_id)],
+                    args=[delta, settings.NOTIFICATION_UNREAD_TTL_SECONDS],
+                    client=pipe,
+                )
+            await pipe.execute()
+        except (RedisError, OSError) as e:
+            logger.warning("Unread counter unavailable: %s", e)
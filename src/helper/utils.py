@@ -1,20 +1,26 @@
+import json
+import logging
+import time
 from typing import Optional
 import os
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from jinja2 import Environment, FileSystemLoader
-from pyfcm import FCMNotification
+import firebase_admin
+from firebase_admin import credentials, exceptions as firebase_exceptions, messaging
 from src.config import settings
+from src.helper.schemas import EMAIL_CHANNEL
 import httpx
+from src.helper.in_app_notif import NotificationType
+from src.helper.metrics import InstrumentedTransport, MetricsHelper
 from celery import shared_task
+from sqlalchemy import select, update
+from src.database import get_session
 
 
-push_service = FCMNotification(
-        service_account_file="src/lafaom.json",
-        credentials=None,
-        project_id="laakam-487e5"
-    )
+logger = logging.getLogger(__name__)
+
 
 env = Environment(loader=FileSystemLoader('src/templates'))
 
@@ -34,41 +40,75 @@ class NotificationHelper :
         None
         """
         
-        NotificationHelper.send_push_notification(data=notify_data)
+        NotificationHelper.send_push_notification(notify_data)
 
 
     @staticmethod
     @shared_task  
     def send_push_notification(notify_data : dict):
         """
-            Send an in app notification to a user, given the notification data.
+            Send a push notification to one device, given the notification data.
 
             Args:
-            data (Notification): The notification data.
+            notify_data (dict): device_id (the FCM token), title, message, image and action (data payload).
 
             Returns:
             None
         """
         
-        #data = {
-        #    "channel": "notify-" + notify_data["user_id"],   
-        #    "content" :  {
-        #        "type":"notification",
-        #        "data": notify_data
-        #    }
-        #}
-        
-        #NotificationHelper.send_ws_message(data=data)
-        
-        print(notify_data)
-        response = push_service.notify( 
-                fcm_token=notify_data["device_id"],
-                notification_title=notify_data["title"],
-                notification_body=notify_data["message"],
-                notification_image=notify_data["image"],
-                data_payload=notify_data["action"]
+        logger.debug("Push notification", extra={"user_id": notify_data.get("user_id")})
+        _send_push_messages(
+            [notify_data["device_id"]],
+            title=notify_data["title"],
+            body=notify_data["message"],
+            image=notify_data.get("image"),
+            data=notify_data.get("action"),
+        )
+
+
+    @staticmethod
+    @shared_task
+    def send_push_notifications(notification_type: str, data: dict, user_ids: Optional[list[str]] = None, training_session_id: Optional[str] = None):
+        """
+        Send a push notification built from a NotificationType to users, or to
+        every participant of a training session: one payload per language,
+        FCM multicast calls of up to PUSH_BATCH_SIZE devices, and the
+        unregistered tokens removed from the users.
+
+        Args:
+        notification_type (str): The NotificationType value.
+        data (dict): The values of the title / message / action placeholders.
+        user_ids (list[str]): The recipients (optional).
+        training_session_id (str): The training session of the recipients (optional).
+
+        Returns:
+        dict: The delivered, failed and pruned counts.
+        """
+        kind = NotificationType.from_value(notification_type)
+        if kind is None:
+            raise ValueError(f"Unknown notification type {notification_type!r}")
+
+        tokens_by_lang = _push_recipients(user_ids, training_session_id)
+        report = {"delivered": 0, "failed": 0, "pruned": 0}
+        for lang, tokens in tokens_by_lang.items():
+            lang = lang if lang in kind.title else "en"
+            try:
+                body, actions = kind.template[lang].format(**data), kind.action(lang, data)
+            except (KeyError, IndexError):
+                # data missing a placeholder: the raw template, as in the inbox
+                body, actions = kind.template[lang], []
+            result = _send_push_messages(
+                tokens,
+                title=kind.title[lang],
+                body=body,
+                data={"type": kind.value, "action": actions},
             )
-        
+            for key in report:
+                report[key] += result[key]
+
+        logger.info("Push %s sent", kind.value, extra=report)
+        return report
+
 
     @staticmethod  
     @shared_task      
@@ -91,41 +131,7 @@ class NotificationHelper :
         Returns:
         None
         """
-        message = MIMEMultipart()
-        message["From"] = settings.EMAILS_FROM_EMAIL
-        message["To"] = data["to_email"]
-        message["Subject"] =  data["subject"]
-        data["context"]["app_name"] = settings.EMAILS_FROM_NAME
-
-        if data["template_name"] :
-            template = env.get_template(data["lang"] + "/" + data["template_name"])
-            body = template.render(data["context"])
-
-        message.attach(MIMEText(body, "html" if data["template_name"] else "plain"))     
-            
-        try:
-            if settings.SMTP_ENCRYPTION == "TLS":
-                with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-                    server.starttls()
-                    
-                    server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-                    server.send_message(message)
-                    
-                    print('email send ' + data["to_email"] )
-            else:
-                with smtplib.SMTP_SSL(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-                    
-                    server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-                    server.send_message(message)
-                    
-                    print('email send ' + data["to_email"] )
-                
-    
-                
-        except smtplib.SMTPAuthenticationError as e:
-            print(f"Authentication error: {e}")
-        except Exception as e:
-            print(f"An error occurred: {e}")    
+        _send_smtp_messages([data])
 
 
     @staticmethod  
@@ -149,36 +155,165 @@ class NotificationHelper :
         Returns:
         None
         """
-        # Prepare the body
-        body = data.get("body", "")
-    
-        if data.get("template_name") :
-            template = env.get_template(data["lang"] + "/"  + data["template_name"])
-            body = template.render(data["context"])
-            
-        url = f"https://{settings.MAILGUN_ENDPOINT}/v3/{settings.MAILGUN_DOMAIN}/messages"
-
-        # Email payload
-        payload = {
-            "from": settings.EMAILS_FROM_EMAIL,
-            "to": data["to_email"],
-            "subject": data["subject"],
-            "text": body if not data.get("template_name") else None,
-            "html": body if data.get("template_name") else None,
-        }
-        
-    
-        
-        try:
-            with httpx.Client() as client:
-                response =   client.post(url, data=payload,auth=("api", settings.MAILGUN_SECRET))
-            
+        _send_mailgun_messages([data])
+
+
+    @staticmethod
+    @shared_task
+    def send_email_batch(data_list: list[dict]):
+        """
+        Send several emails in one task, over one SMTP connection (or one
+        HTTP client for the Mailgun API), e.g. the notifications of a batch
+        status change.
+
+        Args:
+        data_list (list[dict]): The data of each email (see send_smtp_email).
+
+        Returns:
+        None
+        """
+        if settings.EMAIL_CHANNEL == EMAIL_CHANNEL.SMTP:
+            _send_smtp_messages(data_list)
+        else:
+            _send_mailgun_messages(data_list)
+
+
+def _render_body(data: dict) -> str:
+    data.setdefault("context", {})["app_name"] = settings.EMAILS_FROM_NAME
+    if data.get("template_name"):
+        template = env.get_template(data["lang"] + "/" + data["template_name"])
+        return template.render(data["context"])
+    return data.get("body", "")
+
+
+def _send_smtp_messages(data_list: list[dict]):
+    try:
+        if settings.SMTP_ENCRYPTION == "TLS":
+            server = smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT)
+        else:
+            server = smtplib.SMTP_SSL(settings.SMTP_HOST, settings.SMTP_PORT)
+        with server:
+            if settings.SMTP_ENCRYPTION == "TLS":
+                server.starttls()
+            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+
+            for data in data_list:
+                message = MIMEMultipart()
+                message["From"] = settings.EMAILS_FROM_EMAIL
+                message["To"] = data["to_email"]
+                message["Subject"] = data["subject"]
+                message.attach(MIMEText(_render_body(data), "html" if data.get("template_name") else "plain"))
+                try:
+                    server.send_message(message)
+                    logger.info("Email %s sent with SMTP", data["subject"])
+                except smtplib.SMTPRecipientsRefused as e:
+                    logger.error("SMTP recipient refused: %s", e)
+
+    except smtplib.SMTPAuthenticationError as e:
+        logger.error("SMTP authentication error: %s", e)
+    except Exception:
+        logger.exception("Error while sending an email with SMTP")
+
+
+def _send_mailgun_messages(data_list: list[dict]):
+    url = f"https://{settings.MAILGUN_ENDPOINT}/v3/{settings.MAILGUN_DOMAIN}/messages"
+
+    try:
+        with httpx.Client(transport=InstrumentedTransport()) as client:
+            for data in data_list:
+                body = _render_body(data)
+                payload = {
+                    "from": settings.EMAILS_FROM_EMAIL,
+                    "to": data["to_email"],
+                    "subject": data["subject"],
+                    "text": body if not data.get("template_name") else None,
+                    "html": body if data.get("template_name") else None,
+                }
+                response = client.post(url, data=payload, auth=("api", settings.MAILGUN_SECRET))
+
                 if response.status_code == 200:
-                    
-                    print(f"Email sent successfully to {data['to_email']} with Mailgun API")
+                    logger.info("Email %s sent with the Mailgun API", data["subject"])
                 else:
-                    print(f"Failed to send email: {response.status_code} - {response.text} with Mailgun API")
+                    logger.error("Mailgun API error %s: %s", response.status_code, response.text[:500])
+
+    except httpx.HTTPError as e:
+        logger.error("Error while sending an email with the Mailgun API: %s", e)
+
+
+def _push_recipients(user_ids: Optional[list[str]], training_session_id: Optional[str]) -> dict[str, list[str]]:
+    """Device tokens of the recipients grouped by language, in one query"""
+
+    from src.api.training.models import TrainingSessionParticipant
+    from src.api.user.models import User
+
+    statement = select(User.lang, User.web_token).where(User.web_token.is_not(None), User.web_token != "")
+    if user_ids is not None:
+        statement = statement.where(User.id.in_(user_ids))
+    if training_session_id is not None:
+        statement = statement.where(
+            User.id.in_(select(TrainingSessionParticipant.user_id).where(TrainingSessionParticipant.session_id == training_session_id))
+        )
+
+    tokens_by_lang: dict[str, list[str]] = {}
+    with get_session() as session:
+        for lang, token in session.execute(statement.distinct()):
+            tokens_by_lang.setdefault(lang or "en", []).append(token)
+    return tokens_by_lang
+
+
+def _firebase_app():
+    # initialized by src.main, on its own in the scripts
+    try:
+        return firebase_admin.get_app()
+    except ValueError:
+        return firebase_admin.initialize_app(credentials.Certificate("src/lafaom.json"))
+
+
+def _send_push_messages(tokens: list[str], title: str, body: str, image: Optional[str] = None, data: Optional[dict] = None) -> dict:
+    """
+    Send one notification to `tokens` with FCM multicast calls of up to
+    PUSH_BATCH_SIZE devices, then clear the tokens FCM reports as
+    unregistered (or of another sender) from the users, in one UPDATE.
+    """
+
+    # FCM data values are strings
+    payload = {key: value if isinstance(value, str) else json.dumps(value) for key, value in (data or {}).items()}
+    report = {"delivered": 0, "failed": 0, "pruned": 0}
+    stale = []
+    app = _firebase_app()
+    for start in range(0, len(tokens), settings.PUSH_BATCH_SIZE):
+        batch = tokens[start:start + settings.PUSH_BATCH_SIZE]
+        started = time.perf_counter()
+        try:
+            response = messaging.send_each_for_multicast(
+                messaging.MulticastMessage(
+                    tokens=batch,
+                    notification=messaging.Notification(title=title, body=body, image=image),
+                    data=payload,
+                ),
+                app=app,
+            )
+        except firebase_exceptions.FirebaseError as e:
+            logger.error("FCM multicast error: %s", e)
+            report["failed"] += len(batch)
+            continue
+        finally:
+            MetricsHelper.observe(MetricsHelper.push_batch_duration, time.perf_counter() - started)
+
+        report["delivered"] += response.success_count
+        report["failed"] += response.failure_count
+        for token, result in zip(batch, response.responses):
+            if isinstance(result.exception, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
+                stale.append(token)
+
+    if stale:
+        from src.api.user.models import User
 
+        with get_session() as session:
+            session.execute(update(User).where(User.web_token.in_(stale)).values(web_token=None))
+            session.commit()
+        report["pruned"] = len(stale)
 
-        except httpx.HTTPError as e:
-            print(f"An error occurred while sending the email: {e}")
+    for result, count in report.items():
+        MetricsHelper.observe(MetricsHelper.push_messages, count, result)
+    return report
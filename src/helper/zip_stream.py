@@ -0,0 +1,181 @@
+import asyncio
+import os
+import zipfile
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Optional, Union
+
+from src.config import settings
+from src.helper.file_helper import FileHelper
+
+
+ZIP_READ_CHUNK_SIZE = 1024 * 1024
+
+
+class _ZipOutput:
+    """
+    Write-only, unseekable sink for ZipFile. ZipFile then writes data
+    descriptors after each member instead of seeking back, and the bytes
+    written so far can be drained and sent to the client.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipStreamHelper:
+    """
+    Build a ZIP archive on the fly from stored files and generated documents.
+
+    Entries are (arcname, source) tuples where source is either bytes (a
+    generated summary) or a stored file path. Stored files are read chunk by
+    chunk by a producer task into a bounded queue (ZIP_PREFETCH_CHUNKS), so the
+    next files are fetched from the disk/S3 while the current one is sent,
+    and at most a few chunks are held in memory.
+    """
+
+    @staticmethod
+    def unique_arcname(arcname: str, used: set) -> str:
+        base, extension = os.path.splitext(arcname)
+        candidate = arcname
+        index = 1
+        while candidate in used:
+            index += 1
+            candidate = f"{base}_{index}{extension}"
+        used.add(candidate)
+        return candidate
+
+    @staticmethod
+    async def _produce(entries: Iterable[tuple[str, Union[bytes, str]]], queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        try:
+            for arcname, source in entries:
+                if isinstance(source, bytes):
+                    await queue.put(("start", arcname))
+                    await queue.put(("data", source))
+                    await queue.put(("end", None))
+                    continue
+
+                file = await loop.run_in_executor(None, FileHelper.open_file, source)
+                if file is None:
+                    await queue.put(("missing", arcname))
+                    continue
+                try:
+                    await queue.put(("start", arcname))
+                    while True:
+                        chunk = await loop.run_in_executor(None, file.read, ZIP_READ_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        await queue.put(("data", chunk))
+                    await queue.put(("end", None))
+                finally:
+                    file.close()
+            await queue.put(("done", None))
+        except Exception as e:
+            await queue.put(("error", e))
+
+    @staticmethod
+    async def stream(entries: Iterable[tuple[str, Union[bytes, str]]]) -> AsyncIterator[bytes]:
+        """
+        Yield the ZIP archive bytes as the entries are read.
+
+        Members are deflated at level 1 on a worker thread, so the event loop
+        only moves bytes around. Missing stored files are listed in a final
+        "missing_files.txt" member.
+        """
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=settings.ZIP_PREFETCH_CHUNKS)
+        producer = loop.create_task(ZipStreamHelper._produce(entries, queue))
+
+        output = _ZipOutput()
+        archive = zipfile.ZipFile(output, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+        member = None
+        missing = []
+        date_time = datetime.now().timetuple()[:6]
+
+        try:
+            while True:
+                kind, value = await queue.get()
+
+                if kind == "start":
+                    info = zipfile.ZipInfo(value, date_time=date_time)
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    member = archive.open(info, mode="w", force_zip64=True)
+                elif kind == "data":
+                    await loop.run_in_executor(None, member.write, value)
+                elif kind == "end":
+                    member.close()
+                    member = None
+                elif kind == "missing":
+                    missing.append(value)
+                elif kind == "error":
+                    raise value
+                elif kind == "done":
+                    break
+
+                data = output.drain()
+                if data:
+                    yield data
+
+            if missing:
+                archive.writestr("missing_files.txt", "\n".join(missing) + "\n")
+            archive.close()
+            yield output.drain()
+
+        finally:
+            producer.cancel()
+
+    @staticmethod
+    def attachment_arcname(folder: str, name: Optional[str], file_path: str, used: set) -> str:
+        _, extension = os.path.splitext(file_path.split("?")[0])
+        name = FileHelper.sanitize_filename(name or os.path.basename(file_path))
+        if extension and not name.lower().endswith(extension.lower()):
+            name = f"{name}{extension}"
+        return ZipStreamHelper.unique_arcname(f"{folder}/{name}", used)
+
+    @staticmethod
+    def build_dossier_entries(dossiers: Iterable[dict], index_header: str) -> list[tuple]:
+        """
+        Build the (arcname, source) entries of a dossier ZIP: one folder per
+        application with its summary.txt and attachments, and an index.csv
+        when there are several applications.
+
+        Each dossier is a dict: {"folder", "summary" (lines), "attachments"
+        ([(name, document_type, page_count, file_path)]), "index" (row values,
+        without the attachments count)}.
+        """
+
+        entries = []
+        used = set()
+        index_lines = [index_header]
+
+        for dossier in dossiers:
+            folder = FileHelper.sanitize_filename(dossier["folder"])
+            summary = [*dossier["summary"], "", "Attachments :"]
+            summary_index = len(entries)
+            for name, document_type, page_count, file_path in dossier["attachments"]:
+                arcname = ZipStreamHelper.attachment_arcname(folder, name, file_path, used)
+                pages = f" ({page_count} pages)" if page_count else ""
+                summary.append(f"  - {document_type}{pages} : {arcname.split('/', 1)[1]}")
+                entries.append((arcname, file_path))
+
+            entries.insert(summary_index, (ZipStreamHelper.unique_arcname(f"{folder}/summary.txt", used), ("\n".join(summary) + "\n").encode()))
+            index_lines.append(";".join(
+                str(v or "").replace(";", ",") for v in (*dossier["index"], len(dossier["attachments"]))
+            ))
+
+        if len(index_lines) > 2:
+            entries.insert(0, ("index.csv", ("\n".join(index_lines) + "\n").encode("utf-8-sig")))
+        return entries
@@ -1,6 +1,7 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError,HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from src.api.auth.utils import rotate_key
 from src.config import settings
 from src.api.user.router import router as user_router
@@ -11,16 +12,25 @@ from src.api.auth.router import router as auth_router
 from src.api.training.routers import router as training_router
 from src.api.system.router import router as system_router
 from src.api.system.dashboard import router as dashboard_router
+from src.api.system.media import router as media_router
+from src.api.system.exports import router as exports_router
 from src.api.cabinet.router import router as cabinet_router
+from src.api.notifications.router import router as notifications_router
 
 import firebase_admin
 from firebase_admin import credentials
-from fastapi.staticfiles import StaticFiles
 from starlette.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+import secrets
 import sentry_sdk
 from src.celery_utils import create_celery
 from src.helper.schemas import BaseOutFail, ErrorMessage
+from src.helper.json_response import default_response_class
+from src.helper.compression import CompressionMiddleware, PrecompressedStaticFiles
+from src.helper.metrics import MetricsHelper, MetricsMiddleware, sentry_traces_sampler
+from src.helper.log_helper import LogHelper, RequestIdMiddleware
+
+LogHelper.setup()
 
 # Initialize Firebase Admin SDK
 if firebase_admin._apps:
@@ -31,9 +41,8 @@ firebase_admin.initialize_app(credential=cred)
 if settings.SENTRY_DSN and settings.ENV != "development":
     sentry_sdk.init(
         dsn= settings.SENTRY_DSN,
-        # Set traces_sample_rate to 1.0 to capture 100%
-        # of transactions for tracing.
-        traces_sample_rate=1.0,
+        # per route sample rate, see SENTRY_ROUTE_SAMPLE_RATES
+        traces_sampler=sentry_traces_sampler,
         _experiments={
             # Set continuous_profiling_auto_start to True
             # to automatically start the profiler on when
@@ -43,7 +52,7 @@ if settings.SENTRY_DSN and settings.ENV != "development":
 
 
 
-app = FastAPI(title=settings.PROJECT_NAME)
+app = FastAPI(title=settings.PROJECT_NAME, default_response_class=default_response_class())
 celery = create_celery()
 app.celery_app = celery
 
@@ -89,6 +98,7 @@ app.add_middleware(
         "Content-Type",
         "Authorization",
         "X-Requested-With",
+        "X-Request-ID",
         "Origin",
         "Access-Control-Request-Method",
         "Access-Control-Request-Headers",
@@ -96,7 +106,13 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
-app.mount("/static", StaticFiles(directory="src/static"), name="static")
+app.add_middleware(CompressionMiddleware)
+
+app.add_middleware(MetricsMiddleware)
+
+app.add_middleware(RequestIdMiddleware)
+
+app.mount("/static", PrecompressedStaticFiles(directory="src/static"), name="static")
 
 app.include_router(auth_router, prefix=base_url + "/auth", tags=["Auth"])
 app.include_router(user_router, prefix=base_url )
@@ -106,7 +122,10 @@ app.include_router(training_router, prefix=base_url )
 app.include_router(payments_router, prefix=base_url + "/payments", tags=["Payments"])
 app.include_router(system_router, prefix=base_url + "/system", tags=["System"])
 app.include_router(dashboard_router, prefix=base_url + "/dashboard", tags=["Dashboard"])
+app.include_router(media_router, prefix=base_url + "/media", tags=["Media"])
+app.include_router(exports_router, prefix=base_url, tags=["Exports"])
 app.include_router(cabinet_router, prefix=base_url + "/cabinet-application")
+app.include_router(notifications_router, prefix=base_url)
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -148,11 +167,14 @@ async def validation_exception_handler(request: Request, exc: HTTPException):
         return JSONResponse(
             status_code=exc.status_code,
             content={"detail" : exc.detail}, 
+            headers=exc.headers,
         )
     else:
+        # the headers carry Retry-After (429) and WWW-Authenticate (401)
         return JSONResponse(
             status_code=exc.status_code,
             content=exc.detail, 
+            headers=exc.headers,
         )
         
 
@@ -166,6 +188,17 @@ async def root() -> dict:
         "Environment": settings.ENV
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus metrics of this worker process, and the totals of the Celery workers kept in Redis"""
+
+    if settings.METRICS_TOKEN:
+        authorization = request.headers.get("authorization", "")
+        if not secrets.compare_digest(authorization, f"Bearer {settings.METRICS_TOKEN}"):
+            return PlainTextResponse("Forbidden", status_code=403)
+    # the shared metrics are read with the sync Redis client: off the event loop
+    return PlainTextResponse(await run_in_threadpool(MetricsHelper.render), media_type="text/plain; version=0.0.4")
+
 @app.get("/health/database", tags=["Health"])
 async def database_health() -> dict:
     """Check database table existence"""
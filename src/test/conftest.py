@@ -1,13 +1,19 @@
+import functools
+import uuid
 from collections.abc import Generator
 
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import Session, SQLModel, create_engine
 from sqlalchemy.pool import StaticPool
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
 
-from src.api.auth.schemas import RegisterInput
-from src.api.user.service import UserService
+from src import redis_client
+
+from src.config import settings
 from src.database import get_session
+from src.helper.query_budget import query_budget as QueryBudget
 from src.main import app
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"  # Use in-memory DB for isolation
@@ -21,6 +27,9 @@ engine = create_engine(
 # Ensure the database is created before tests run
 SQLModel.metadata.create_all(engine)
 
+# endpoints exceeding their declared query budget fail the tests
+settings.QUERY_BUDGET_MODE = "raise"
+
 
 @pytest.fixture(scope="function")
 def db() -> Generator[Session, None, None]:
@@ -46,3 +55,47 @@ def client() -> Generator[TestClient, None, None]:
     """Provides a FastAPI test client."""
     with TestClient(app) as c:
         yield c
+
+
+@pytest.fixture(scope="function")
+def query_budget():
+    """
+    Fail the test when a block runs more SQL statements than allowed,
+    requests made with the test client included:
+
+        with query_budget(2):
+            client.get("/api/v1/student-applications")
+    """
+    return functools.partial(QueryBudget, mode="raise", all_threads=True)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def redis_store(monkeypatch):
+    """
+    The Redis of REDIS_CACHE_URL under a throwaway namespace, for the Lua
+    scripts (OTP, rate limits): the test is skipped without a server.
+    """
+    client = aioredis.from_url(settings.REDIS_CACHE_URL, decode_responses=True)
+    try:
+        await client.ping()
+    except (RedisError, OSError):
+        await client.aclose()
+        pytest.skip("Redis is not reachable")
+
+    namespace = f"test-{uuid.uuid4().hex}"
+    monkeypatch.setattr(settings, "REDIS_NAMESPACE", namespace)
+    # the scripts are registered on the client: new client, new registrations
+    monkeypatch.setattr(redis_client, "_redis", client)
+    monkeypatch.setattr("src.helper.otp_store._scripts", {})
+    monkeypatch.setattr("src.helper.rate_limit._script", None)
+    yield client
+
+    keys = [key async for key in client.scan_iter(f"{namespace}:*")]
+    if keys:
+        await client.delete(*keys)
+    await client.aclose()
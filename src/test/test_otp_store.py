@@ -0,0 +1,58 @@
+import pytest
+
+from src.config import settings
+from src.helper.otp_store import OtpPurpose, OtpStatus, OtpStore
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_valid_code_is_consumed_once(redis_store):
+    assert await OtpStore.issue(OtpPurpose.TWO_FACTOR, "User@Example.com", "ABC12", {"user_id": "u1"})
+
+    assert await OtpStore.consume(OtpPurpose.TWO_FACTOR, "user@example.com", "ABC12") == (OtpStatus.VALID, {"user_id": "u1"})
+    assert await OtpStore.consume(OtpPurpose.TWO_FACTOR, "user@example.com", "ABC12") == (OtpStatus.EXPIRED, None)
+
+
+async def test_only_the_digest_is_stored(redis_store):
+    await OtpStore.issue(OtpPurpose.TWO_FACTOR, "user@example.com", "ABC12")
+
+    keys = [key async for key in redis_store.scan_iter(f"{settings.REDIS_NAMESPACE}:otp:*")]
+    assert len(keys) == 1
+    assert "ABC12" not in (await redis_store.hgetall(keys[0])).values()
+
+
+async def test_code_is_dropped_after_max_attempts(redis_store, monkeypatch):
+    monkeypatch.setattr(settings, "OTP_MAX_ATTEMPTS", 3)
+    await OtpStore.issue(OtpPurpose.FORGOTTEN_PASSWORD, "user@example.com", "ABC12")
+
+    assert (await OtpStore.consume(OtpPurpose.FORGOTTEN_PASSWORD, "user@example.com", "WRONG"))[0] == OtpStatus.INVALID
+    assert (await OtpStore.consume(OtpPurpose.FORGOTTEN_PASSWORD, "user@example.com", "WRONG"))[0] == OtpStatus.INVALID
+    assert (await OtpStore.consume(OtpPurpose.FORGOTTEN_PASSWORD, "user@example.com", "WRONG"))[0] == OtpStatus.LOCKED
+    # the right code does not come back once locked
+    assert (await OtpStore.consume(OtpPurpose.FORGOTTEN_PASSWORD, "user@example.com", "ABC12"))[0] == OtpStatus.EXPIRED
+
+
+async def test_new_code_replaces_the_previous_one(redis_store):
+    await OtpStore.issue(OtpPurpose.TWO_FACTOR, "user@example.com", "FIRST")
+    await OtpStore.issue(OtpPurpose.TWO_FACTOR, "user@example.com", "SECND")
+
+    assert (await OtpStore.consume(OtpPurpose.TWO_FACTOR, "user@example.com", "FIRST"))[0] == OtpStatus.INVALID
+    assert (await OtpStore.consume(OtpPurpose.TWO_FACTOR, "user@example.com", "SECND"))[0] == OtpStatus.VALID
+
+
+async def test_codes_are_bound_to_their_subject(redis_store):
+    # an email change code asked by one account cannot be used by another
+    await OtpStore.issue(OtpPurpose.CHANGE_EMAIL, "u1:new@example.com", "ABC12", email="new@example.com")
+
+    assert (await OtpStore.consume(OtpPurpose.CHANGE_EMAIL, "u2:new@example.com", "ABC12"))[0] == OtpStatus.EXPIRED
+    assert (await OtpStore.consume(OtpPurpose.CHANGE_EMAIL, "u1:new@example.com", "ABC12"))[0] == OtpStatus.VALID
+
+
+async def test_issue_is_rate_limited_by_email(redis_store, monkeypatch):
+    monkeypatch.setattr(settings, "OTP_RATE_LIMIT", 2)
+
+    assert await OtpStore.issue(OtpPurpose.JOB_APPLICATION, "1:user@example.com", "AAAAA", email="user@example.com")
+    assert await OtpStore.issue(OtpPurpose.JOB_APPLICATION, "2:user@example.com", "BBBBB", email="user@example.com")
+    assert not await OtpStore.issue(OtpPurpose.JOB_APPLICATION, "3:user@example.com", "CCCCC", email="user@example.com")
+    # a refused code is not stored
+    assert (await OtpStore.consume(OtpPurpose.JOB_APPLICATION, "3:user@example.com", "CCCCC"))[0] == OtpStatus.EXPIRED
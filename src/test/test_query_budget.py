@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import text
+
+from src.api.auth.utils import get_current_user
+from src.api.training.services import StudentApplicationService
+from src.api.user.models import User
+from src.api.user.service import UserService
+from src.helper.query_budget import QueryBudgetExceeded
+from src.main import app
+from src.test.conftest import engine
+
+
+class FakeStudentApplicationService:
+    """Runs `statements` SQL statements per page, like a listing with (statements - 1) lazy loads"""
+
+    statements = 1
+
+    async def get_student_application(self, filters, user_id=None):
+        with engine.connect() as connection:
+            for _ in range(self.statements):
+                connection.execute(text("SELECT 1"))
+        return [], 0
+
+
+class FakeUserService:
+
+    async def has_all_permissions(self, user_id, permissions):
+        return True
+
+
+@pytest.fixture
+def admin_client(client):
+    app.dependency_overrides[get_current_user] = lambda: User(id="admin", email="admin@example.com")
+    app.dependency_overrides[UserService] = FakeUserService
+    app.dependency_overrides[StudentApplicationService] = FakeStudentApplicationService
+    yield client
+    for dependency in (get_current_user, UserService, StudentApplicationService):
+        app.dependency_overrides.pop(dependency, None)
+
+
+def test_student_applications_within_budget(admin_client, query_budget, monkeypatch):
+    monkeypatch.setattr(FakeStudentApplicationService, "statements", 2)
+
+    with query_budget(2) as budget:
+        response = admin_client.get("/api/v1/student-applications")
+
+    assert response.status_code == 200
+    assert len(budget.statements) == 2
+
+
+def test_student_applications_over_budget_fails(admin_client, query_budget, monkeypatch):
+    monkeypatch.setattr(FakeStudentApplicationService, "statements", 2)
+
+    with pytest.raises(QueryBudgetExceeded):
+        with query_budget(1):
+            admin_client.get("/api/v1/student-applications")
+
+
+def test_student_applications_endpoint_budget_fails_on_n_plus_one(admin_client, monkeypatch):
+    # the endpoint declares @query_budget(2): one more lazy load per row breaks it
+    monkeypatch.setattr(FakeStudentApplicationService, "statements", 3)
+
+    with pytest.raises(QueryBudgetExceeded):
+        admin_client.get("/api/v1/student-applications")
@@ -0,0 +1,76 @@
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.config import settings
+from src.helper import rate_limit
+from src.helper.rate_limit import RateLimiter, parse_rule
+from src.helper.schemas import ErrorMessage
+
+
+class FakeScript:
+    """Token bucket script answering `allowed` / `wait` (ms), counting its calls"""
+
+    def __init__(self, allowed=0, wait=0, error=None):
+        self.result = [allowed, wait]
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self, keys, args):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture(autouse=True)
+def reset_limiter(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    RateLimiter.reset_local()
+    yield
+    RateLimiter.reset_local()
+
+
+def test_parse_rule():
+    assert parse_rule("email:5/hour") == ("email", 5, 3600)
+    with pytest.raises(ValueError):
+        parse_rule("email:5/week")
+
+
+def test_throttled_request_gets_429_with_retry_after(client, monkeypatch):
+    script = FakeScript(allowed=0, wait=1500)
+    monkeypatch.setattr(rate_limit, "_script", script)
+
+    response = client.post("/api/v1/auth/token", json={"email": "user@example.com", "password": "password"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "2"
+    assert response.json()["error_code"] == ErrorMessage.TOO_MANY_REQUESTS.value
+
+
+def test_throttled_client_is_refused_without_redis(client, monkeypatch):
+    script = FakeScript(allowed=0, wait=60000)
+    monkeypatch.setattr(rate_limit, "_script", script)
+
+    for _ in range(3):
+        response = client.post("/api/v1/auth/token", json={"email": "user@example.com", "password": "password"})
+        assert response.status_code == 429
+
+    # the first request found the ip bucket empty, the next ones are refused in the process
+    assert script.calls == 1
+
+
+@pytest.mark.anyio
+async def test_redis_errors_let_the_request_through(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_script", FakeScript(error=RedisConnectionError("down")))
+
+    assert await RateLimiter.hit("bucket", 1, 60) == 0
+
+
+@pytest.mark.anyio
+async def test_token_bucket_script(redis_store):
+    bucket = f"{settings.REDIS_NAMESPACE}:rate:test:ip:127.0.0.1"
+
+    assert await RateLimiter.hit(bucket, 2, 60) == 0
+    assert await RateLimiter.hit(bucket, 2, 60) == 0
+    # 2 tokens a minute: the next one in about 30 seconds
+    assert 25 < await RateLimiter.hit(bucket, 2, 60) <= 30
@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from src.api.auth.models import RefreshToken
+from src.api.auth.service import AuthService
+from src.api.user.service import UserService
+from src.helper.password_helper import token_digest
+from src.helper.schemas import ErrorMessage
+from src.helper.session_store import SessionStore
+from src.main import app
+
+
+class FakeAuthService:
+    """Refresh tokens in memory, claimed like the conditional UPDATE of AuthService.rotate_refresh_token"""
+
+    tokens: dict = {}
+    revoked_families: list = []
+    # a concurrent refresh claims the token between the read and the rotation
+    concurrent_claim = False
+
+    def issue(self, user_id="user-1", family_id=None):
+        token = f"token-{len(self.tokens)}"
+        row = RefreshToken(token=token_digest(token), user_id=user_id, expires_at=datetime.now(timezone.utc) + timedelta(days=1))
+        row.family_id = family_id or row.id
+        FakeAuthService.tokens[row.id] = row
+        return row, token
+
+    async def get_by_token(self, id):
+        return self.tokens.get(id)
+
+    async def rotate_refresh_token(self, refresh_token):
+        row = self.tokens[refresh_token.id]
+        if self.concurrent_claim:
+            row.revoked_at = datetime.now(timezone.utc)
+        if row.revoked_at is not None:
+            return None
+        row.revoked_at = datetime.now(timezone.utc)
+        return self.issue(refresh_token.user_id, refresh_token.family_id)
+
+    async def revoke_refresh_token_family(self, user_id, family_id):
+        FakeAuthService.revoked_families.append(family_id)
+
+
+class FakeUserService:
+
+    async def get_full_by_id(self, user_id):
+        return SimpleNamespace(**{
+            "id": user_id, "first_name": "test", "last_name": "test", "birth_date": None, "civility": None,
+            "country_code": None, "mobile_number": None, "fix_number": None, "email": "user@example.com",
+            "picture": None, "status": "active", "lang": "fr", "web_token": None, "last_login": None,
+            "user_type": "student", "two_factor_enabled": False, "created_at": datetime.now(timezone.utc),
+            "professions_status": None, "addresses": [], "school_curriculum": None,
+        })
+
+
+@pytest.fixture
+def auth(client, monkeypatch):
+    monkeypatch.setattr(FakeAuthService, "tokens", {})
+    monkeypatch.setattr(FakeAuthService, "revoked_families", [])
+    monkeypatch.setattr(FakeAuthService, "concurrent_claim", False)
+    sessions = SimpleNamespace(active=None)
+
+    async def is_active(user_id, family_id):
+        return sessions.active
+
+    monkeypatch.setattr(SessionStore, "is_active", staticmethod(is_active))
+    app.dependency_overrides[AuthService] = FakeAuthService
+    app.dependency_overrides[UserService] = FakeUserService
+    yield SimpleNamespace(service=FakeAuthService(), client=client, sessions=sessions)
+    app.dependency_overrides.pop(AuthService, None)
+    app.dependency_overrides.pop(UserService, None)
+
+
+def refresh(client, token, device_id):
+    return client.post("/api/v1/auth/refresh-token", json={"refresh_token": token, "device_id": device_id})
+
+
+def test_rotation_issues_a_successor_in_the_same_family(auth):
+    row, token = auth.service.issue()
+
+    response = refresh(auth.client, token, row.id)
+
+    assert response.status_code == 200
+    new = response.json()["access_token"]
+    assert new["device_id"] != row.id and new["refresh_token"] != token
+    assert row.revoked_at is not None
+    assert FakeAuthService.tokens[new["device_id"]].family_id == row.family_id
+
+
+def test_reused_token_revokes_the_family(auth):
+    row, token = auth.service.issue()
+    assert refresh(auth.client, token, row.id).status_code == 200
+
+    response = refresh(auth.client, token, row.id)
+
+    assert response.status_code == 401
+    assert response.json()["error_code"] == ErrorMessage.REFRESH_TOKEN_REVOKED.value
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+    assert FakeAuthService.revoked_families == [row.family_id]
+
+
+def test_concurrent_refresh_losing_the_claim_revokes_the_family(auth):
+    row, token = auth.service.issue()
+    FakeAuthService.concurrent_claim = True
+
+    response = refresh(auth.client, token, row.id)
+
+    assert response.status_code == 401
+    assert response.json()["error_code"] == ErrorMessage.REFRESH_TOKEN_REVOKED.value
+    assert FakeAuthService.revoked_families == [row.family_id]
+
+
+def test_logged_out_session_is_refused(auth):
+    row, token = auth.service.issue()
+    auth.sessions.active = False
+
+    response = refresh(auth.client, token, row.id)
+
+    assert response.status_code == 401
+    assert row.revoked_at is None
+
+
+def test_wrong_token_is_refused(auth):
+    row, _ = auth.service.issue()
+
+    response = refresh(auth.client, "forged", row.id)
+
+    assert response.status_code == 401
+    assert response.json()["error_code"] == ErrorMessage.REFRESH_TOKEN_NOT_FOUND.value
+    assert FakeAuthService.revoked_families == []
+
+
+class FakeResult:
+
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+
+class FakeSession:
+
+    def __init__(self, claimed_id):
+        self.claimed_id = claimed_id
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.claimed_id)
+
+
+@pytest.mark.anyio
+async def test_rotate_claims_the_token_with_a_conditional_update():
+    row = RefreshToken(token="digest", user_id="user-1", expires_at=datetime.now(timezone.utc))
+    session = FakeSession(claimed_id=None)
+
+    assert await AuthService(session=session).rotate_refresh_token(row) is None
+
+    sql = str(session.statements[0])
+    assert sql.startswith("UPDATE")
+    assert "revoked_at IS NULL" in sql and "RETURNING" in sql
@@ -0,0 +1,135 @@
+import time
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src import redis_client
+from src.config import settings
+from src.helper.token_revocation import TokenRevocation
+
+pytestmark = pytest.mark.anyio
+
+
+class FakePipeline:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.calls.append((name, args))
+            return self
+        return queue
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args) for name, args in self.calls]
+
+
+class FakeRedis:
+    """The sorted set / counter commands used by TokenRevocation, in memory"""
+
+    def __init__(self):
+        self.revoked: dict[str, float] = {}
+        self.version = 0
+        self.down = False
+        self.zrange_calls = 0
+
+    def _check(self):
+        if self.down:
+            raise RedisConnectionError("down")
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        self._check()
+        return str(self.version)
+
+    async def incr(self, key):
+        self._check()
+        self.version += 1
+        return self.version
+
+    async def zadd(self, key, mapping):
+        self._check()
+        self.revoked.update(mapping)
+
+    async def zremrangebyscore(self, key, low, high):
+        self._check()
+        self.revoked = {jti: score for jti, score in self.revoked.items() if score > high}
+
+    async def zrange(self, key, start, end):
+        self._check()
+        self.zrange_calls += 1
+        return list(self.revoked)
+
+    async def zscore(self, key, jti):
+        self._check()
+        return self.revoked.get(jti)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_client, "_redis", fake)
+    monkeypatch.setattr("src.helper.token_revocation.get_redis", lambda: fake)
+    for name, value in (("_filter", None), ("_version", None), ("_synced_at", 0), ("_sync_task", None), ("_revoked_meanwhile", None)):
+        monkeypatch.setattr(TokenRevocation, name, value)
+    return fake
+
+
+async def test_revoked_token_is_refused(redis):
+    await TokenRevocation.revoke("jti-1", time.time() + 60)
+
+    assert await TokenRevocation.is_revoked("jti-1")
+    assert not await TokenRevocation.is_revoked("jti-2")
+
+
+async def test_expired_tokens_are_not_stored(redis):
+    await TokenRevocation.revoke("jti-1", time.time() - 1)
+
+    assert redis.revoked == {}
+
+
+async def test_revocation_of_another_process_is_seen_at_the_next_sync(redis, monkeypatch):
+    monkeypatch.setattr(settings, "JWT_REVOCATION_SYNC_SECONDS", 0)
+    assert not await TokenRevocation.is_revoked("jti-1")
+
+    # revoked by another process: only Redis knows it
+    redis.revoked["jti-1"] = time.time() + 60
+    redis.version += 1
+    await TokenRevocation.sync()
+
+    assert await TokenRevocation.is_revoked("jti-1")
+
+
+async def test_unchanged_set_is_not_reloaded(redis):
+    await TokenRevocation.sync(force=True)
+    await TokenRevocation.sync()
+
+    assert redis.zrange_calls == 1
+
+
+async def test_filter_hit_that_cannot_be_confirmed_is_refused(redis):
+    await TokenRevocation.sync(force=True)
+    await TokenRevocation.revoke("jti-1", time.time() + 60)
+    redis.down = True
+
+    assert await TokenRevocation.is_revoked("jti-1")
+    # a miss of the filter does not need Redis
+    assert not await TokenRevocation.is_revoked("jti-2")
+
+
+async def test_without_filter_every_check_asks_redis(redis):
+    redis.revoked["jti-1"] = time.time() + 60
+    redis.down = True
+
+    # the first sync failed: no filter to trust, the token is refused
+    assert await TokenRevocation.is_revoked("jti-2")
+    assert TokenRevocation._filter is None
+
+    redis.down = False
+    assert await TokenRevocation.is_revoked("jti-1")
+    assert not await TokenRevocation.is_revoked("jti-2")
+    assert TokenRevocation._filter is not None